@@ -1,4 +1,19 @@
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib.colors import Normalize
 from matplotlib.figure import Figure
+from schedules import schedule_to_mask, mask_to_schedule
+from tariff import Tariff, WEEKS_IN_MONTH, stack_tariffs, tier_cost
+from demand import align_minutes, minute_slot_index, monthly_peaks
+from sequencing import OFF_FRACTION, PART_LOAD_CURVES, delivered_air, simulate_strategy
+
+WEEKS_PER_YEAR = 52.1429
+TRACE_POINTS = 1000     # blocks drawn per compressor in the raw trace view (about one per pixel)
+HEATMAP_COLUMNS = 4     # panels per row in the weekly heatmap view
+SCHEDULE_OVERLAY = (1.0, 0.0, 0.0, 0.35)    # RGBA of shutdown intervals drawn over the heatmaps
+BOOTSTRAP_REPLICATES = 10000    # resamples behind the savings confidence intervals
+RATED_PERCENTILE = 99.5     # percentile of a compressor's minute kW taken as its full-load kW
+RATE_SENSITIVITY_FACTORS = (0.8, 0.9, 1.0, 1.1, 1.2)     # tariff multipliers in the rate sensitivity sweep
 
 class Analyzer:
     """
@@ -15,12 +30,8 @@ class Analyzer:
         """
         Plots compressor system power consumption average by day as a figure.
         """
-        total_kwh = [0.0] * 7  # Monday → Sunday
-
-        for comp in self.sim.get_compressors():
-            for i, day in enumerate(self.weekday_order):
-                interval_kwh = sum(comp.data[day].values()) * (self.sim.get_interval() / 60)  # convert to kWh
-                total_kwh[i] += interval_kwh
+        _, profiles = self.get_profile_stack()
+        total_kwh = profiles.sum(axis=(0, 2)) * (self.sim.get_interval() / 60)  # Monday → Sunday, kW to kWh
 
         fig = Figure(figsize=(10, 6), dpi=100)
         ax = fig.add_subplot(111)
@@ -35,8 +46,14 @@ class Analyzer:
 
         return fig
 
-    def compute_shutdown_savings(self, schedule: dict):
-        kwh_rate = self.sim.get_kwh_rate()
+    def compute_shutdown_savings(self, schedule: dict, exclude=()):
+        """
+        Computes weekly and annual savings of a shutdown schedule. Compressors
+        named in exclude must stay on and save nothing. Dollar savings are one
+        rate-weighted reduction of the masked profiles against the tariff.
+        """
+        tariff = self.sim.get_tariff()
+        hours = self.sim.get_interval() / 60
         # compressor savings data structure:
         """
         {
@@ -55,31 +72,34 @@ class Analyzer:
             ...
         }
         """
-        compressor_savings = {}
-        for compressor in self.sim.get_compressors():
-            day_savings = {}
-            for day, intervals in schedule.items():
-                if not intervals or day not in compressor.data:
-                    continue
+        names, profiles = self.get_profile_stack()
+        mask = self.schedule_to_mask(schedule)
+        weekly_rates = tariff.get_weekly_rates(self.sim.get_interval())
 
-                saved = 0.0
-                for start_str, end_str in intervals:
-                    start_min = self._time_str_to_minutes(start_str)
-                    end_min = self._time_str_to_minutes(end_str)
+        saved = profiles * mask * hours                              # compressors x 7 x intervals kWh
+        saved[[name in exclude for name in names]] = 0.0
+        day_kwh = saved.sum(axis=2)                                  # compressors x 7
+        week_dollars = np.einsum('cdn,dn->c', saved, weekly_rates)   # compressors
 
-                    for time_str, value in compressor.data[day].items():
-                        time_min = self._time_str_to_minutes(time_str)
-                        if start_min <= time_min <= end_min:
-                            saved += value * (self.sim.get_interval() / 60)
+        # tier adders are billed on whole-meter monthly kWh, so they are shared by kWh saved
+        tier_dollars = self._tier_savings(tariff, profiles.sum(axis=0) * hours, saved.sum(axis=0))
+        total_saved = day_kwh.sum()
+        tier_share = day_kwh.sum(axis=1) / total_saved if total_saved > 0 else np.zeros(len(names))
 
-                day_savings[day] = round(saved, 2)
+        active_days = [day for day, intervals in schedule.items() if intervals and day in self.weekday_order]
+        compressor_savings = {}
+        for i, name in enumerate(names):
+            day_savings = {}
+            if name not in exclude:
+                for day in active_days:
+                    day_savings[day] = round(float(day_kwh[i, self.weekday_order.index(day)]), 2)
 
             total = sum(day_savings.values())
             day_savings["Total"] = round(total, 2)
-            day_savings["Total $"] = round((total * kwh_rate), 2)
-            day_savings["Annual"] = total * 52.1429
-            day_savings["Annual $"] = (day_savings["Annual"] * kwh_rate)
-            compressor_savings[compressor.get_name()] = day_savings
+            day_savings["Total $"] = round(float(week_dollars[i]), 2)
+            day_savings["Annual"] = total * WEEKS_PER_YEAR
+            day_savings["Annual $"] = float(week_dollars[i]) * WEEKS_PER_YEAR + float(tier_dollars * tier_share[i])
+            compressor_savings[name] = day_savings
 
         # savings by day
         """
@@ -96,9 +116,16 @@ class Analyzer:
                 savings_by_day[day] = savings_by_day.get(day, 0) + savings_dict.get(day, 0)
 
         total_week_kwh = sum(comp["Total"] for comp in compressor_savings.values())
-        total_week_dollars = total_week_kwh * kwh_rate
-        total_kwh = total_week_kwh * 52.1429
-        total_dollars = total_kwh * kwh_rate
+        total_week_dollars = float(week_dollars.sum())
+        total_kwh = total_week_kwh * WEEKS_PER_YEAR
+
+        # demand charges: average monthly peak reduction, billed 12 times a year
+        demand_dollars = 0.0
+        if tariff.demand_rate > 0:
+            demand = self.compute_peak_demand(tariff.demand_window, schedule, exclude)
+            demand_dollars = demand["monthly_reduction_kw"] * tariff.demand_rate * 12
+
+        total_dollars = total_week_dollars * WEEKS_PER_YEAR + tier_dollars + demand_dollars
 
         return {
             "compressor_savings": compressor_savings,   # individual compressor savings by week data
@@ -106,16 +133,588 @@ class Analyzer:
             "total_week_kwh": total_week_kwh,           # weekly total kWh savings
             "total_week_dollars": total_week_dollars,   # weekly total dollars
             "total_kwh": total_kwh,                     # annual kwh savings
-            "total_dollars": total_dollars              # annual dollar savings
+            "total_dollars": total_dollars,             # annual dollar savings
+            "tier_dollars": tier_dollars,               # annual savings from dropping tier blocks (included above)
+            "demand_dollars": demand_dollars            # annual demand charge savings (included above)
+        }
+
+    def compute_peak_demand(self, window=15, schedule=None, exclude=()):
+        """
+        Finds the peak rolling-window kW demand in every billing month, for the
+        whole system (coincident) and for each compressor. With a schedule, also
+        finds the system peak after shutting down every non excluded compressor
+        in the scheduled intervals.
+        Returns:
+        {
+            "system": {"2025-01": {"peak_kw": ..., "time": ...}, ...},
+            "compressors": {"Compressor A": {"2025-01": {...}, ...}, ...},
+            "after": {"2025-01": {...}, ...},       # system peaks with the schedule applied
+            "monthly_reduction_kw": average system peak reduction per month
+        }
+        """
+        compressors = self.sim.get_compressors()
+        start, matrix = align_minutes([comp.get_minute_kw() for comp in compressors])
+        result = {"system": {}, "compressors": {}, "after": {}, "monthly_reduction_kw": 0.0}
+        if start is None:
+            return result
+
+        # coincident system demand: minutes where no compressor logged stay missing
+        logged = ~np.isnan(matrix)
+        system_kw = np.where(logged.any(axis=0), np.nansum(matrix, axis=0), np.nan)
+        result["system"] = monthly_peaks(start, system_kw, window)
+        for comp, row in zip(compressors, matrix):
+            result["compressors"][comp.get_name()] = monthly_peaks(start, row, window)
+
+        if schedule is None:
+            return result
+
+        mask = self.schedule_to_mask(schedule)
+        weekday, slot = minute_slot_index(start, matrix.shape[1], self.sim.get_interval())
+        off = mask[weekday, slot]
+        after = matrix.copy()
+        shut = np.array([comp.get_name() not in exclude for comp in compressors])
+        after[np.ix_(shut, off)] = np.where(logged[np.ix_(shut, off)], 0.0, np.nan)
+        after_kw = np.where(logged.any(axis=0), np.nansum(after, axis=0), np.nan)
+        result["after"] = monthly_peaks(start, after_kw, window)
+
+        reductions = [peak["peak_kw"] - result["after"][month]["peak_kw"]
+                      for month, peak in result["system"].items() if month in result["after"]]
+        result["monthly_reduction_kw"] = float(np.mean(reductions)) if reductions else 0.0
+        return result
+
+    def _tier_savings(self, tariff, weekly_kwh, weekly_saved):
+        """
+        Annual tier adder savings. Monthly whole-meter consumption is the weekly
+        compressor kWh scaled by the weeks in each month plus the tariff's other load.
+        """
+        if not tariff.tiers:
+            return 0.0
+        base = weekly_kwh.sum() * WEEKS_IN_MONTH + tariff.other_monthly_kwh
+        after = base - weekly_saved.sum() * WEEKS_IN_MONTH
+        return float((tariff.tier_cost(base) - tariff.tier_cost(after)).sum())
+
+    def rate_sensitivity(self, schedule: dict, tariffs, exclude=()):
+        """
+        Evaluates the annual $ savings of one schedule under many tariffs in a
+        single batched pass (demand charges are left out). Returns an array with
+        one value per tariff.
+        """
+        weekly_rates, thresholds, adders, other = stack_tariffs(tariffs, self.sim.get_interval())
+        hours = self.sim.get_interval() / 60
+        _, all_profiles = self.get_profile_stack()
+        _, profiles = self.get_profile_stack(exclude)
+        saved = profiles.sum(axis=0) * self.schedule_to_mask(schedule) * hours    # 7 x intervals
+
+        energy_dollars = np.einsum('dn,tdn->t', saved, weekly_rates) * WEEKS_PER_YEAR
+
+        # tiers: tariffs x months
+        base = all_profiles.sum() * hours * WEEKS_IN_MONTH[None, :] + other[:, None]
+        after = base - saved.sum() * WEEKS_IN_MONTH[None, :]
+        tier_dollars = (tier_cost(base, thresholds[:, None, :], adders[:, None, :])
+                        - tier_cost(after, thresholds[:, None, :], adders[:, None, :])).sum(axis=1)
+        return energy_dollars + tier_dollars
+
+    def sensitivity_tariffs(self):
+        """
+        Returns (label, tariff) pairs for the rate sensitivity sweep: the
+        simulation tariff scaled by RATE_SENSITIVITY_FACTORS and, for a time of
+        use or tiered tariff, a flat rate at its average $/kWh.
+        """
+        tariff = self.sim.get_tariff()
+        sweep = [(f"{(factor - 1) * 100:+.0f}%" if factor != 1 else "Current", tariff.scaled(factor))
+                 for factor in RATE_SENSITIVITY_FACTORS]
+        if not tariff.is_flat():
+            sweep.append(("Flat at Average Rate", Tariff.flat(tariff.average_rate())))
+        return sweep
+
+    def bootstrap_savings(self, schedule: dict, exclude=(), n_replicates=BOOTSTRAP_REPLICATES, confidence=0.90,
+                          method="weekday", demand_dollars=0.0, seed=None):
+        """
+        Bootstrap confidence intervals of the annual savings of a shutdown schedule.
+        Every logged date is reduced once to its saved kWh and $ per compressor,
+        then each replicate redraws the logged dates with replacement and averages them:
+        method = "weekday" redraws dates within each weekday, "week" redraws whole
+        calendar weeks (keeps day to day correlation within a week).
+        Tier adders and demand_dollars (a compute_shutdown_savings result) are held fixed.
+        Returns {"compressors": {name: {"kwh": (low, high), "dollars": (low, high)}},
+        "total": {...}, "confidence", "replicates", "method"}.
+        """
+        if method not in ("weekday", "week"):
+            raise ValueError(f"Unknown bootstrap method: {method}")
+        tariff = self.sim.get_tariff()
+        hours = self.sim.get_interval() / 60
+        names, profiles = self.get_profile_stack()
+        mask = self.schedule_to_mask(schedule)
+        weekly_rates = tariff.get_weekly_rates(self.sim.get_interval())
+        keep = np.array([name not in exclude for name in names], dtype=float)
+
+        # per date saved kWh and $ of every compressor on the union of logged dates;
+        # intervals (or dates) a compressor did not log are filled from its weekday profile
+        compressors = self.sim.get_compressors()
+        dates = np.unique(np.concatenate([comp.dates for comp in compressors])) if compressors else np.zeros(0, dtype='datetime64[D]')
+        weekdays = (dates.astype('datetime64[D]').view('int64') - 4) % 7     # 1970-01-01 was a Thursday
+        values = np.zeros((len(dates), len(names), 2))                      # dates x compressors x (kWh, $)
+        for i, comp in enumerate(compressors):
+            comp_dates, comp_profiles = comp.get_date_profiles()
+            filled = profiles[i][weekdays]
+            rows = np.searchsorted(dates, comp_dates)
+            filled[rows] = np.where(np.isnan(comp_profiles), filled[rows], comp_profiles)
+            saved = filled * mask[weekdays] * hours * keep[i]
+            values[:, i, 0] = saved.sum(axis=1)
+            values[:, i, 1] = (saved * weekly_rates[weekdays]).sum(axis=1)
+
+        rng = np.random.default_rng(seed)
+        week = np.zeros((n_replicates, len(names), 2))      # replicates x compressors x (kWh, $) in one average week
+        if method == "weekday":
+            for day in range(7):
+                rows = np.flatnonzero(weekdays == day)
+                if not len(rows):
+                    continue
+                draws = rng.multinomial(len(rows), np.full(len(rows), 1 / len(rows)), size=n_replicates)
+                week += (draws @ values[rows].reshape(len(rows), -1)).reshape(week.shape) / len(rows)
+        elif len(dates):
+            # weekday averages over the dates of the drawn weeks; a weekday no drawn week logged keeps its overall average
+            week_ids, week_rows = np.unique((dates.astype('datetime64[D]').view('int64') - 4 - weekdays) // 7, return_inverse=True)
+            day_counts = np.zeros((len(week_ids), 7))
+            np.add.at(day_counts, (week_rows, weekdays), 1)
+            day_values = np.zeros((len(week_ids), 7, len(names) * 2))
+            np.add.at(day_values, (week_rows, weekdays), values.reshape(len(dates), -1))
+            draws = rng.multinomial(len(week_ids), np.full(len(week_ids), 1 / len(week_ids)), size=n_replicates)
+            for day in range(7):
+                totals, counts = draws @ day_values[:, day], draws @ day_counts[:, day]
+                if not counts.any():
+                    continue
+                overall = day_values[:, day].sum(axis=0) / day_counts[:, day].sum()
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    average = np.where(counts[:, None] > 0, totals / counts[:, None], overall)
+                week += average.reshape(week.shape)
+
+        # tier adders held at their point estimate, shared by kWh saved as in compute_shutdown_savings
+        saved = profiles * mask * hours * keep[:, None, None]
+        tier_dollars = self._tier_savings(tariff, profiles.sum(axis=0) * hours, saved.sum(axis=0))
+        day_kwh = saved.sum(axis=(1, 2))
+        tier_share = day_kwh / day_kwh.sum() if day_kwh.sum() > 0 else np.zeros(len(names))
+
+        annual = week * WEEKS_PER_YEAR
+        annual[:, :, 1] += tier_dollars * tier_share
+        total = annual.sum(axis=1)
+        total[:, 1] += demand_dollars
+
+        tail = (1 - confidence) / 2 * 100
+        def interval(samples):
+            low, high = np.percentile(samples, [tail, 100 - tail])
+            return float(low), float(high)
+
+        return {
+            "compressors": {name: {"kwh": interval(annual[:, i, 0]), "dollars": interval(annual[:, i, 1])}
+                            for i, name in enumerate(names)},
+            "total": {"kwh": interval(total[:, 0]), "dollars": interval(total[:, 1])},
+            "confidence": confidence,
+            "replicates": n_replicates,
+            "method": method
+        }
+
+    def replay_schedule(self, schedule: dict, exclude=()):
+        """
+        Applies a shutdown schedule to every logged minute of the actual timeline
+        instead of the averaged weekly profile: each calendar date saves what the
+        compressors really drew in its shutdown windows, so windows they were
+        already off in save nothing. Minutes a compressor did not log save
+        nothing either, and a date only counts towards the distributions when
+        every (non excluded) compressor logged all of its scheduled minutes.
+        Energy is priced at the rate of the minute's own month; tier adders and
+        demand charges are left out of both estimates.
+        Returns:
+        {
+            "dates": ISO dates from the first to the last logged day,
+            "day_kwh": kWh saved on every date (all compressors),
+            "day_dollars": $ saved on every date,
+            "complete": whether every compressor logged the date's scheduled minutes,
+            "compressor_day_kwh": {name: kWh saved on every date},
+            "already_off": {name: share of its logged scheduled minutes it was already off},
+            "weekdays": {"Monday": {"days", "profile_kwh", "mean_kwh", "p10_kwh", "p90_kwh",
+                                    "min_kwh", "max_kwh"}, ...} for the scheduled weekdays,
+            "weeks": [(Monday ISO date, kWh, $) of every fully logged calendar week],
+            "week_range": (10th, 90th percentile) kWh of those weeks, NaN without any,
+            "realized_week_kwh", "realized_annual_kwh", "realized_annual_dollars",
+            "profile_week_kwh", "profile_annual_kwh", "profile_annual_dollars"
+        }
+        A scheduled weekday without a complete date keeps its profile estimate
+        in the realized totals.
+        """
+        interval = self.sim.get_interval()
+        hours = interval / 60
+        tariff = self.sim.get_tariff()
+        mask = self.schedule_to_mask(schedule)
+
+        # profile based estimate of the same energy savings
+        _, profiles = self.get_profile_stack(exclude)
+        profile_saved = (profiles * mask * hours).sum(axis=0)                                   # 7 x intervals kWh
+        profile_day_kwh = profile_saved.sum(axis=1)
+        profile_day_dollars = (profile_saved * tariff.get_weekly_rates(interval)).sum(axis=1)
+
+        compressors = [comp for comp in self.sim.get_compressors() if comp.get_name() not in exclude]
+        series = [comp.get_minute_kw() for comp in compressors]
+        logged_comps = [i for i, (start, kw) in enumerate(series) if start is not None and len(kw)]
+        names = [compressors[i].get_name() for i in logged_comps]
+        start, matrix = align_minutes([series[i] for i in logged_comps])    # compressors x minutes kW
+        if start is None:
+            start = np.datetime64('1970-01-01T00:00', 'm')      # nothing logged: an empty timeline
+
+        minutes = start.astype('int64') + np.arange(matrix.shape[1])      # minutes since 1970-01-01
+        day_index = minutes // (24 * 60) - start.astype('int64') // (24 * 60)
+        dates = start.astype('datetime64[D]') + np.arange(day_index[-1] + 1 if len(minutes) else 0)
+        n_dates = len(dates)
+        date_weekdays = (dates.view('int64') - 4) % 7       # 1970-01-01 was a Thursday
+
+        # one pass over compressors x minutes: what each shutdown minute really saved
+        weekday, slot = minute_slot_index(start, len(minutes), interval)
+        scheduled = mask[weekday, slot]
+        logged = ~np.isnan(matrix)
+        saved = np.where(scheduled & logged, matrix, 0.0) / 60              # compressors x minutes kWh
+        months = dates.astype('datetime64[M]').astype(int) % 12
+        rates = tariff.get_rates(1)[months[day_index], weekday, minutes % (24 * 60)]
+        rows = (np.arange(len(names))[:, None] * n_dates + day_index[None, :]).ravel()
+        compressor_day_kwh = np.bincount(rows, weights=saved.ravel(), minlength=len(names) * n_dates).reshape(len(names), n_dates)
+        logged_minutes = np.bincount(rows, weights=(scheduled & logged).ravel(), minlength=len(names) * n_dates).reshape(len(names), n_dates)
+        day_kwh = compressor_day_kwh.sum(axis=0)
+        day_dollars = np.bincount(day_index, weights=saved.sum(axis=0) * rates, minlength=n_dates)
+        scheduled_minutes = mask.sum(axis=1)[date_weekdays] * interval
+        complete = (logged_minutes == scheduled_minutes[None, :]).all(axis=0)
+
+        # minutes a compressor was already off (below OFF_FRACTION of its full-load kW) inside the windows
+        already_off = {}
+        for name, row, row_logged in zip(names, matrix, logged):
+            in_window = row[scheduled & row_logged]
+            rated = np.percentile(row[row_logged], RATED_PERCENTILE) if row_logged.any() else 0.0
+            already_off[name] = float((in_window < OFF_FRACTION * rated).mean()) if len(in_window) else 0.0
+
+        weekdays = {}
+        realized_week_kwh, realized_week_dollars = 0.0, 0.0
+        for d, day in enumerate(self.weekday_order):
+            if not mask[d].any():
+                continue
+            values = day_kwh[complete & (date_weekdays == d)]
+            if len(values):
+                low, high = np.percentile(values, [10, 90])
+                realized_week_kwh += float(values.mean())
+                realized_week_dollars += float(day_dollars[complete & (date_weekdays == d)].mean())
+            else:
+                low = high = np.nan
+                realized_week_kwh += float(profile_day_kwh[d])
+                realized_week_dollars += float(profile_day_dollars[d])
+            weekdays[day] = {
+                "days": len(values),
+                "profile_kwh": float(profile_day_kwh[d]),
+                "mean_kwh": float(values.mean()) if len(values) else np.nan,
+                "p10_kwh": float(low),
+                "p90_kwh": float(high),
+                "min_kwh": float(values.min()) if len(values) else np.nan,
+                "max_kwh": float(values.max()) if len(values) else np.nan
+            }
+
+        # calendar weeks (Monday first) with all seven dates in range and complete
+        week_rows = (np.arange(n_dates) + date_weekdays[:1].sum()) // 7
+        complete_days = np.bincount(week_rows, weights=complete)
+        week_kwh = np.bincount(week_rows, weights=day_kwh, minlength=len(complete_days))
+        week_dollars = np.bincount(week_rows, weights=day_dollars, minlength=len(complete_days))
+        week_mondays = start.astype('datetime64[D]') - date_weekdays[:1].sum() + 7 * np.arange(len(complete_days))
+        weeks = [(str(monday), float(kwh), float(dollars))
+                 for monday, kwh, dollars, count in zip(week_mondays, week_kwh, week_dollars, complete_days) if count == 7]
+
+        week_range = np.percentile([kwh for _, kwh, _ in weeks], [10, 90]) if weeks else (np.nan, np.nan)
+        profile_week_kwh = float(profile_day_kwh.sum())
+        return {
+            "dates": [str(date) for date in dates],
+            "day_kwh": day_kwh.tolist(),
+            "day_dollars": day_dollars.tolist(),
+            "complete": complete.tolist(),
+            "compressor_day_kwh": dict(zip(names, compressor_day_kwh.tolist())),
+            "already_off": already_off,
+            "weekdays": weekdays,
+            "weeks": weeks,
+            "week_range": (float(week_range[0]), float(week_range[1])),
+            "realized_week_kwh": realized_week_kwh,
+            "realized_annual_kwh": realized_week_kwh * WEEKS_PER_YEAR,
+            "realized_annual_dollars": realized_week_dollars * WEEKS_PER_YEAR,
+            "profile_week_kwh": profile_week_kwh,
+            "profile_annual_kwh": profile_week_kwh * WEEKS_PER_YEAR,
+            "profile_annual_dollars": float(profile_day_dollars.sum()) * WEEKS_PER_YEAR
         }
 
     def _time_str_to_minutes(self, time_str):
         h, m = map(int, time_str.split(":"))
         return h * 60 + m
+
+    def schedule_to_mask(self, schedule: dict):
+        """
+        Converts a shutdown schedule (dict[day] = list of (start_time, end_time))
+        into a 7 x intervals boolean mask, Monday first. Matches the inclusive
+        start/end handling of compute_shutdown_savings.
+        """
+        return schedule_to_mask(schedule, self.sim.get_interval())
+
+    def get_profile_stack(self, exclude=()):
+        """
+        Returns (names, profiles) where profiles is a compressors x 7 x intervals
+        array of average kW. Compressors named in exclude are left out.
+        """
+        compressors = [comp for comp in self.sim.get_compressors() if comp.get_name() not in exclude]
+        n_intervals = (24 * 60) // self.sim.get_interval()
+        profiles = np.zeros((len(compressors), 7, n_intervals))
+        for i, comp in enumerate(compressors):
+            profiles[i] = comp.get_profile_array()
+        return [comp.get_name() for comp in compressors], profiles
+
+    def get_slot_values(self, exclude=()):
+        """
+        Returns a 7 x intervals array of the weekly $ saved by shutting every
+        (non excluded) compressor off for one interval.
+        """
+        _, profiles = self.get_profile_stack(exclude)
+        hours = self.sim.get_interval() / 60
+        weekly_rates = self.sim.get_tariff().get_weekly_rates(self.sim.get_interval())
+        return profiles.sum(axis=0) * hours * weekly_rates
+
+    def compare_schedules(self, masks, exclude=()):
+        """
+        Evaluates many schedules against every compressor in one batched pass.
+        masks = schedules x 7 x intervals boolean array
+        Returns (names, result) where result holds schedules x compressors arrays
+        "kwh" and "dollars" of annual savings (tier adders shared by kWh saved, as
+        in compute_shutdown_savings; demand charges are left out), and per schedule
+        arrays "total_kwh", "total_dollars" and "off_hours" (shutdown hours per week).
+        """
+        tariff = self.sim.get_tariff()
+        interval = self.sim.get_interval()
+        hours = interval / 60
+        names, profiles = self.get_profile_stack()
+        profiles = profiles * np.array([name not in exclude for name in names], dtype=float)[:, None, None]
+        weekly_rates = tariff.get_weekly_rates(interval)
+        flat = np.asarray(masks, dtype=float).reshape(len(masks), -1)     # schedules x slots
+
+        # schedules x slots @ slots x compressors
+        kwh = flat @ profiles.reshape(len(names), -1).T * hours
+        dollars = flat @ (profiles * weekly_rates).reshape(len(names), -1).T * hours
+
+        # tier adders per schedule, billed on the whole meter
+        saved_week = kwh.sum(axis=1)
+        tier_dollars = np.zeros(len(flat))
+        if tariff.tiers:
+            _, all_profiles = self.get_profile_stack()
+            base = all_profiles.sum() * hours * WEEKS_IN_MONTH + tariff.other_monthly_kwh
+            after = base[None, :] - saved_week[:, None] * WEEKS_IN_MONTH[None, :]
+            tier_dollars = (tariff.tier_cost(base)[None, :] - tariff.tier_cost(after)).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            tier_share = np.where(saved_week[:, None] > 0, kwh / saved_week[:, None], 0.0)
+
+        annual_kwh = kwh * WEEKS_PER_YEAR
+        annual_dollars = dollars * WEEKS_PER_YEAR + tier_dollars[:, None] * tier_share
+        return names, {
+            "kwh": annual_kwh,
+            "dollars": annual_dollars,
+            "total_kwh": annual_kwh.sum(axis=1),
+            "total_dollars": annual_dollars.sum(axis=1),
+            "off_hours": flat.sum(axis=1) * hours
+        }
+
+    def simulate_sequencing(self, strategies, units=None):
+        """
+        Replays the logged system air demand, minute by minute, under other
+        sequencing strategies (see sequencing.py).
+        strategies = list of dicts, each with a "name" and a "kind":
+            "base_trim"   : "order" (names, base load first; default largest first),
+                            "trim" (name of the unit taking the swings, or None)
+            "consolidate" : "units" (names) or "n_units" (that many of the largest),
+                            sequenced largest first; the rest stay off
+            "vsd_trim"    : "trim" (name, default the largest unit) runs a VSD,
+                            "curve" overrides PART_LOAD_CURVES["vsd"]
+        units = optional {name: {"rated_kw", "capacity", "control"}} overrides. By
+        default full load is the compressor's RATED_PERCENTILE minute kW, capacity
+        is proportional to it and control is load / unload.
+        Only minutes where every compressor logged are replayed. Savings are
+        annualized over the hours replayed and priced at the tariff's energy
+        rates (tier adders and demand charges are left out).
+        Returns:
+        {
+            "units": {name: {"rated_kw", "capacity", "control"}},
+            "hours": hours replayed,
+            "baseline_kwh": measured kWh over those hours,
+            "strategies": {name: {"kwh", "saved_kwh", "annual_kwh", "annual_dollars",
+                                  "unmet_hours", "unit_kwh": {compressor: kWh}}}
+        }
+        """
+        compressors = self.sim.get_compressors()
+        names = [comp.get_name() for comp in compressors]
+        start, matrix = align_minutes([comp.get_minute_kw() for comp in compressors])
+        result = {"units": {}, "hours": 0.0, "baseline_kwh": 0.0, "strategies": {}}
+        if start is None or len(names) != len(matrix):
+            return result
+
+        # unit parameters
+        units = units or {}
+        index = {name: i for i, name in enumerate(names)}
+        for name, row in zip(names, matrix):
+            rated = float(np.nanpercentile(row, RATED_PERCENTILE)) if np.any(~np.isnan(row)) else 0.0
+            info = {"rated_kw": rated, "capacity": rated, "control": "load_unload"}
+            info.update(units.get(name, {}))
+            result["units"][name] = info
+        rated_kw = np.array([result["units"][name]["rated_kw"] for name in names], dtype=float)
+        capacities = np.array([result["units"][name]["capacity"] for name in names], dtype=float)
+        if np.any(rated_kw <= 0) or np.any(capacities <= 0):
+            raise ValueError("Every compressor needs a positive full-load kW and capacity to simulate sequencing.")
+        curves = [PART_LOAD_CURVES[result["units"][name]["control"]] for name in names]
+
+        # minutes every compressor logged, as time x units
+        complete = ~np.isnan(matrix).any(axis=0)
+        kw = matrix[:, complete].T
+        weekday, slot = minute_slot_index(start, matrix.shape[1], 1)
+        rates = self.sim.get_tariff().get_weekly_rates(1)[weekday[complete], slot[complete]]     # $/kWh of every minute
+        hours = len(kw) / 60
+        result["hours"] = hours
+        result["baseline_kwh"] = float(kw.sum() / 60)
+        if not len(kw):
+            return result
+        demand = delivered_air(kw, rated_kw, capacities, curves).sum(axis=1)
+        annual = 8760 / hours
+        largest_first = [int(i) for i in np.argsort(-capacities, kind='stable')]
+
+        for strategy in strategies:
+            kind = strategy["kind"]
+            trim, trim_curve = None, None
+            if kind == "base_trim":
+                order = [index[name] for name in strategy.get("order", [])] or largest_first
+                trim = index[strategy["trim"]] if strategy.get("trim") else None
+            elif kind == "consolidate":
+                chosen = {index[name] for name in strategy["units"]} if strategy.get("units") else set(largest_first[:int(strategy["n_units"])])
+                order = [i for i in largest_first if i in chosen]
+            elif kind == "vsd_trim":
+                order = largest_first
+                trim = index[strategy["trim"]] if strategy.get("trim") else largest_first[0]
+                trim_curve = strategy.get("curve", PART_LOAD_CURVES["vsd"])
+            else:
+                raise ValueError(f"Unknown sequencing strategy {kind}")
+
+            strategy_kw, unmet = simulate_strategy(demand, rated_kw, capacities, curves, order, trim, trim_curve)
+            total_kw = strategy_kw.sum(axis=1)
+            saved_kw = kw.sum(axis=1) - total_kw
+            result["strategies"][strategy["name"]] = {
+                "kwh": float(total_kw.sum() / 60),
+                "saved_kwh": float(saved_kw.sum() / 60),
+                "annual_kwh": float(saved_kw.sum() / 60 * annual),
+                "annual_dollars": float((saved_kw * rates).sum() / 60 * annual),
+                "unmet_hours": float((unmet > 1e-9 * capacities.sum()).sum() / 60),
+                "unit_kwh": dict(zip(names, (strategy_kw.sum(axis=0) / 60).tolist()))
+            }
+        return result
+
+    def optimize_shutdown_schedule(self, min_off_hours=1.0, max_daily_off_hours=24.0, blocked=None,
+                                   must_stay_on=(), max_windows_per_day=2):
+        """
+        Searches for the shutdown schedule with the highest annual $ savings.
+        min_off_hours = shortest allowed contiguous off window
+        max_daily_off_hours = total off time allowed per day
+        blocked = 7 x intervals boolean mask of production hours that must stay on
+        must_stay_on = names of compressors that are never shut down
+        max_windows_per_day = number of separate off windows allowed per day
+
+        Every (day, start, length) window is scored at once from prefix sums of
+        the slot values, then windows are picked greedily per day, best first,
+        while they fit the remaining daily budget and do not overlap.
+        Returns a schedule in the ShutdownSchedulerWidget format.
+        """
+        interval = self.sim.get_interval()
+        slot_values = self.get_slot_values(must_stay_on)
+        n_slots = slot_values.shape[1]
+        if blocked is None:
+            blocked = np.zeros((7, n_slots), dtype=bool)
+
+        min_len = max(1, int(np.ceil(min_off_hours * 60 / interval)))
+        budget = int(np.floor(max_daily_off_hours * 60 / interval))
+        if min_len > min(budget, n_slots):
+            raise ValueError("Minimum off window is longer than the daily off-time limit.")
+
+        lengths = np.arange(min_len, min(budget, n_slots) + 1)
+        starts = np.arange(n_slots)
+        ends = starts[:, None] + lengths[None, :]           # starts x lengths (exclusive end)
+        in_day = ends <= n_slots
+        ends = np.minimum(ends, n_slots)
+
+        # prefix sums turn every window score into one subtraction
+        value_cs = np.concatenate((np.zeros((7, 1)), np.cumsum(slot_values, axis=1)), axis=1)
+        scores = value_cs[:, ends] - value_cs[:, starts][:, :, None]     # 7 x starts x lengths
+
+        mask = np.zeros((7, n_slots), dtype=bool)
+        for day in range(7):
+            taken = blocked[day].copy()
+            remaining = budget
+            for _ in range(max_windows_per_day):
+                taken_cs = np.concatenate(([0], np.cumsum(taken)))
+                free = (taken_cs[ends] - taken_cs[starts][:, None]) == 0
+                valid = in_day & free & (lengths[None, :] <= remaining)
+                candidate = np.where(valid, scores[day], -np.inf)
+                best = np.argmax(candidate)
+                if not np.isfinite(candidate.flat[best]) or candidate.flat[best] <= 0:
+                    break
+                start, length = starts[best // len(lengths)], lengths[best % len(lengths)]
+                mask[day, start:start + length] = True
+                # block the window and its neighbours so separate windows stay separate
+                taken[max(start - 1, 0):start + length + 1] = True
+                remaining -= length
+
+        return mask_to_schedule(mask, interval)
+
+    def compute_day_type_savings(self, schedule: dict, exclude=()):
+        """
+        Applies the weekday shutdown schedule to every logged date and groups the
+        savings by day type. Each date uses the schedule of its own weekday.
+        Returns:
+        {
+            "Day Type 1": {
+                "compressor_savings": {"Compressor A": avg kWh saved per day, ...},
+                "Total": avg kWh saved per day (all compressors),
+                "Days/Year": occurences of this day type per year,
+                "Annual": annual kWh savings,
+                "Annual $": annual $ savings
+            },
+            ...
+        }
+        """
+        rates = self.sim.get_tariff().get_rates(self.sim.get_interval())     # 12 x 7 x intervals
+        hours = self.sim.get_interval() / 60
+        mask = self.schedule_to_mask(schedule)
+
+        results = {}
+        for day_type, type_dates in self.sim.get_day_type_dates().items():
+            compressor_savings = {}
+            type_dollars = 0.0
+            for compressor in self.sim.get_compressors():
+                if compressor.get_name() in exclude:
+                    compressor_savings[compressor.get_name()] = 0.0
+                    continue
+                dates, profiles = compressor.get_date_profiles()
+                rows = np.isin(dates, type_dates)
+                date_weekdays = (dates[rows].view('int64') - 4) % 7     # 1970-01-01 was a Thursday
+                date_months = dates[rows].astype('datetime64[M]').astype(int) % 12
+                saved = np.nan_to_num(profiles[rows]) * mask[date_weekdays] * hours     # dates x intervals kWh
+                type_dollars += float((saved * rates[date_months, date_weekdays]).sum())
+                # average over every date in the day type (dates without data saved nothing)
+                compressor_savings[compressor.get_name()] = round(float(saved.sum()) / max(len(type_dates), 1), 2)
+
+            total = sum(compressor_savings.values())
+            days_per_year = self.sim.get_day_type_days_per_year(day_type)
+            results[day_type] = {
+                "compressor_savings": compressor_savings,
+                "Total": round(total, 2),
+                "Days/Year": days_per_year,
+                "Annual": total * days_per_year,
+                "Annual $": type_dollars / max(len(type_dates), 1) * days_per_year
+            }
+        return results
     
-    def plot_power_consumption_by_interval(self) -> Figure:
+    def plot_power_consumption_by_interval(self, day="Monday") -> Figure:
         """
-        Creates a line plot of compressor power consumption for Monday intervals.
+        Creates a line plot of compressor power consumption for one weekday's intervals.
         Vertical axis = power in kW, Horizontal axis = time interval (HH:MM).
         Each line represents a different compressor.
         """
@@ -123,28 +722,36 @@ class Analyzer:
         fig = Figure(figsize=(10, 6), dpi=100)
         ax = fig.add_subplot(1, 1, 1)
 
-        # Loop over compressors and plot their Monday data
+        # Loop over compressors and plot their data for the day
         for compressor in self.sim.get_compressors():
             data = compressor.get_data()
-            monday_data = data.get("Monday", {})
+            day_data = data.get(day, {})
 
-            if not monday_data:
-                continue  # Skip if no Monday data
+            if not day_data:
+                continue  # Skip if no data for the day
 
             # Extract intervals and values in given order
-            intervals = list(monday_data.keys())
-            values = list(monday_data.values())
+            intervals = list(day_data.keys())
+            values = list(day_data.values())
 
             # Plot line using compressor's name for the label
-            ax.plot(intervals, values, marker='o', label=compressor.get_name())
+            line, = ax.plot(intervals, values, marker='o', label=compressor.get_name())
+
+            # p10 - p90 band and bucket maximum from the per-bucket distributions
+            stats = compressor.get_bucket_stats()
+            d = self.weekday_order.index(day)
+            ax.fill_between(intervals, stats["p10"][d], stats["p90"][d], color=line.get_color(), alpha=0.2, linewidth=0)
+            ax.plot(intervals, stats["max"][d], color=line.get_color(), linestyle=':', linewidth=1)
 
         # Set titles and labels
-        ax.set_title("Power Consumption Over Time - Average Monday", fontsize=18)
+        ax.set_title(f"Power Consumption Over Time - Average {day}", fontsize=18)
+        ax.text(0.01, 0.98, "Shaded: p10 - p90, dotted: max", transform=ax.transAxes, va='top', fontsize=10)
         ax.set_xlabel("Time Interval", fontsize=16)
         ax.set_ylabel("Power (kW)", fontsize=16)
 
         # Remove horizontal padding (set x-axis limits tightly)
         ax.set_xlim(intervals[0], intervals[-1])
+        ax.set_xticks(intervals[::max(1, 60 // self.sim.get_interval())])   # hourly labels, one per interval overlap
 
         # Rotate x-axis labels and right center for readability
         ax.tick_params(axis='x', rotation=45)
@@ -160,4 +767,167 @@ class Analyzer:
         # Optimize layout
         fig.tight_layout()
 
-        return fig
\ No newline at end of file
+        return fig
+
+    def plot_raw_traces(self) -> Figure:
+        """
+        Plots the raw logged trace of every compressor across the whole
+        deployment as a min / max band. Bands are drawn from each compressor's
+        pyramid and redrawn at the matching resolution whenever the view is
+        zoomed or panned, so every spike and dropout stays visible.
+        """
+        fig = Figure(figsize=(10, 6), dpi=100)
+        ax = fig.add_subplot(1, 1, 1)
+
+        def draw_band(pyramid, start_ns, end_ns, color, label=None):
+            times, minima, maxima = pyramid.query(start_ns, end_ns, TRACE_POINTS)
+            # a filled band is much cheaper for Agg than a zig-zag line through every min and max
+            return ax.fill_between(mdates.date2num(times.astype('datetime64[ns]')), minima, maxima,
+                                   facecolor=color, edgecolor=color, linewidth=0.8, alpha=0.7, label=label)
+
+        traces = []
+        for i, compressor in enumerate(self.sim.get_compressors()):
+            pyramid = compressor.trace_pyramid
+            if pyramid.is_empty():
+                continue
+            color = f"C{i}"
+            start, end = pyramid.span()
+            band = draw_band(pyramid, start, end, color, f"{compressor.get_name()} ({compressor.trace_unit})")
+            traces.append([pyramid, band, color])
+        ax.autoscale_view()
+        ax.set_autoscale_on(False)     # bands are replaced on every redraw, the view stays put
+
+        def redraw(ax):
+            # re-query every pyramid for the visible window
+            left, right = ax.get_xlim()
+            start_ns, end_ns = (np.datetime64(mdates.num2date(x).replace(tzinfo=None), 'ns').astype(np.int64) for x in (left, right))
+            for trace in traces:
+                pyramid, band, color = trace
+                band.remove()
+                trace[1] = draw_band(pyramid, start_ns, end_ns, color)
+            if ax.figure.canvas is not None:
+                ax.figure.canvas.draw_idle()
+
+        ax.callbacks.connect('xlim_changed', redraw)
+
+        units = sorted({compressor.trace_unit for compressor in self.sim.get_compressors()})
+        ax.set_title("Raw Logged Trace", fontsize=18)
+        ax.set_xlabel("Date", fontsize=16)
+        ax.set_ylabel(" / ".join("Current (A)" if unit == "A" else "Power (kW)" for unit in units), fontsize=16)
+        ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(ax.xaxis.get_major_locator()))
+        ax.grid(True, linestyle='--', alpha=0.6)
+        if traces:
+            ax.legend(loc='upper right')   # a fixed spot, 'best' rescans every band on each redraw
+        fig.tight_layout()
+
+        return fig
+
+    def plot_weekly_heatmaps(self, mask=None) -> Figure:
+        """
+        Plots a weekday x interval heatmap of average kW for every compressor
+        and for the system total, one image per panel. Compressor panels share
+        one color scale; the system total has its own. mask (7 x intervals of
+        bool) is the shutdown schedule drawn on top of every panel.
+        """
+        names, profiles = self.get_profile_stack()
+        n_intervals = profiles.shape[2]
+        panels = [("System Total", profiles.sum(axis=0))] + list(zip(names, profiles))
+
+        compressor_norm = Normalize(0.0, max(float(profiles.max()), 1e-9) if len(names) else 1.0)
+        system_norm = Normalize(0.0, max(float(panels[0][1].max()), 1e-9))
+        norms = [system_norm] + [compressor_norm] * len(names)
+        fig, images = self._heatmap_grid(panels, norms, 'viridis', self._schedule_overlay(mask, n_intervals))
+
+        # one colorbar per color scale, in the right margin
+        fig.colorbar(images["System Total"], cax=fig.add_axes((0.91, 0.55, 0.015, 0.35))).set_label("System kW", fontsize=9)
+        if len(names):
+            fig.colorbar(images[names[-1]], cax=fig.add_axes((0.91, 0.1, 0.015, 0.35))).set_label("Compressor kW", fontsize=9)
+        fig.suptitle("Average Power by Weekday and Interval (red: shutdown schedule)", fontsize=14)
+
+        return fig
+
+    def plot_coverage_heatmaps(self) -> Figure:
+        """
+        Plots a weekday x interval heatmap of data coverage for every compressor:
+        the samples logged in each bucket as a share of the samples expected over
+        the deployment at the logger's typical interval (Compressor.get_coverage).
+        """
+        panels = [(compressor.get_name(), compressor.get_coverage()) for compressor in self.sim.get_compressors()]
+        fig, images = self._heatmap_grid(panels, [Normalize(0.0, 1.0)] * len(panels), 'RdYlGn')
+        if panels:
+            fig.colorbar(images[panels[0][0]], cax=fig.add_axes((0.91, 0.1, 0.015, 0.8))).set_label("Share of Expected Samples", fontsize=9)
+        fig.suptitle("Data Coverage by Weekday and Interval", fontsize=14)
+
+        return fig
+
+    def plot_unloaded_heatmaps(self) -> Figure:
+        """
+        Plots a weekday x interval heatmap of the average kWh every compressor
+        uses running unloaded (Compressor.get_unloaded_kwh_profile), on one
+        color scale, so the intervals wasting the most energy stand out.
+        """
+        panels = [(compressor.get_name(), compressor.get_unloaded_kwh_profile()) for compressor in self.sim.get_compressors()]
+        peak = max((float(values.max()) for _, values in panels), default=0.0)
+        fig, images = self._heatmap_grid(panels, [Normalize(0.0, max(peak, 1e-9))] * len(panels), 'magma')
+        if panels:
+            fig.colorbar(images[panels[0][0]], cax=fig.add_axes((0.91, 0.1, 0.015, 0.8))).set_label("Unloaded kWh per Interval", fontsize=9)
+        fig.suptitle("Average Energy Used Unloaded by Weekday and Interval", fontsize=14)
+
+        return fig
+
+    def _heatmap_grid(self, panels, norms, cmap, overlay=None):
+        """
+        Draws (name, 7 x intervals array) panels as images placed side by side in
+        a single axes: per-panel axes spend most of their draw time on tick
+        machinery. norms = color scale of each panel; overlay = RGBA image drawn
+        on top of every panel. Returns (figure, images by panel name).
+        """
+        n_intervals = panels[0][1].shape[1] if panels else (24 * 60) // self.sim.get_interval()
+        n_rows = max(-(-len(panels) // HEATMAP_COLUMNS), 1)
+        fig = Figure(figsize=(12, 1.6 * n_rows + 1), dpi=100)
+        ax = fig.add_axes((0.05, 0.5 / (1.6 * n_rows + 1), 0.83, 1 - 1.3 / (1.6 * n_rows + 1)))
+        ax.set_axis_off()
+
+        width, height = 1.0, 7 / n_intervals * 4        # panel size in data units (weekdays stretched)
+        gap_x, gap_y = 0.08, 0.35 * height
+
+        images = {}
+        for i, ((name, values), norm) in enumerate(zip(panels, norms)):
+            row, col = divmod(i, HEATMAP_COLUMNS)
+            left, top = col * (width + gap_x), row * (height + gap_y)
+            extent = (left, left + width, top + height, top)
+            images[name] = ax.imshow(values, aspect='auto', interpolation='nearest', cmap=cmap, norm=norm, extent=extent)
+            if overlay is not None:
+                ax.imshow(overlay, aspect='auto', interpolation='nearest', extent=extent, gid="schedule")
+            ax.text(left, top - 0.04 * height, name, fontsize=10, va='bottom')
+            if col == 0:
+                for d, day in enumerate(self.weekday_order):
+                    ax.text(left - 0.01, top + (d + 0.5) * height / 7, day[:3], fontsize=7, ha='right', va='center')
+            if i + HEATMAP_COLUMNS >= len(panels):
+                for hour in range(0, 24, 6):
+                    ax.text(left + hour / 24 * width, top + height * 1.04, f"{hour:02d}:00", fontsize=7, ha='center', va='top')
+
+        ax.set_xlim(-gap_x, HEATMAP_COLUMNS * (width + gap_x))
+        ax.set_ylim(n_rows * (height + gap_y), -gap_y)
+        return fig, images
+
+    def _schedule_overlay(self, mask, n_intervals):
+        # RGBA image that tints the shutdown intervals and is transparent elsewhere
+        overlay = np.zeros((7, n_intervals, 4))
+        if mask is not None:
+            overlay[np.asarray(mask, dtype=bool)] = SCHEDULE_OVERLAY
+        return overlay
+
+    def update_heatmap_schedule(self, fig, mask):
+        """
+        Redraws the shutdown schedule overlay of a figure from plot_weekly_heatmaps.
+        """
+        for ax in fig.axes:
+            overlay = None
+            for image in ax.get_images():
+                if image.get_gid() == "schedule":
+                    if overlay is None:
+                        overlay = self._schedule_overlay(mask, image.get_array().shape[1])
+                    image.set_data(overlay)
+        if fig.canvas is not None:
+            fig.canvas.draw_idle()
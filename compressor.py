@@ -1,22 +1,140 @@
+import io
+import os
+import re
+import copy
 import warnings
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 from pandas.errors import DtypeWarning
+from ingest import (open_source, split_source, complete_length, make_checkpoint, read_appended, find_first_day,
+                    split_lines, source_name, file_stamp)
+from formats import detect_format, get_format
+from sketch import BucketHistogram
+from load_states import analyze_states, merge_states
+from pyramid import TracePyramid
+from quality import scan_quality, merge_quality, MAX_AMPS
 
 
 # CONSTANTS
 SQRT_3 = 1.732050808
 PF = 0.90 # an estimated power factor for air compressors
+RUN_THRESHOLD = 0.05 # fraction of the compressor's maximum power treated as running
+PARSE_CHUNK_ROWS = 500_000 # rows read between cancellation checks
+PARALLEL_MIN_BYTES = 256 << 20      # plain files at least this large are parsed by several processes
+PARALLEL_RANGE_BYTES = 64 << 20     # smallest byte range given to one parse process
+KW_TOTAL_PATTERN = r"(?<![a-z0-9])(total|sum|3 ?ph(ase)?|three phase)(?![a-z])"     # kW column logging all phases together
+KW_PHASE_PATTERN = r"(?<![a-z0-9])(l ?[123]|ph(ase)?[ _-]?[123abc]|[abc])(?![a-z0-9])"  # kW column logging one phase
+
+class ParseCancelled(Exception):
+    """
+    Raised by parse_logger_file when its cancel event is set.
+    """
+
+def parse_logger_file(source, cancel_event=None):
+    """
+    Reads every usable channel (per-phase amps, measured kW, measured PF) of a
+    logger file in a single pass. This is the expensive, simulation independent
+    part of ingest, so it can run ahead of time in the background.
+    Returns {"channels": LoggerFormat.find_channels result, "df": data frame with a
+    'DateTime' column and the channel columns, rows without a valid time dropped,
+    "invalid_times": number of rows dropped, "end_offset": bytes of complete
+    lines read (None for compressed files)}.
+    cancel_event = optional threading.Event checked between chunks of rows
+    """
+    end_offset = complete_length(source)    # measured first, the logger may still be appending
+    with open_source(source) as stream:
+        channels = _find_file_channels(stream, source)
+    with open_source(source) as stream:    # streams compressed files, nothing is extracted
+        df, invalid_times = _read_channels(stream, channels, source, cancel_event)
+
+    # check that df is valid
+    if df.empty:
+        raise ValueError("DataFrame is empty after dropping rows with invalid dates.")
+    return {"channels": channels, "df": df, "invalid_times": invalid_times, "end_offset": end_offset}
+
+def parse_appended_rows(source, checkpoint):
+    """
+    Reads only the rows appended to a plain logger file since a checkpoint (see
+    ingest.make_checkpoint). Returns the same dict as parse_logger_file (the
+    frame may be empty), or None when the file must be read in full again.
+    """
+    appended = read_appended(source, checkpoint)
+    if appended is None:
+        return None
+    header, data, end_offset = appended
+    channels = _find_file_channels(io.BytesIO(header + data), source)
+    df, invalid_times = _read_channels(io.BytesIO(header + data), channels, source)
+    return {"channels": channels, "df": df, "invalid_times": invalid_times, "end_offset": end_offset}
+
+def _find_file_channels(stream, source):
+    # peek at the header row (and the first data row) to find the logger format and its columns
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DtypeWarning)
+        df_sample = pd.read_csv(stream, nrows=1, dtype=str, keep_default_na=False)
+    columns = list(df_sample.columns)
+    logger_format = detect_format(columns, df_sample.iloc[0].tolist() if len(df_sample) else None)
+    if logger_format is None:
+        raise ValueError(f"Unrecognized logger format in {source}: no known time column")
+    channels = logger_format.find_channels(columns)
+    if not channels["amps"] and not channels["kw"]:
+        raise ValueError(f"No amp or kW columns found in {source}")
+    channels["kw"] = select_kw_columns(channels["kw"], source)
+    return channels
+
+def select_kw_columns(columns, source):
+    """
+    Picks the kW columns that add up to the compressor's power: a column named
+    as a total on its own, otherwise the per-phase columns (L1 / L2 / L3, A / B / C,
+    Ph1 ...) to be summed, otherwise a single kW column. Other columns such as
+    averages or demand are left out. Raises ValueError when several kW columns
+    are none of these.
+    """
+    if len(columns) < 2:
+        return list(columns)
+    totals = [col for col in columns if re.search(KW_TOTAL_PATTERN, col.lower())]
+    if totals:
+        return totals[:1]
+    phases = [col for col in columns if re.search(KW_PHASE_PATTERN, col.lower())]
+    if phases:
+        return phases
+    raise ValueError(f"Cannot tell which kW column of {source} to use: {', '.join(columns)}")
+
+def _read_channels(stream, channels, source, cancel_event=None):
+    # read csv (only necessary columns, all channels in one read)
+    # returns (data frame, number of rows dropped for a missing or unreadable time)
+    time_col = channels["time"]
+    cols = [time_col] + channels["amps"] + channels["kw"]
+    if channels["pf"]:
+        cols.append(channels["pf"])
+    chunks = []
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DtypeWarning)
+        for chunk in pd.read_csv(stream, usecols=cols, dtype={time_col: str}, chunksize=PARSE_CHUNK_ROWS):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ParseCancelled(source)
+            chunks.append(chunk)
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0] if chunks else pd.DataFrame(columns=cols)
+
+    # add DateTime column (exact parser of the logger format) and drop rows missing date time info
+    df['DateTime'] = get_format(channels["format"]).parse_times(df[time_col])
+    invalid_times = int(df['DateTime'].isna().sum())
+    return df.drop(columns=time_col).dropna(subset=['DateTime']), invalid_times   # drop invalid date-time columns
 
 class Compressor:
     """
     Compressor class stores data for each compressor in the system including
     the compressor name, voltage, and it's power values.
     """
-    def __init__(self, name, simulation, voltage, file_path):
+    def __init__(self, name, simulation, voltage, file_path, phase_mode="mean", state_thresholds=None):
         self.name = name        # name of the compressor    
         self.voltage = voltage  # voltage for compressor
-        self.file_path = file_path     # file path for compressor data
+        self.file_path = file_path     # file path for compressor data (or "archive.zip::member.csv")
         self.current_column = ""                # stores the name of the current column as a string
+        self.channels = {"amps": [], "kw": [], "pf": None}     # logger channels found in the file
+        self.phase_mode = phase_mode    # "mean" or "per-phase" reduction of multi-phase amp columns
+        self.measured_kw = False        # True when power comes from logged kW instead of amps
         self.sim = simulation           # reference to the simulation this compressor belongs to
 
         """
@@ -33,6 +151,27 @@ class Compressor:
         self.data = dict(dict())    # compressor power data
         self.df = pd.DataFrame()    # compressor pandas data frame
 
+        # per-date accumulators (dates x intervals), filled by compute_power
+        self.dates = np.array([], dtype='datetime64[D]')   # each logged date
+        self.date_sums = np.zeros((0, 0))                   # sum of power basis per date / interval
+        self.date_counts = np.zeros((0, 0))                 # sample count per date / interval
+        self.day_type_data = {}     # day type -> interval -> kW, filled by Simulation.cluster_day_types
+        self.phase_data = {}        # phase column -> day -> interval -> amps (per-phase mode only)
+
+        # per-minute accumulators for peak demand, filled by compute_power
+        self.minute_start = None                # datetime64[m] of the first minute
+        self.minute_sums = np.zeros(0)          # sum of power basis per minute
+        self.minute_counts = np.zeros(0)        # sample count per minute
+        self.sketch = None      # BucketHistogram of power per (weekday, interval), filled by compute_power
+        self.state_thresholds = state_thresholds    # (off, loaded) amps, None to derive from the amp histogram
+        self.load_states = {}   # load state / duty cycle summary, filled by compute_power
+        self.trace_pyramid = TracePyramid()     # min/max pyramid of the raw trace, filled by compute_power
+        self.trace_unit = "A"                   # unit of the raw trace ("A", or "kW" for kW-only loggers)
+        self.checkpoint = None  # how far the source was read (ingest.make_checkpoint plus settings), None if it cannot be resumed
+        self.quality = {}       # data quality scan of the logged rows (quality.scan_quality), filled by compute_power
+        self.source_stamp = None    # ingest.file_stamp of the source when compute_power read it
+        self.ingest_key = None      # _ingest_settings plus the collected date the accumulators were built with
+
     def get_name(self):
         """
         Returns compressor name
@@ -42,6 +181,36 @@ class Compressor:
     def get_data(self):
         return self.data
 
+    def get_day_type_data(self):
+        return self.day_type_data
+
+    def get_phase_data(self):
+        return self.phase_data
+
+    def get_profile_array(self):
+        """
+        Returns the weekday power data as a 7 x intervals numpy array (Monday first).
+        """
+        return np.array([list(intervals.values()) for intervals in self.data.values()], dtype=float)
+
+    def get_date_profiles(self):
+        """
+        Returns (dates, profiles) where profiles is a dates x intervals array of
+        average kW. Intervals with no samples are NaN.
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_power = self.date_sums / self.date_counts
+        return self.dates, self._to_kw(mean_power)
+
+    def _to_kw(self, power):
+        """
+        Converts values of the 'Power' basis to kW. Measured kW is used as is;
+        amps * PF is converted with the compressor voltage.
+        """
+        if self.measured_kw:
+            return power
+        return power * self.voltage * SQRT_3 / 1000
+
     def set_file_path(self, path):
         """
         Sets the file path for this compressor.
@@ -59,33 +228,121 @@ class Compressor:
     def build_df(self):
         """
         Builds the dataframe for this compressor and trims it.
+        The parsed file comes from the simulation's parse cache (parsed in the
+        background when the file was selected, or here if it was not), then the
+        channels are reduced to a 'Power' column, where kW = Power * kW scale.
         """
-        cols = ['Date-Time (EDT)']  # columns to read
+        parsed = self.sim.parse_cache.get(self.file_path)
+        self.channels = parsed["channels"]
+        self.current_column = (self.channels["amps"] or self.channels["kw"])[0]
+        self.df, first_later = self._trim(parsed["df"])
+        self.quality = {"invalid_times": parsed["invalid_times"]}     # the scan adds the rest once the frame is reduced
 
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", DtypeWarning)
-            df_sample = pd.read_csv(self.file_path, nrows=1)  # peek to get full column names
-            amp_col = next((col for col in df_sample.columns if "amp" in col.lower()), None)
-            # find amp columns
-            if amp_col:
-                self.current_column = amp_col
-                cols.append(amp_col)
-            # read csv (only necessary columns)
-            self.df = pd.read_csv(self.file_path, usecols=cols, parse_dates=['Date-Time (EDT)'])
-        
-        # add DateTime column to data frame and drop rows missing date time info
-        self.df['DateTime'] = pd.to_datetime(self.df['Date-Time (EDT)'], format='%m/%d/%Y %H:%M:%S')
-        self.df.dropna(subset=['DateTime'], inplace=True)   # drop invalid date-time columns
+        last_time = self.df['DateTime'].max() if not self.df.empty else None
+        self.checkpoint = self._make_checkpoint(first_later, 0, parsed["end_offset"], last_time)
+        self._reduce_channels()
 
-        # check that df is valid
-        if self.df.empty:
-            raise ValueError("DataFrame is empty after dropping rows with invalid dates.")
-
-        # trim df for deploy date, collected date
+    def _trim(self, df, after=None):
+        """
+        Trims a parsed frame to the dates between the deployed and collected dates
+        (a copy, the cached frame is reused) and, with after, to rows logged after
+        that time. Returns (trimmed frame, date of the first row on or after the
+        collected date, or None).
+        """
         deployed_dt = pd.to_datetime(self.sim.get_deployed_date()).date()
         collected_dt = pd.to_datetime(self.sim.get_collected_date()).date()
-        mask = (self.df['DateTime'].dt.date > deployed_dt) & (self.df['DateTime'].dt.date < collected_dt)
-        self.df = self.df.loc[mask]
+        dates = df['DateTime'].dt.date
+        mask = (dates > deployed_dt) & (dates < collected_dt)
+        if after is not None:
+            mask &= df['DateTime'] > after
+        later = dates >= collected_dt
+        first_later = dates[later].iloc[0] if later.any() else None
+        return df.loc[mask].copy(), first_later
+
+    def _ingest_settings(self):
+        # inputs the accumulators depend on; a run can only resume an earlier run with the same ones.
+        # The voltage is not one: accumulators stay in the power basis and are converted to kW on read
+        return [self.sim.get_interval(), self.sim.get_deployed_date(), self.phase_mode,
+                list(self.state_thresholds) if self.state_thresholds else None]
+
+    def _ingest_key(self):
+        return self._ingest_settings() + [str(pd.to_datetime(self.sim.get_collected_date()).date())]
+
+    def _make_checkpoint(self, first_later, start, end_offset, last_time):
+        """
+        Checkpoint of the rows read from the source (from byte start to end_offset).
+        Rows on or after the collected date (the first on date first_later) were
+        trimmed, so a later run resumes at the first of them and picks them up if
+        the collected date moves.
+        """
+        if end_offset is None or last_time is None:
+            return None
+        offset = end_offset
+        if first_later is not None:
+            offset = find_first_day(self.file_path, first_later, start, end_offset, get_format(self.channels["format"]))
+            if offset is None:
+                return None
+        checkpoint = make_checkpoint(self.file_path, offset, last_time.to_pydatetime())
+        if checkpoint is not None:
+            checkpoint["settings"] = self._ingest_settings()
+            checkpoint["collected_date"] = str(pd.to_datetime(self.sim.get_collected_date()).date())
+        return checkpoint
+
+    def _reduce_channels(self, pf_percent=None):
+        """
+        Reduces the channel columns of the data frame to a single 'Power' column.
+        Measured kW (summed over phases) is used when logged, otherwise the mean
+        phase current times the measured PF (or the estimated PF constant).
+        pf_percent = whether PF is logged as a percentage, None to detect it from the data
+        """
+        self.measured_kw = bool(self.channels["kw"])
+        if self.measured_kw:
+            # sum of per-phase power; NaN only if every phase is missing
+            self.df['Power'] = self.df[self.channels["kw"]].sum(axis=1, min_count=1)
+            if self.channels["amps"]:
+                self.df['Amps'] = self.df[self.channels["amps"]].mean(axis=1)
+            return
+
+        amps = self.df[self.channels["amps"]].to_numpy(dtype=float)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)     # all-NaN rows stay NaN
+            mean_amps = np.nanmean(amps, axis=1)
+        self.df['Amps'] = mean_amps
+
+        if self.channels["pf"]:
+            power_factor = self.df[self.channels["pf"]].to_numpy(dtype=float)
+            if pf_percent is None:
+                pf_percent = _pf_is_percent(power_factor)
+            if pf_percent:
+                power_factor = power_factor / 100   # logged as a percentage
+            power_factor = np.where(np.isnan(power_factor), PF, np.clip(power_factor, 0.0, 1.0))
+        else:
+            power_factor = PF
+        self.df['Power'] = mean_amps * power_factor
+
+        if self.phase_mode == "per-phase" and len(self.channels["amps"]) > 1:
+            self._compute_phase_data(amps)
+
+    def _compute_phase_data(self, amps):
+        """
+        Fills the per-phase data dictionary with the average current of every
+        phase column by weekday and interval.
+        """
+        interval = self.sim.get_interval()
+        n_intervals = (24 * 60) // interval
+        times = self.df['DateTime']
+        flat = times.dt.dayofweek.to_numpy() * n_intervals + (times.dt.hour * 60 + times.dt.minute).to_numpy() // interval
+
+        weekdays = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        intervals = [f"{h:02d}:{m:02d}" for h in range(24) for m in range(0, 60, interval)]
+        self.phase_data = {}
+        for col, values in zip(self.channels["amps"], amps.T):
+            valid = ~np.isnan(values)
+            sums = np.bincount(flat[valid], weights=values[valid], minlength=7 * n_intervals)
+            counts = np.bincount(flat[valid], minlength=7 * n_intervals)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means = np.where(counts > 0, np.round(sums / counts, 2), 0.0).reshape(7, n_intervals)
+            self.phase_data[col] = {day: dict(zip(intervals, row.tolist())) for day, row in zip(weekdays, means)}
     
     def destroy_df(self):
         """
@@ -96,41 +353,448 @@ class Compressor:
         except AttributeError:
             raise RuntimeError("Data Frame Does Not Exist")
 
-    def compute_power(self):
+    def compute_power(self, workers=None):
         """
-        Computes the power buckets and fills data dictionary.
+        Computes the power buckets and fills data dictionary. Ingest runs in stages,
+        each redone only when its own inputs change:
+            parse  : the source file (sim.parse_cache, or rows appended since a checkpoint)
+            trim   : deployed / collected dates
+            bucket : interval, phase mode and load state thresholds (the accumulators)
+            kW     : voltage, applied when the accumulators are read
+        Savings and plots (tariff, schedules) are computed from the profiles by Analyzer.
+        So an earlier run over the same unchanged source with the same dates and
+        bucket inputs is taken over as is; one that can be resumed only reads the
+        rows appended since; otherwise the (cached) parse is trimmed and bucketed again.
+        workers = parse processes for large plain files (None for one per CPU, 0 or 1 for none)
         """
-        # build the data frame and add columns needed for power computations
-        self.build_df()
-        self.df['WeekdayName'] = self.df['DateTime'].dt.day_name()
-        floor_str = f"{self.sim.get_interval()}min"  # for df interval building
-        self.df['Interval'] = self.df['DateTime'].dt.floor(floor_str).dt.strftime('%H:%M')
+        previous = self.sim.ingested.get(self.file_path)
+        if previous is not None and previous is not self and (self._reuse_power(previous) or self._append_power(previous)):
+            self.sim.parse_cache.cancel(self.file_path)
+            return
 
-        # compute and fill dict
-        self.construct_data()  # initialize data dictionary
+        self.source_stamp = file_stamp(self.file_path)      # taken first: a file changed while it is read is read again next run
+        self.ingest_key = self._ingest_key()
+        parts = self._parallel_parts(workers)
+        if parts > 1:
+            # per-date / per-minute sums come from the parse processes, the compact frame stays here
+            self._parse_ranges(parts)
+        else:
+            # build the data frame and add columns needed for power computations
+            self.build_df()
 
-        # group by weekday and interval, then compute the mean current
-        grouped = self.df.groupby(['WeekdayName', 'Interval'])[self.current_column].mean().reset_index()
+            # accumulate power sums / counts into a dates x intervals matrix
+            self._accumulate_dates()
+            self._accumulate_minutes()     # minute series for peak demand, from the same frame
+        self._accumulate_sketch()      # per-bucket distributions, from the same frame
+        self._analyze_load_states()    # off / unloaded / loaded classification, from the same frame
+        self._build_trace_pyramid()    # raw trace for the trace explorer, from the same frame
+        self._scan_quality()           # gaps, duplicates, flatlines, bad readings and bucket coverage, from the same frame
+        self.build_profiles()
 
-        # convert average current to power in kW
-        grouped['Power_kW'] = (grouped[self.current_column] * self.voltage * SQRT_3 * PF / 1000).round(2)
+        # free memory: the full parsed frame is not needed again, a rerun reuses or resumes this ingest
+        self.destroy_df()
+        self.sim.parse_cache.cancel(self.file_path)
 
-        # convert grouped data to nested dictionary (day -> interval -> power_kw)
-        nested_dict = (
-            grouped
-            .set_index(['WeekdayName', 'Interval'])['Power_kW']
-            .unstack(fill_value=0)  # missing intervals will get 0
-            .to_dict(orient='index')
-        )
+    def _parallel_parts(self, workers):
+        """
+        Returns the number of byte ranges to parse the source in: one (serial)
+        unless it is a large plain file that the parse cache does not already hold.
+        """
+        workers = (os.cpu_count() or 1) if workers is None else workers
+        if workers < 2 or self.phase_mode == "per-phase" or self.sim.parse_cache.status(self.file_path) == "ready":
+            return 1
+        size = complete_length(self.file_path)
+        if size is None or size < PARALLEL_MIN_BYTES:
+            return 1
+        return int(min(workers, size // PARALLEL_RANGE_BYTES))
+
+    def _parse_ranges(self, parts):
+        """
+        Parses the source in byte ranges on worker processes. Each worker trims
+        and reduces its rows and bins them into per-date and per-minute sums.
+        Ranges never share an interval, so the merged sums equal the serial ones
+        exactly. Workers also return the compact time / power / amps columns,
+        which become the data frame for the passes over the whole trace in order
+        (sketch, load states, trace pyramid).
+        """
+        self.sim.parse_cache.cancel(self.file_path)     # a background parse of the same file would compete for the cores
+        end_offset = complete_length(self.file_path)
+        header, ranges = split_lines(self.file_path, parts, self.sim.get_interval())
+        with open_source(self.file_path) as stream:
+            self.channels = _find_file_channels(stream, self.file_path)
+        self.current_column = (self.channels["amps"] or self.channels["kw"])[0]
+        settings = (self.file_path, header, self.channels, self.sim.get_interval(), self.sim.get_deployed_date(), self.sim.get_collected_date())
+
+        # spawned, not forked: runs are started from the interface's worker thread
+        with ProcessPoolExecutor(max_workers=len(ranges), mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_parse_range, [(settings, start, stop, None) for start, stop in ranges]))
+            # PF in percent is detected over the whole file, redo ranges that decided otherwise on their own
+            percent = any(result["pf_percent"] for result in results)
+            redo = [i for i, result in enumerate(results) if result["pf_percent"] is not None and result["pf_percent"] != percent]
+            for i, result in zip(redo, pool.map(_parse_range, [(settings, *ranges[i], percent) for i in redo])):
+                results[i] = result
+
+        self.dates, self.date_sums, self.date_counts = results[0]["dates"]
+        self.minute_start, self.minute_sums, self.minute_counts = results[0]["minutes"]
+        for result in results[1:]:
+            self.dates, self.date_sums, self.date_counts = _merge_dates((self.dates, self.date_sums, self.date_counts), result["dates"])
+            self.minute_start, self.minute_sums, self.minute_counts = _merge_minutes(
+                (self.minute_start, self.minute_sums, self.minute_counts), result["minutes"])
+
+        self.measured_kw = bool(self.channels["kw"])
+        self.df = pd.DataFrame({name: np.concatenate([result[name] for result in results])
+                                for name in results[0]["columns"]})
+        self.quality = {"invalid_times": sum(result["invalid_times"] for result in results)}
+
+        first_later = next((result["first_later"] for result in results if result["first_later"] is not None), None)
+        last_time = self.df['DateTime'].max() if not self.df.empty else None
+        self.checkpoint = self._make_checkpoint(first_later, 0, end_offset, last_time)
+        print(f"Parsed {source_name(self.file_path)} in {len(ranges)} parts")
+
+    def _reuse_power(self, previous):
+        """
+        Takes over the accumulators of an earlier run over the same source when
+        neither the file nor any input of the parse, trim and bucket stages
+        changed (a new name, voltage or tariff only). Nothing is read. Returns
+        False, having changed nothing, otherwise.
+        """
+        if (previous.ingest_key is None or previous.ingest_key != self._ingest_key() or not previous.quality
+                or previous.source_stamp is None or previous.source_stamp != file_stamp(self.file_path)
+                or not self._can_convert(previous)):
+            return False
+        self.channels = previous.channels
+        self.current_column = previous.current_column
+        self.measured_kw = previous.measured_kw
+        self.trace_unit = previous.trace_unit
+        self.dates, self.date_sums, self.date_counts = previous.dates, previous.date_sums, previous.date_counts
+        self.minute_start, self.minute_sums, self.minute_counts = previous.minute_start, previous.minute_sums, previous.minute_counts
+        self.sketch, self.trace_pyramid, self.quality = previous.sketch, previous.trace_pyramid, previous.quality
+        self.load_states = self._converted_states(previous)
+        self.phase_data = previous.phase_data
+        self.checkpoint, self.source_stamp, self.ingest_key = previous.checkpoint, previous.source_stamp, previous.ingest_key
+        self.build_profiles()
+        print(f"Reused the ingest of {source_name(self.file_path)}")
+        return True
+
+    def _can_convert(self, previous):
+        # whether kW values of an earlier run can be converted to this compressor's voltage
+        return previous.measured_kw or previous._to_kw(1.0) != 0
 
-        # update self.data with calculated power values
-        for day, interval_dict in nested_dict.items():
-            if day in self.data:
-                self.data[day].update(interval_dict)
+    def _converted_states(self, previous):
+        """
+        Load states of an earlier run with their kWh converted from its voltage to
+        this compressor's. Only the kWh depend on the voltage: the thresholds are
+        in the trace unit (amps, or logged kW) and the hours are logged time, so
+        both carry over unchanged.
+        """
+        states = previous.load_states
+        if not states or previous.measured_kw or self.voltage == previous.voltage:
+            return states
+        scale = self._to_kw(1.0) / previous._to_kw(1.0)
+        return dict(states, unloaded_kwh=states["unloaded_kwh"] * scale,
+                    unloaded_kwh_by_bucket=states["unloaded_kwh_by_bucket"] * scale)
 
-        # free memory 
+    def _append_power(self, previous):
+        """
+        Starts from the accumulators of an earlier run over the same source and
+        folds in only the rows appended to the file since. Returns False, having
+        changed nothing, when the earlier run cannot be resumed: other settings,
+        an earlier collected date, per-phase data, no quality scan or a rewritten file.
+        """
+        checkpoint = previous.checkpoint
+        collected_dt = pd.to_datetime(self.sim.get_collected_date()).date()
+        if (checkpoint is None or previous.phase_data or not previous.quality or checkpoint["settings"] != self._ingest_settings()
+                or collected_dt < pd.to_datetime(checkpoint["collected_date"]).date() or not self._can_convert(previous)):
+            return False
+        stamp = file_stamp(self.file_path)
+        parsed = parse_appended_rows(self.file_path, checkpoint)
+        if parsed is None or parsed["channels"] != previous.channels:
+            return False
+
+        # new rows after the last one folded in, trimmed like build_df
+        df = parsed["df"]
+        last_time = pd.Timestamp(checkpoint["last_time"])
+        self.df, first_later = self._trim(df, after=last_time)
+
+        self.channels = previous.channels
+        self.current_column = previous.current_column
+        self.measured_kw = previous.measured_kw
+        self.trace_unit = previous.trace_unit
+        self.quality = {"invalid_times": parsed["invalid_times"]}
+        previous_states = self._converted_states(previous)
+        if not self.df.empty:
+            last_time = max(last_time, self.df['DateTime'].max())
+            self._reduce_channels()
+            self._fold_rows(previous, previous_states)
+        else:
+            self.dates, self.date_sums, self.date_counts = previous.dates, previous.date_sums, previous.date_counts
+            self.minute_start, self.minute_sums, self.minute_counts = previous.minute_start, previous.minute_sums, previous.minute_counts
+            self.sketch, self.load_states, self.trace_pyramid = previous.sketch, previous_states, previous.trace_pyramid
+            self.quality = merge_quality(previous.quality, self.quality)
+        self.checkpoint = self._make_checkpoint(first_later, checkpoint["offset"], parsed["end_offset"], last_time)
+        self.source_stamp, self.ingest_key = stamp, self._ingest_key()
+        self.build_profiles()
+        print(f"Read {len(df)} appended rows of {source_name(self.file_path)}")
+
+        # free memory
         self.destroy_df()
-        del grouped
+        return True
+
+    def _fold_rows(self, previous, previous_states):
+        """
+        Accumulates the rows of the data frame on their own, then merges them into
+        the accumulators of the earlier run (previous_states = its load states in
+        this compressor's kW). Load states of the new rows use the earlier run's
+        thresholds; quality runs that cross the seam are cut in two.
+        """
+        self._accumulate_dates()
+        self.dates, self.date_sums, self.date_counts = _merge_dates(
+            (previous.dates, previous.date_sums, previous.date_counts), (self.dates, self.date_sums, self.date_counts))
+        self._accumulate_minutes()
+        self.minute_start, self.minute_sums, self.minute_counts = _merge_minutes(
+            (previous.minute_start, previous.minute_sums, previous.minute_counts), (self.minute_start, self.minute_sums, self.minute_counts))
+
+        self._accumulate_sketch()
+        if previous.sketch is not None:
+            sketch = copy.deepcopy(previous.sketch)
+            sketch.merge(self.sketch)
+            self.sketch = sketch
+
+        if previous_states:
+            self._analyze_load_states((previous_states["off_threshold"], previous_states["loaded_threshold"]))
+            self.load_states = merge_states(previous_states, self.load_states)
+        else:
+            self._analyze_load_states()
+
+        times, trace = self._trace()
+        self.trace_pyramid = previous.trace_pyramid.extend(times, trace)
+
+        self._scan_quality()
+        self.quality = merge_quality(previous.quality, self.quality)
+
+    def build_profiles(self):
+        """
+        Fills the weekday data dictionary from the per-date accumulators.
+        """
+        self.construct_data()
+
+        # weekday average = all samples on dates falling on that weekday
+        weekday_idx = (self.dates.astype('datetime64[D]').view('int64') - 4) % 7  # 1970-01-01 was a Thursday
+        n_intervals = (24 * 60) // self.sim.get_interval()
+        week_sums = np.zeros((7, n_intervals))
+        week_counts = np.zeros((7, n_intervals))
+        np.add.at(week_sums, weekday_idx, self.date_sums)
+        np.add.at(week_counts, weekday_idx, self.date_counts)
+        self._fill_data(self.data, week_sums, week_counts)
+
+    def _accumulate_dates(self):
+        """
+        Bins every sample of the data frame into per-date / per-interval sums and
+        counts of the power column in one vectorized pass.
+        """
+        interval = self.sim.get_interval()
+        n_intervals = (24 * 60) // interval
+
+        values = self.df['Power'].to_numpy(dtype=float)
+        times = self.df['DateTime']
+        valid = ~np.isnan(values)   # groupby().mean() skipped missing readings, so do we
+
+        days = times.dt.normalize().to_numpy().astype('datetime64[D]')[valid]
+        slots = ((times.dt.hour * 60 + times.dt.minute).to_numpy() // interval)[valid]
+        values = values[valid]
+
+        self.dates, date_idx = np.unique(days, return_inverse=True)
+        flat = date_idx * n_intervals + slots
+        size = len(self.dates) * n_intervals
+        self.date_sums = np.bincount(flat, weights=values, minlength=size).reshape(-1, n_intervals)
+        self.date_counts = np.bincount(flat, minlength=size).reshape(-1, n_intervals).astype(float)
+
+    def _accumulate_minutes(self):
+        """
+        Bins every sample into per-minute sums and counts of the power column.
+        Memory is one value per minute of the deployment, not per sample.
+        """
+        values = self.df['Power'].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        minutes = self.df['DateTime'].to_numpy().astype('datetime64[m]')[valid]
+        if not len(minutes):
+            self.minute_start, self.minute_sums, self.minute_counts = None, np.zeros(0), np.zeros(0)
+            return
+
+        self.minute_start = minutes.min()
+        offsets = (minutes - self.minute_start).astype('int64')
+        self.minute_sums = np.bincount(offsets, weights=values[valid])
+        self.minute_counts = np.bincount(offsets).astype(float)
+
+    def _accumulate_sketch(self):
+        """
+        Adds every sample to a fixed-bin histogram of its (weekday, interval) bucket.
+        """
+        interval = self.sim.get_interval()
+        n_intervals = (24 * 60) // interval
+        times = self.df['DateTime']
+        buckets = times.dt.dayofweek.to_numpy() * n_intervals + (times.dt.hour * 60 + times.dt.minute).to_numpy() // interval
+        self.sketch = BucketHistogram(7 * n_intervals)
+        self.sketch.add(buckets.astype(np.int64), self.df['Power'].to_numpy(dtype=float))
+
+    def _analyze_load_states(self, thresholds=None):
+        """
+        Classifies every sample as off / unloaded / loaded and summarizes duty
+        cycle, cycling and the energy used while running unloaded.
+        thresholds = (off, loaded) to use instead of the compressor's own
+        """
+        interval = self.sim.get_interval()
+        n_intervals = (24 * 60) // interval
+        times = self.df['DateTime']
+        buckets = times.dt.dayofweek.to_numpy() * n_intervals + (times.dt.hour * 60 + times.dt.minute).to_numpy() // interval
+        trace = self.df['Amps'] if 'Amps' in self.df else self.df['Power']
+        self.load_states = analyze_states(
+            times.to_numpy().astype('datetime64[ns]').astype(np.int64),
+            trace.to_numpy(dtype=float),
+            self._to_kw(self.df['Power'].to_numpy(dtype=float)),
+            buckets.astype(np.int64),
+            7 * n_intervals,
+            thresholds or self.state_thresholds
+        )
+
+    def _build_trace_pyramid(self):
+        """
+        Builds the min/max pyramid of the raw amp trace (or kW for kW-only loggers).
+        """
+        self.trace_unit = "A" if 'Amps' in self.df else "kW"
+        self.trace_pyramid = TracePyramid.build(*self._trace())
+
+    def _trace(self):
+        # (times in ns, values) of the raw trace: amps, or kW for kW-only loggers
+        trace = self.df['Amps'] if 'Amps' in self.df else self.df['Power']
+        return self.df['DateTime'].to_numpy().astype('datetime64[ns]').astype(np.int64), trace.to_numpy(dtype=float)
+
+    def _scan_quality(self):
+        """
+        Scans the raw trace of the data frame, in logged order, for data quality
+        problems and counts the samples of every (weekday, interval) bucket.
+        """
+        interval = self.sim.get_interval()
+        n_intervals = (24 * 60) // interval
+        times = self.df['DateTime']
+        buckets = times.dt.dayofweek.to_numpy() * n_intervals + (times.dt.hour * 60 + times.dt.minute).to_numpy() // interval
+        times_ns, trace = self._trace()
+        upper = MAX_AMPS if 'Amps' in self.df else np.inf   # no fixed limit on logged kW
+        self.quality.update(scan_quality(times_ns, trace, buckets.astype(np.int64), 7 * n_intervals, upper))
+
+    def get_coverage(self):
+        """
+        Returns a 7 x intervals array (Monday first) of the samples logged in
+        each bucket as a share of those expected: one sample per typical logging
+        step on every date between the deployed and collected dates. NaN before
+        the data is scanned.
+        """
+        n_intervals = (24 * 60) // self.sim.get_interval()
+        step = self.quality.get("typical_step_seconds")
+        if not step:
+            return np.full((7, n_intervals), np.nan)
+        deployed = np.datetime64(pd.to_datetime(self.sim.get_deployed_date()).date(), 'D')
+        collected = np.datetime64(pd.to_datetime(self.sim.get_collected_date()).date(), 'D')
+        days = np.arange(deployed + 1, collected, dtype='datetime64[D]')
+        days_per_weekday = np.bincount((days.view('int64') - 4) % 7, minlength=7)     # 1970-01-01 was a Thursday
+        expected = days_per_weekday[:, None] * (self.sim.get_interval() * 60 / step)
+        counts = self.quality["bucket_counts"].reshape(7, n_intervals)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(expected > 0, counts / expected, np.nan)
+
+    def print_quality(self, file):
+        """
+        Prints the data quality summary neatly to output file
+        """
+        quality = self.quality
+        if not quality.get("samples"):
+            return
+        file.write(f"{self.name} - Data Quality:\n")
+        file.write(f"   Samples: {quality['samples']} from {quality['first_time']} to {quality['last_time']}, "
+                   f"typical step {quality['typical_step_seconds']:g} s\n")
+        file.write(f"   Gaps: {quality['gap_count']} ({quality['gap_hours']:.2f} h, longest {quality['longest_gap_hours']:.2f} h)\n")
+        for start, end, hours in quality["gaps"]:
+            file.write(f"       {start} to {end}: {hours:.2f} h\n")
+        file.write(f"   Duplicate Times: {quality['duplicates']}, Out of Order Times: {quality['out_of_order']}, "
+                   f"Unreadable Times: {quality.get('invalid_times', 0)}\n")
+        file.write(f"   Flatlines: {quality['flatline_runs']} ({quality['flatline_hours']:.2f} h)\n")
+        file.write(f"   Missing Readings: {quality['missing']}, Negative: {quality['negative']}, Out of Range: {quality['out_of_range']}\n")
+        file.write('-'*160)
+        file.write("\n")  # space between compressors
+
+    def get_unloaded_kwh_profile(self):
+        """
+        Returns a 7 x intervals array of the average kWh used while running
+        unloaded in each interval of a day, Monday first.
+        """
+        n_intervals = (24 * 60) // self.sim.get_interval()
+        if not self.load_states:
+            return np.zeros((7, n_intervals))
+        totals = self.load_states["unloaded_kwh_by_bucket"].reshape(7, n_intervals)
+        days_logged = np.bincount((self.dates.view('int64') - 4) % 7, minlength=7)     # 1970-01-01 was a Thursday
+        return totals / np.maximum(days_logged, 1)[:, None]
+
+    def get_bucket_stats(self, run_threshold_kw=None):
+        """
+        Returns a dict of 7 x intervals kW arrays describing each bucket's
+        distribution: "p10", "p50", "p90", "max", plus "run_fraction", the share
+        of samples at or above run_threshold_kw (default RUN_THRESHOLD of the
+        compressor's maximum). Buckets without samples are NaN.
+        """
+        n_intervals = (24 * 60) // self.sim.get_interval()
+        if self.sketch is None or self.sketch.width is None:
+            empty = np.full((7, n_intervals), np.nan)
+            return {"p10": empty, "p50": empty, "p90": empty, "max": empty, "run_fraction": empty}
+
+        maxima = np.where(np.isfinite(self.sketch.maxima), self.sketch.maxima, np.nan)
+        if run_threshold_kw is None:
+            threshold = RUN_THRESHOLD * np.nanmax(maxima)
+        else:
+            threshold = run_threshold_kw / self._to_kw(1.0)    # kW back to the power basis
+        return {
+            "p10": self._to_kw(self.sketch.quantiles(0.10)).reshape(7, n_intervals),
+            "p50": self._to_kw(self.sketch.quantiles(0.50)).reshape(7, n_intervals),
+            "p90": self._to_kw(self.sketch.quantiles(0.90)).reshape(7, n_intervals),
+            "max": self._to_kw(maxima).reshape(7, n_intervals),
+            "run_fraction": self.sketch.fraction_above(threshold).reshape(7, n_intervals)
+        }
+
+    def get_minute_kw(self):
+        """
+        Returns (start, minute_kw) where minute_kw is the average kW of every
+        minute from start (datetime64[m]), NaN for minutes without samples.
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            minute_kw = self._to_kw(self.minute_sums / self.minute_counts)
+        return self.minute_start, minute_kw
+
+    def _fill_data(self, target, sums, counts):
+        """
+        Converts rows of power sums / counts into kW and writes them into a
+        nested day -> interval dictionary. Rows are matched to the keys of target in order.
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            power = np.round(self._to_kw(sums / counts), 2)
+        power = np.where(counts > 0, power, 0.0)    # missing intervals get 0
+        for day, row in zip(target, power):
+            target[day] = dict(zip(target[day].keys(), row.tolist()))
+
+    def compute_day_type_data(self, day_types, date_labels):
+        """
+        Builds the day type power dictionary from the per-date accumulators.
+        day_types = list of day type names
+        date_labels = dict of date (datetime64[D]) -> day type index
+        """
+        intervals = [f"{h:02d}:{m:02d}" for h in range(24) for m in range(0, 60, self.sim.get_interval())]
+        self.day_type_data = {name: dict.fromkeys(intervals, 0.0) for name in day_types}
+
+        labels = np.array([date_labels.get(d, -1) for d in self.dates], dtype=int)
+        keep = labels >= 0
+        type_sums = np.zeros((len(day_types), len(intervals)))
+        type_counts = np.zeros((len(day_types), len(intervals)))
+        np.add.at(type_sums, labels[keep], self.date_sums[keep])
+        np.add.at(type_counts, labels[keep], self.date_counts[keep])
+        self._fill_data(self.day_type_data, type_sums, type_counts)
 
     def print_data_all_days(self, file):
         """
@@ -147,3 +811,129 @@ class Compressor:
             file.write("\n")
         file.write('-'*160)
         file.write("\n")  # space between compressors
+
+    def print_load_states(self, file):
+        """
+        Prints the load state summary neatly to output file
+        """
+        states = self.load_states
+        if not states:
+            return
+        file.write(f"{self.name} - Load States:\n")
+        file.write(f"   Thresholds: off < {states['off_threshold']:.2f}, loaded >= {states['loaded_threshold']:.2f}\n")
+        file.write(f"   Off: {states['off_hours']:.2f} h, Unloaded: {states['unloaded_hours']:.2f} h, Loaded: {states['loaded_hours']:.2f} h\n")
+        file.write(f"   Duty Cycle (loaded / running): {states['duty_cycle'] * 100:.1f}%\n")
+        file.write(f"   Load Cycles per Running Hour: {states['cycles_per_hour']:.2f}\n")
+        file.write(f"   Starts: {states['starts']}, Average Loaded Run: {states['avg_loaded_run_minutes']:.1f} min\n")
+        file.write(f"   Energy Used Unloaded: {states['unloaded_kwh']:.2f} kWh\n")
+
+        # average energy used unloaded per weekday / interval
+        file.write("   Average Energy Used Unloaded by Interval:\n")
+        weekdays = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        intervals = [f"{h:02d}:{m:02d}" for h in range(24) for m in range(0, 60, self.sim.get_interval())]
+        for day, row in zip(weekdays, self.get_unloaded_kwh_profile()):
+            file.write(f"   {day}:\n")
+            for interval, value in zip(intervals, row):
+                file.write(f"       {interval}: {value:.3f} kWh\n")
+            file.write("\n")
+        file.write('-'*160)
+        file.write("\n")  # space between compressors
+
+    def print_phase_data(self, file):
+        """
+        Prints per-phase current dictionary neatly to output file
+        """
+        for phase, phase_days in self.phase_data.items():
+            file.write(f"{self.name} - {phase}:\n")
+            for day in phase_days:
+                file.write(f"   {day}:\n")
+                for interval, value in phase_days[day].items():
+                    file.write(f"       {interval}: {value:.2f} A\n")
+                file.write("\n")
+        file.write('-'*160)
+        file.write("\n")  # space between compressors
+
+    def print_data_day_types(self, file):
+        """
+        Prints day type data dictionary neatly to output file
+        """
+        file.write(f"{self.name}:\n") # write the compressor name
+
+        # write the compressor data
+        for day_type in self.day_type_data:
+            file.write(f"   {day_type}:\n")
+            for interval in self.day_type_data[day_type]:
+                value = self.day_type_data[day_type][interval]
+                file.write(f"       {interval}: {value:.2f} kW\n")
+            file.write("\n")
+        file.write('-'*160)
+        file.write("\n")  # space between compressors
+
+def _pf_is_percent(power_factor):
+    # PF logged as a percentage rather than a fraction
+    return np.nanmax(power_factor, initial=0.0) > 1.5
+
+def _parse_range(task):
+    """
+    Parse process side of Compressor._parse_ranges: parses, trims, reduces and
+    bins the rows of one byte range of a plain logger file.
+    """
+    from simulation import Simulation   # imported here, simulation imports this module
+    (source, header, channels, interval, deployed_date, collected_date), start, stop, pf_percent = task
+    sim = Simulation()
+    sim.interval, sim.deployed_date, sim.collected_date = interval, deployed_date, collected_date
+    comp = Compressor("", sim, 0, source)
+    comp.channels = channels
+
+    path, _ = split_source(source)
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(stop - start)
+    df, invalid_times = _read_channels(io.BytesIO(header + data), channels, source)
+    comp.df, first_later = comp._trim(df)
+
+    if pf_percent is None and channels["pf"] and not channels["kw"]:
+        pf_percent = bool(_pf_is_percent(comp.df[channels["pf"]].to_numpy(dtype=float)))
+    comp._reduce_channels(pf_percent)
+    comp._accumulate_dates()
+    comp._accumulate_minutes()
+
+    columns = ['DateTime', 'Power'] + (['Amps'] if 'Amps' in comp.df else [])
+    result = {name: comp.df[name].to_numpy() for name in columns}
+    result.update({
+        "columns": columns,
+        "dates": (comp.dates, comp.date_sums, comp.date_counts),
+        "minutes": (comp.minute_start, comp.minute_sums, comp.minute_counts),
+        "pf_percent": pf_percent,
+        "first_later": first_later,
+        "invalid_times": invalid_times
+    })
+    return result
+
+def _merge_dates(first, second):
+    # merges two (dates, sums, counts) per-date accumulators, adding dates logged in both
+    dates = np.union1d(first[0], second[0])
+    n_intervals = max(first[1].shape[1], second[1].shape[1])
+    sums = np.zeros((len(dates), n_intervals))
+    counts = np.zeros((len(dates), n_intervals))
+    for part_dates, part_sums, part_counts in (first, second):
+        rows = np.searchsorted(dates, part_dates)
+        sums[rows] += part_sums
+        counts[rows] += part_counts
+    return dates, sums, counts
+
+def _merge_minutes(first, second):
+    # merges two (start, sums, counts) per-minute accumulators
+    if first[0] is None:
+        return second
+    if second[0] is None:
+        return first
+    start = min(first[0], second[0])
+    offsets = [int((part[0] - start).astype('int64')) for part in (first, second)]
+    length = max(offset + len(part[1]) for offset, part in zip(offsets, (first, second)))
+    sums = np.zeros(length)
+    counts = np.zeros(length)
+    for offset, (_, part_sums, part_counts) in zip(offsets, (first, second)):
+        sums[offset:offset + len(part_sums)] += part_sums
+        counts[offset:offset + len(part_counts)] += part_counts
+    return start, sums, counts
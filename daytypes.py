@@ -0,0 +1,110 @@
+import numpy as np
+
+
+def kmeans(matrix, n_clusters, max_iter=100, seed=0):
+    """
+    Clusters the rows of a dates x intervals matrix with k-means.
+    Uses k-means++ seeding with a fixed seed so results are repeatable.
+    Returns an array with the cluster index of every row.
+    """
+    n_rows = matrix.shape[0]
+    rng = np.random.default_rng(seed)
+    sq_norms = np.einsum('ij,ij->i', matrix, matrix)
+
+    # k-means++ seeding
+    centers = [matrix[rng.integers(n_rows)]]
+    closest = np.full(n_rows, np.inf)
+    for _ in range(1, n_clusters):
+        closest = np.minimum(closest, ((matrix - centers[-1]) ** 2).sum(axis=1))
+        total = closest.sum()
+        pick = rng.choice(n_rows, p=closest / total) if total > 0 else rng.integers(n_rows)
+        centers.append(matrix[pick])
+    centers = np.array(centers)
+
+    labels = np.full(n_rows, -1)
+    for _ in range(max_iter):
+        # squared distances of every row to every center in one product
+        dist = sq_norms[:, None] - 2 * matrix @ centers.T + np.einsum('ij,ij->i', centers, centers)[None, :]
+        new_labels = dist.argmin(axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, matrix)
+        empty = counts == 0
+        centers[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            # re-seed empty clusters with the rows farthest from their center
+            far = np.argsort(dist[np.arange(n_rows), labels])[::-1][:empty.sum()]
+            centers[empty] = matrix[far]
+
+    return labels
+
+
+def hierarchical(matrix, n_clusters):
+    """
+    Clusters the rows of a dates x intervals matrix with agglomerative (Ward)
+    clustering. Distances are updated with the Lance-Williams formula, one
+    vectorized row update per merge.
+    Returns an array with the cluster index of every row.
+    """
+    n_rows = matrix.shape[0]
+    sq_norms = np.einsum('ij,ij->i', matrix, matrix)
+    dist = sq_norms[:, None] + sq_norms[None, :] - 2 * matrix @ matrix.T
+    dist = np.maximum(dist, 0.0) / 2     # Ward merge cost for singletons
+    np.fill_diagonal(dist, np.inf)
+
+    sizes = np.ones(n_rows)
+    active = np.ones(n_rows, dtype=bool)
+    members = np.arange(n_rows)     # representative cluster of every row
+
+    for _ in range(n_rows - n_clusters):
+        flat = np.argmin(dist)
+        a, b = divmod(flat, n_rows)
+        if a > b:
+            a, b = b, a
+
+        # Ward distance from the merged cluster (a + b) to every other cluster
+        size_a, size_b = sizes[a], sizes[b]
+        total = sizes + size_a + size_b
+        new_row = ((sizes + size_a) * dist[a] + (sizes + size_b) * dist[b] - sizes * dist[a, b]) / total
+        new_row[~active] = np.inf
+        new_row[a] = np.inf
+
+        dist[a, :] = new_row
+        dist[:, a] = new_row
+        dist[b, :] = np.inf
+        dist[:, b] = np.inf
+        sizes[a] += size_b
+        active[b] = False
+        members[members == b] = a
+
+    _, labels = np.unique(members, return_inverse=True)
+    return labels
+
+
+def cluster_dates(matrix, n_clusters, method="kmeans"):
+    """
+    Clusters a dates x intervals kW matrix into day types.
+    Missing intervals (NaN) are treated as 0 kW. Cluster indices are ordered
+    from the highest average load to the lowest.
+    """
+    matrix = np.nan_to_num(np.asarray(matrix, dtype=float))
+    n_clusters = max(1, min(int(n_clusters), matrix.shape[0]))
+
+    if method == "kmeans":
+        labels = kmeans(matrix, n_clusters)
+    elif method == "hierarchical":
+        labels = hierarchical(matrix, n_clusters)
+    else:
+        raise ValueError(f"Unknown clustering method: {method}")
+
+    # relabel so day type 1 is the highest load day type
+    n_found = labels.max() + 1
+    mean_load = np.bincount(labels, weights=matrix.mean(axis=1), minlength=n_found) / np.bincount(labels, minlength=n_found)
+    order = np.argsort(-mean_load)
+    remap = np.empty(n_found, dtype=int)
+    remap[order] = np.arange(n_found)
+    return remap[labels]
@@ -0,0 +1,78 @@
+"""
+Peak demand helpers. Compressors keep a minute-resolution power series (built
+during ingest, one value per minute regardless of the logger sample rate) and
+peaks are found with rolling-window averages over that series.
+"""
+import numpy as np
+
+def rolling_mean(minute_kw, window):
+    """
+    Rolling average of a minute kW series over window minutes, using cumulative
+    sums so every window is one subtraction. Missing minutes (NaN) are skipped;
+    windows with less than half their minutes logged are NaN.
+    The value at index i is the average of the window ending at minute i.
+    """
+    n = len(minute_kw)
+    result = np.full(n, np.nan)
+    if n < window:
+        return result
+
+    valid = ~np.isnan(minute_kw)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, minute_kw, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    window_sums = sums[window:] - sums[:-window]
+    window_counts = counts[window:] - counts[:-window]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result[window - 1:] = np.where(window_counts >= window / 2, window_sums / window_counts, np.nan)
+    return result
+
+def monthly_peaks(start, minute_kw, window):
+    """
+    Finds the highest rolling-window average kW in each billing month (calendar
+    months, by the minute the window ends).
+    start = datetime64[m] of the first minute of the series
+    Returns a dict of "YYYY-MM" -> {"peak_kw": float, "time": datetime64[m]}
+    """
+    averages = rolling_mean(minute_kw, window)
+    if not len(averages):
+        return {}
+    times = start + np.arange(len(averages)).astype('timedelta64[m]')
+    months = times.astype('datetime64[M]')
+
+    peaks = {}
+    # minutes are sorted, so each month is one contiguous block
+    boundaries = np.flatnonzero(np.concatenate(([True], months[1:] != months[:-1], [True])))
+    for first, last in zip(boundaries[:-1], boundaries[1:]):
+        block = averages[first:last]
+        if np.all(np.isnan(block)):
+            continue
+        best = first + int(np.nanargmax(block))
+        peaks[str(months[first])] = {"peak_kw": float(averages[best]), "time": times[best]}
+    return peaks
+
+def align_minutes(series):
+    """
+    Aligns several (start, minute_kw) series on one minute grid.
+    Returns (start, matrix) where matrix is series x minutes with NaN where a
+    series has no data.
+    """
+    series = [(start, kw) for start, kw in series if start is not None and len(kw)]
+    if not series:
+        return None, np.zeros((0, 0))
+    first = min(start for start, _ in series)
+    last = max(start + np.timedelta64(len(kw), 'm') for start, kw in series)
+    matrix = np.full((len(series), int((last - first) / np.timedelta64(1, 'm'))), np.nan)
+    for row, (start, kw) in enumerate(series):
+        offset = int((start - first) / np.timedelta64(1, 'm'))
+        matrix[row, offset:offset + len(kw)] = kw
+    return first, matrix
+
+def minute_slot_index(start, n_minutes, interval):
+    """
+    Returns (weekday, slot) arrays for every minute of a series, Monday = 0,
+    for looking minutes up in a 7 x intervals schedule mask.
+    """
+    minutes = start.astype('int64') + np.arange(n_minutes)     # minutes since 1970-01-01 (a Thursday)
+    weekday = (minutes // (24 * 60) + 3) % 7
+    slot = (minutes % (24 * 60)) // interval
+    return weekday, slot
@@ -17,6 +17,8 @@ class Exporter:
 
         for compressor in export_compressors:
             data = compressor.get_data() # current compressors data
+            if day in compressor.get_day_type_data():
+                data = compressor.get_day_type_data()   # clustered day type
             if day not in data:
                 continue
             for value in data[day].values():
@@ -41,6 +43,43 @@ class Exporter:
             sio = StringIO()
             compressor.print_data_all_days(sio)
             output.append(sio.getvalue())
+
+        # load state summaries
+        for compressor in self.sim.get_compressors():
+            sio = StringIO()
+            compressor.print_load_states(sio)
+            output.append(sio.getvalue())
+
+        # data quality summaries
+        for compressor in self.sim.get_compressors():
+            sio = StringIO()
+            compressor.print_quality(sio)
+            output.append(sio.getvalue())
+
+        # per-phase current data, for compressors reduced per phase
+        for compressor in self.sim.get_compressors():
+            if compressor.get_phase_data():
+                sio = StringIO()
+                compressor.print_phase_data(sio)
+                output.append(sio.getvalue())
+
+        # day type data, if the dates have been clustered
+        if self.sim.has_clustered_day_types():
+            output.append(self.get_day_type_summary_text())
+            for compressor in self.sim.get_compressors():
+                sio = StringIO()
+                compressor.print_data_day_types(sio)
+                output.append(sio.getvalue())
         return "\n".join(output)
-    
-    ### TODO : function that prints data to a different out.txt for data by day_types
\ No newline at end of file
+
+    def get_day_type_summary_text(self):
+        """
+        Returns a summary of each day type: dates per day type and days per year.
+        """
+        lines = ["Day Types:"]
+        for day_type, dates in self.sim.get_day_type_dates().items():
+            days_per_year = self.sim.get_day_type_days_per_year(day_type)
+            lines.append(f"   {day_type}: {len(dates)} logged dates, {days_per_year:.2f} days/year")
+            lines.append("       " + ", ".join(str(d) for d in dates))
+        lines.append('-'*160)
+        return "\n".join(lines) + "\n"
\ No newline at end of file
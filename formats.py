@@ -0,0 +1,190 @@
+"""
+Logger export formats. A format knows how to recognize a file from its header
+(and first data row), which column holds the time and the exact parser for
+it, and which columns are channels, so every supported logger goes through
+the same single pass ingest. Files are matched against FORMATS in order;
+other loggers are added with register_format.
+"""
+import re
+from datetime import datetime, timezone
+import pandas as pd
+from dateutil import tz
+
+SITE_TIMEZONE = None    # IANA name UTC and epoch times are converted to, None for this computer's time zone
+OFFSET_PATTERN = r"(?:[zZ]|[+-]\d\d:?\d\d)$"     # UTC designator or offset ending an ISO time
+CHANNEL_PATTERNS = {    # channel names, or units as in "I1 (A)" or "P Total [kW]"
+    "amps": r"amp|[(\[]a[)\]]",
+    "kw": r"\bkw\b",
+    "pf": r"^pf\b|power factor"
+}
+
+def find_channel_columns(columns, patterns=None):
+    """
+    Finds every logger channel we can use in a list of column names.
+    patterns = optional {"amps", "kw", "pf"} regular expressions (matched
+    case-insensitively anywhere in the name) replacing the name rules below.
+    Returns a dict with:
+        "amps" : list of current columns (one per phase)
+        "kw"   : list of measured power columns (one per phase or a single total)
+        "pf"   : measured power factor column, or None
+    """
+    amps, kw, pf = [], [], None
+    for col in columns:
+        name = col.lower()
+        if patterns is not None:
+            if re.search(patterns["amps"], name):
+                amps.append(col)
+            elif re.search(patterns["kw"], name):
+                kw.append(col)
+            elif pf is None and re.search(patterns["pf"], name):
+                pf = col
+        elif "amp" in name:
+            amps.append(col)
+        elif "kw" in name and not any(unit in name for unit in ("kwh", "kvar", "kva")):
+            kw.append(col)
+        elif pf is None and (name.split(" ")[0] == "pf" or "power factor" in name):
+            pf = col
+    return {"amps": amps, "kw": kw, "pf": pf}
+
+class LoggerFormat:
+    """
+    A logger export with local wall clock times in one exact strptime format.
+    time_pattern = regular expression the whole time column name matches (any case)
+    channel_patterns = find_channel_columns patterns, None for the name rules
+    """
+    def __init__(self, name, time_pattern, time_format, channel_patterns=None):
+        self.name = name
+        self.time_pattern = re.compile(time_pattern, re.IGNORECASE)
+        self.time_format = time_format
+        self.channel_patterns = channel_patterns
+
+    def time_column(self, columns):
+        # first column named like this format's time column, or None
+        return next((col for col in columns if self.time_pattern.fullmatch(str(col).strip())), None)
+
+    def detect(self, columns, row=None):
+        """
+        Returns True if a file with these header columns (and optionally its first
+        data row, as text) is in this format.
+        """
+        col = self.time_column(columns)
+        if col is None:
+            return False
+        index = list(columns).index(col)
+        if row is None or index >= len(row) or not str(row[index]).strip():
+            return True
+        return self.parse_time(str(row[index])) is not None
+
+    def find_channels(self, columns):
+        """
+        find_channel_columns result for a header, plus the "format" name and the
+        "time" column.
+        """
+        time_col = self.time_column(columns)
+        channels = find_channel_columns([col for col in columns if col != time_col], self.channel_patterns)
+        channels.update({"format": self.name, "time": time_col})
+        return channels
+
+    def parse_times(self, values):
+        # column of time text -> naive local datetimes, NaT where unreadable
+        return pd.to_datetime(values, format=self.time_format, errors='coerce')
+
+    def parse_time(self, text):
+        # one time text -> naive local datetime, or None
+        try:
+            return datetime.strptime(text.strip(), self.time_format)
+        except ValueError:
+            return None
+
+    def day_prefixes(self, day):
+        # byte strings a time field logged on day (a date) starts with
+        return [day.strftime(self.time_format.split(" ")[0]).encode() + b" "]
+
+class IsoFormat(LoggerFormat):
+    """
+    ISO 8601 times. Times with an offset are kept at the wall clock they were
+    logged in; UTC times ("Z") are converted to the site time zone.
+    """
+    def __init__(self, name, time_pattern, channel_patterns=None):
+        super().__init__(name, time_pattern, "ISO8601", channel_patterns)
+
+    def parse_times(self, values):
+        text = values.astype(str).str.strip()
+        times = pd.to_datetime(text.str.replace(OFFSET_PATTERN, "", regex=True), format="ISO8601", errors='coerce')
+        utc = text.str.endswith(("Z", "z")).to_numpy()
+        if utc.any():
+            times[utc] = _utc_to_site(times[utc])
+        return times
+
+    def parse_time(self, text):
+        text = text.strip()
+        try:
+            time = datetime.fromisoformat(re.sub(OFFSET_PATTERN, "", text))
+        except ValueError:
+            return None
+        if text.endswith(("Z", "z")):
+            time = _utc_to_site(pd.Series([time])).iloc[0].to_pydatetime()
+        return time
+
+    def day_prefixes(self, day):
+        return [day.isoformat().encode() + b"T", day.isoformat().encode() + b" "]
+
+class EpochFormat(LoggerFormat):
+    """
+    Unix times in seconds or milliseconds (told apart by size), converted
+    from UTC to the site time zone.
+    """
+    def __init__(self, name, time_pattern, channel_patterns=None):
+        super().__init__(name, time_pattern, None, channel_patterns)
+
+    def parse_times(self, values):
+        seconds = pd.to_numeric(values, errors='coerce')
+        seconds = seconds.where(seconds.abs() < 1e11, seconds / 1000)    # milliseconds
+        return _utc_to_site(pd.to_datetime(seconds, unit='s', errors='coerce'))
+
+    def parse_time(self, text):
+        try:
+            seconds = float(text)
+        except ValueError:
+            return None
+        if seconds != seconds or abs(seconds) >= 1e14:
+            return None
+        seconds = seconds / 1000 if abs(seconds) >= 1e11 else seconds
+        time = datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+        return _utc_to_site(pd.Series([time])).iloc[0].to_pydatetime()
+
+    def day_prefixes(self, day):
+        return []       # no date text to search for
+
+FORMATS = [
+    LoggerFormat("Date-Time", r"Date-Time \([^)]*\)", "%m/%d/%Y %H:%M:%S"),      # e.g. "Date-Time (EDT)"
+    LoggerFormat("HOBOware", r"Date Time, GMT[+-]\d\d:?\d\d", "%m/%d/%y %I:%M:%S %p"),
+    IsoFormat("ISO 8601", r"(Date[ _-]?Time|Time[ _-]?stamp|Time)( \(.*\))?", CHANNEL_PATTERNS),
+    EpochFormat("Unix Time", r"(Unix[ _-]?Time|Epoch|Time[ _-]?stamp)( \((s|ms|UTC)\))?", CHANNEL_PATTERNS)
+]
+
+def register_format(logger_format, first=False):
+    """
+    Adds a format to the registry (replacing one of the same name). first =
+    try it before the built in formats. Register at import time, so parse
+    processes started later know the format too.
+    """
+    FORMATS[:] = [fmt for fmt in FORMATS if fmt.name != logger_format.name]
+    FORMATS.insert(0 if first else len(FORMATS), logger_format)
+
+def get_format(name):
+    for fmt in FORMATS:
+        if fmt.name == name:
+            return fmt
+    raise ValueError(f"Unknown logger format {name}")
+
+def detect_format(columns, row=None):
+    """
+    Returns the first registered format matching a header (and optionally the
+    first data row, as text), or None.
+    """
+    return next((fmt for fmt in FORMATS if fmt.detect(columns, row)), None)
+
+def _utc_to_site(times):
+    # series of naive UTC datetimes -> naive wall clock of the site time zone
+    return times.dt.tz_localize("UTC").dt.tz_convert(SITE_TIMEZONE or tz.tzlocal()).dt.tz_localize(None)
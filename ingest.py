@@ -0,0 +1,293 @@
+"""
+File level helpers for reading logger exports. A source is a file path, or for
+multi-member zip archives "archive.zip::member.csv".
+"""
+import os
+import csv
+import gzip
+import hashlib
+import mmap
+import zipfile
+from contextlib import contextmanager
+from formats import detect_format
+
+MEMBER_SEP = "::"   # separates an archive path from the member inside it
+COMPRESSED_EXTENSIONS = (".gz", ".zip", ".zst")
+FINGERPRINT_BYTES = 1 << 20   # bytes hashed from each end of a file for its fingerprint
+SNIFF_BYTES = 64 * 1024       # bytes read from each end of a file to find its first / last time
+LOGGER_FILE_TYPES = [("Logger files", "*.csv *.gz *.zip *.zst"), ("CSV files", "*.csv"), ("Compressed files", "*.gz *.zip *.zst")]
+
+def make_source(path, member=None):
+    """
+    Builds a source string from a file path and an optional archive member.
+    """
+    return f"{path}{MEMBER_SEP}{member}" if member else path
+
+def split_source(source):
+    """
+    Splits a source string into (path, member). member is None for plain files.
+    """
+    if MEMBER_SEP in source:
+        path, member = source.split(MEMBER_SEP, 1)
+        return path, member
+    return source, None
+
+def source_exists(source):
+    """
+    Returns True if the file behind a source exists.
+    """
+    path, _ = split_source(source)
+    return os.path.isfile(path)
+
+def source_name(source):
+    """
+    Returns a short display name for a source (the member name for archives).
+    """
+    path, member = split_source(source)
+    return os.path.basename(member or path)
+
+def list_csv_members(path):
+    """
+    Returns the CSV members of a zip archive in archive order.
+    """
+    with zipfile.ZipFile(path) as archive:
+        return [info.filename for info in archive.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(".csv")]
+
+@contextmanager
+def open_source(source):
+    """
+    Opens a source as a binary stream, decompressing .gz, .zip and .zst on the
+    fly so nothing is extracted to disk and memory stays bounded by the parser.
+    """
+    path, member = split_source(source)
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext == ".gz":
+        with gzip.open(path, "rb") as stream:
+            yield stream
+
+    elif ext == ".zip":
+        with zipfile.ZipFile(path) as archive:
+            if member is None:
+                members = [info.filename for info in archive.infolist()
+                           if not info.is_dir() and info.filename.lower().endswith(".csv")]
+                if len(members) != 1:
+                    raise ValueError(f"{os.path.basename(path)} contains {len(members)} CSV files, select one member.")
+                member = members[0]
+            with archive.open(member) as stream:
+                yield stream
+
+    elif ext == ".zst":
+        try:
+            import zstandard    # listed in requirements.txt, imported only when a .zst file is read
+        except ImportError:
+            raise ImportError("Reading .zst files requires the 'zstandard' package (pip install zstandard).")
+        with open(path, "rb") as raw:
+            with zstandard.ZstdDecompressor().stream_reader(raw) as stream:
+                yield stream
+
+    else:
+        with open(path, "rb") as stream:
+            yield stream
+
+def file_stamp(source):
+    """
+    Returns the size and modification time of the file behind a source, or
+    None if it cannot be read. Cheaper than file_fingerprint (one stat call).
+    """
+    path, _ = split_source(source)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+def file_fingerprint(source):
+    """
+    Returns a cheap fingerprint of the file behind a source: its size plus a
+    hash of the first and last FINGERPRINT_BYTES. Changes when the file is
+    replaced, appended to or edited near either end, without reading it all.
+    """
+    path, _ = split_source(source)
+    size = os.path.getsize(path)
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        if size > FINGERPRINT_BYTES:
+            f.seek(max(size - FINGERPRINT_BYTES, FINGERPRINT_BYTES))
+            digest.update(f.read(FINGERPRINT_BYTES))
+    return {"size": size, "sha1": digest.hexdigest()}
+
+def sniff_time_span(source):
+    """
+    Returns (first, last) datetimes logged in a file, reading only the header
+    and the first and last data rows. Plain files seek straight to their last
+    SNIFF_BYTES, so the cost does not depend on file size; compressed streams
+    cannot seek and are decompressed (not parsed) to reach the end.
+    Returns None if the time column or a valid time cannot be found.
+    """
+    path, _ = split_source(source)
+    ext = os.path.splitext(path)[1].lower()
+    if ext in COMPRESSED_EXTENSIONS:
+        with open_source(source) as stream:
+            head = stream.read(SNIFF_BYTES)
+            tail, at_start = head, True
+            for block in iter(lambda: stream.read(FINGERPRINT_BYTES), b""):
+                tail, at_start = (tail + block)[-SNIFF_BYTES:], False
+    else:
+        with open(path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(size - SNIFF_BYTES, 0))
+            tail, at_start = f.read(), size <= SNIFF_BYTES
+
+    head_lines = head.decode("utf-8-sig", errors="replace").splitlines()
+    tail_lines = tail.decode("utf-8", errors="replace").splitlines()
+    if not head_lines:
+        return None
+    if len(head) == SNIFF_BYTES:
+        head_lines = head_lines[:-1]    # the last line may be cut off
+    if not at_start:
+        tail_lines = tail_lines[1:]     # so may the first
+
+    header = next(csv.reader([head_lines[0]]))
+    logger_format = detect_format(header, next(csv.reader(head_lines[1:2]), None))
+    if logger_format is None:
+        return None
+    col = header.index(logger_format.time_column(header))
+
+    first = _first_time(head_lines[1:], col, logger_format)
+    last = _first_time(reversed(tail_lines if not at_start else tail_lines[1:]), col, logger_format)
+    if first is None or last is None:
+        return None
+    return first, last
+
+def _first_time(lines, col, logger_format):
+    # first line (in the given order) with a valid time in column col
+    for row in csv.reader(lines):
+        if len(row) > col:
+            time = logger_format.parse_time(row[col])
+            if time is not None:
+                return time
+    return None
+
+def complete_length(source):
+    """
+    Returns the length in bytes of the complete lines of a plain file (a partly
+    written last line is left out), or None for compressed files and archive
+    members, which cannot be resumed part way.
+    """
+    path, member = split_source(source)
+    if member or os.path.splitext(path)[1].lower() in COMPRESSED_EXTENSIONS:
+        return None
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(size - SNIFF_BYTES, 0))
+        tail = f.read()
+    if tail.endswith(b"\n"):
+        return size
+    cut = tail.rfind(b"\n")
+    return size - len(tail) + cut + 1 if cut >= 0 else None
+
+def make_checkpoint(source, offset, last_time):
+    """
+    Records how far a plain logger file has been ingested so a later run can
+    read only what was appended since. offset = bytes of complete lines already
+    folded in (reading resumes there), last_time = time of the last row folded in.
+    Hashes of the start of the file and of the bytes just before offset detect a
+    rewritten prefix. Returns None for sources that cannot be resumed.
+    """
+    path, member = split_source(source)
+    if member or os.path.splitext(path)[1].lower() in COMPRESSED_EXTENSIONS or not offset:
+        return None
+    with open(path, "rb") as f:
+        head_sha1, tail_sha1 = _prefix_hashes(f, offset)
+    return {"offset": int(offset), "last_time": last_time.isoformat(), "head_sha1": head_sha1, "tail_sha1": tail_sha1}
+
+def read_appended(source, checkpoint):
+    """
+    Returns (header, data, end) for the rows appended to a file since a
+    checkpoint (see make_checkpoint): the header line, the bytes of the new
+    complete lines and the offset just past them. Returns None if the file
+    can no longer be resumed (it shrank or its prefix changed).
+    """
+    path, _ = split_source(source)
+    offset = checkpoint["offset"]
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size < offset or _prefix_hashes(f, offset) != (checkpoint["head_sha1"], checkpoint["tail_sha1"]):
+            return None
+        f.seek(0)
+        header = f.readline()
+        f.seek(offset)
+        data = f.read()
+    data = data[:data.rfind(b"\n") + 1]     # a partly written last line waits for the next run
+    return header, data, offset + len(data)
+
+def find_first_day(source, day, start, limit, logger_format):
+    """
+    Returns the byte offset of the first line between start and limit logged on
+    day (a date), found by a raw byte search for the date text of the time
+    column (in the file's formats.LoggerFormat). Returns None if no line
+    matches or the format has no date text.
+    """
+    path, _ = split_source(source)
+    prefixes = logger_format.day_prefixes(day)
+    if not prefixes:
+        return None
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        hits = [hit for hit in (data.find(start_of_field + date_text, start, limit)
+                                for start_of_field in (b",", b"\n") for date_text in prefixes) if hit >= 0]
+        if not hits:
+            return None
+        return data.rfind(b"\n", 0, min(hits) + 1) + 1
+
+def split_lines(source, n_parts, interval):
+    """
+    Splits the data rows of a plain logger file into up to n_parts byte ranges
+    of similar size. Every range starts at the beginning of a line and, for time
+    ordered files, no interval of the day (interval minutes) is split between
+    two ranges, so per-interval and per-minute sums of each range never overlap.
+    Returns (header, ranges) with ranges a list of (start, end) byte offsets.
+    """
+    path, _ = split_source(source)
+    with open(path, "rb") as f:
+        header = f.readline()
+        first_row = next(csv.reader([f.readline().decode("utf-8", errors="replace")]), None)
+        end = f.seek(0, os.SEEK_END)
+        columns = next(csv.reader([header.decode("utf-8-sig", errors="replace")]), [])
+        logger_format = detect_format(columns, first_row)
+        cuts = [len(header)]
+        if logger_format is not None:
+            col = columns.index(logger_format.time_column(columns))
+            for k in range(1, n_parts):
+                cut = _interval_start(f, cuts[0] + (end - cuts[0]) * k // n_parts, end, col, interval, logger_format)
+                if cut is not None and cut > cuts[-1]:
+                    cuts.append(cut)
+        cuts.append(end)
+    return header, [(start, stop) for start, stop in zip(cuts[:-1], cuts[1:]) if stop > start]
+
+def _interval_start(f, offset, end, col, interval, logger_format):
+    # offset of the first line after offset that starts a new interval of the day
+    f.seek(offset)
+    position = offset + len(f.readline())     # skip to the next line start
+    previous = None
+    while position < end:
+        line = f.readline()
+        time = _first_time([line.decode("utf-8", errors="replace")], col, logger_format)
+        if time is not None:
+            slot = (time.date(), (time.hour * 60 + time.minute) // interval)
+            if previous is not None and slot != previous:
+                return position
+            previous = slot
+        position += len(line)
+    return None
+
+def _prefix_hashes(f, offset):
+    # hashes of the first and the last FINGERPRINT_BYTES of the first offset bytes of a file
+    f.seek(0)
+    head = hashlib.sha1(f.read(min(offset, FINGERPRINT_BYTES))).hexdigest()
+    f.seek(max(offset - FINGERPRINT_BYTES, 0))
+    tail = hashlib.sha1(f.read(min(offset, FINGERPRINT_BYTES))).hexdigest()
+    return head, tail
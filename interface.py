@@ -2,19 +2,28 @@ import tkinter as tk
 import threading
 import os
 import calendar
-from datetime import datetime
-from tkinter import messagebox, ttk, filedialog
+from datetime import datetime, timedelta
+from tkinter import messagebox, ttk, filedialog, simpledialog
 from simulation import Simulation
 from compressor import Compressor
 from exporter import Exporter
 from analyzer import Analyzer
+from ingest import LOGGER_FILE_TYPES, list_csv_members, make_source, source_exists, sniff_time_span
+from schedules import parse_day_time_ranges, parse_days, schedule_to_mask, mask_to_schedule, ScheduleLibrary, SCHEDULE_TEMPLATES
+from tariff import Tariff, parse_months
+from project import save_project, load_project, PROJECT_FILE_TYPES
+from report import generate_report, REPORT_FILE_TYPES
+from warehouse import ResultsWarehouse, DEFAULT_WAREHOUSE_PATH
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 
 class CompressorFrame(ttk.Frame):
-    def __init__(self, parent, simulation, can_remove=True, remove_callback=None):
+    def __init__(self, parent, simulation, can_remove=True, remove_callback=None, add_callback=None, span_callback=None):
         super().__init__(parent, style="Compressor.TFrame", relief=tk.RIDGE, borderwidth=2, padding=10)
         self.sim = simulation
         self.remove_callback = remove_callback
+        self.add_callback = add_callback    # creates a new compressor frame (for multi-member archives)
+        self.span_callback = span_callback  # called when the logged time span of the file is known
+        self.time_span = None               # (first, last) datetime logged in the selected file
         
         # Compressor Name
         ttk.Label(self, text="Name:", style="Compressor.TLabel").grid(row=0, column=0, sticky=tk.W, pady=2)
@@ -25,6 +34,21 @@ class CompressorFrame(ttk.Frame):
         ttk.Label(self, text="Voltage:", style="Compressor.TLabel").grid(row=0, column=2, sticky=tk.W, padx=10, pady=2)
         self.voltage_entry = ttk.Entry(self, width=10, foreground="#000000", font=("Segoe UI", 11))
         self.voltage_entry.grid(row=0, column=3, sticky=tk.W, pady=2)
+
+        # Phase reduction for multi-phase amp columns
+        ttk.Label(self, text="Phases:", style="Compressor.TLabel").grid(row=2, column=0, sticky=tk.W, pady=2)
+        self.phase_mode_options = {
+            "Average Phases": "mean",
+            "Per-Phase": "per-phase"
+        }
+        self.phase_mode_var = tk.StringVar(self)
+        phase_menu = ttk.OptionMenu(self, self.phase_mode_var, "Average Phases", *self.phase_mode_options.keys())
+        phase_menu.grid(row=2, column=1, sticky=tk.W, pady=2)
+
+        # Load state thresholds (off / loaded amps), blank to derive from the data
+        ttk.Label(self, text="Off / Loaded Amps:", style="Compressor.TLabel").grid(row=2, column=2, sticky=tk.W, padx=10, pady=2)
+        self.thresholds_entry = ttk.Entry(self, width=10, foreground="#000000", font=("Segoe UI", 11))
+        self.thresholds_entry.grid(row=2, column=3, sticky=tk.W, pady=2)
         
         # File selector
         ttk.Label(self, text="Data File:", style="Compressor.TLabel").grid(row=1, column=0, sticky=tk.W, pady=2)
@@ -47,6 +71,14 @@ class CompressorFrame(ttk.Frame):
         )
         self.file_label.grid(row=0, column=1, sticky="ew", padx=(10, 0))
 
+        # Background parse status for the selected file
+        self.parse_status_label = ttk.Label(file_frame, text="", style="Compressor.TLabel")
+        self.parse_status_label.grid(row=0, column=2, sticky=tk.E, padx=(10, 0))
+
+        # Logged time span of the file, flagged when it does not match the deployment dates
+        self.span_label = ttk.Label(self, text="", style="Compressor.TLabel")
+        self.span_label.grid(row=3, column=1, columnspan=3, sticky=tk.W, pady=2)
+
         # Remove button
         if can_remove:
             self.remove_button = ttk.Button(self, text="Remove", style="Compressor.TButton", command=self.remove_self)
@@ -58,9 +90,131 @@ class CompressorFrame(ttk.Frame):
 
     def browse_file(self):
         downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
-        filepath = filedialog.askopenfilename(title="Select Compressor Data File", initialdir=downloads_path, filetypes=[("CSV files", "*.csv")])
-        if filepath:
-            self.file_path_var.set(filepath)
+        filepath = filedialog.askopenfilename(title="Select Compressor Data File", initialdir=downloads_path, filetypes=LOGGER_FILE_TYPES)
+        if not filepath:
+            return
+
+        if filepath.lower().endswith(".zip"):
+            # one CSV per compressor: this frame takes the first member, new frames take the rest
+            try:
+                members = list_csv_members(filepath)
+            except Exception as e:
+                messagebox.showerror("Archive Error", str(e))
+                return
+            if not members:
+                messagebox.showerror("Archive Error", "The selected archive does not contain any CSV files.")
+                return
+            self.set_source(make_source(filepath, members[0]) if len(members) > 1 else filepath, members[0])
+            for member in members[1:]:
+                if self.add_callback:
+                    frame = self.add_callback()
+                    frame.set_source(make_source(filepath, member), member)
+        else:
+            self.set_source(filepath)
+
+    def set_source(self, source, member=None):
+        """
+        Sets the data file (or archive member) for this frame. Archive members also
+        pre-fill an empty name with the member's file name.
+        """
+        previous = self.file_path_var.get()
+        if previous != source:
+            self.cancel_parse()
+        self.file_path_var.set(source)
+        if member and not self.name_entry.get().strip():
+            self.name_entry.insert(0, os.path.splitext(os.path.basename(member))[0])
+
+        # start parsing right away so Run only has to trim and bucket
+        self.parse_status_label.config(text="Parsing...")
+        self.sim.parse_cache.start(source, on_done=lambda src, error: self.after(0, self._on_parse_done, src, error))
+
+        # the time span only needs the first and last rows, so it is known long before the parse finishes
+        self.time_span = None
+        self.span_label.config(text="", style="Compressor.TLabel")
+        threading.Thread(target=self._sniff_span, args=(source,), daemon=True).start()
+
+    def _sniff_span(self, source):
+        try:
+            span = sniff_time_span(source)
+        except Exception as e:
+            print(f"Error reading time span of {source}: {e}")
+            span = None
+        self.after(0, self._on_span_sniffed, source, span)
+
+    def _on_span_sniffed(self, source, span):
+        if not self.winfo_exists() or source != self.file_path_var.get():
+            return
+        self.time_span = span
+        if span is None:
+            self.span_label.config(text="Logged dates unknown", style="Warning.TLabel")
+            return
+        self.span_label.config(text=f"Logged {span[0]:%m/%d/%Y %H:%M} to {span[1]:%m/%d/%Y %H:%M}", style="Compressor.TLabel")
+        if self.span_callback:
+            self.span_callback()
+
+    def get_span_coverage(self, deployed, collected):
+        """
+        Returns (days covered, days in window) for the dates strictly between the
+        deployed and collected dates (the days the simulation keeps), or None if
+        the file's time span is unknown.
+        """
+        if self.time_span is None:
+            return None
+        first = max(self.time_span[0].date(), deployed + timedelta(days=1))
+        last = min(self.time_span[1].date(), collected - timedelta(days=1))
+        return max((last - first).days + 1, 0), max((collected - deployed).days - 1, 0)
+
+    def flag_span(self, deployed, collected):
+        """
+        Flags the span label when the file does not cover the deployment dates.
+        """
+        coverage = self.get_span_coverage(deployed, collected)
+        if coverage is None:
+            return
+        covered, window = coverage
+        span_text = f"Logged {self.time_span[0]:%m/%d/%Y %H:%M} to {self.time_span[1]:%m/%d/%Y %H:%M}"
+        if covered == 0:
+            self.span_label.config(text=f"{span_text} - no data between the deployed and collected dates", style="Warning.TLabel")
+        elif covered < window:
+            self.span_label.config(text=f"{span_text} - covers {covered} of {window} days", style="Warning.TLabel")
+        else:
+            self.span_label.config(text=span_text, style="Compressor.TLabel")
+
+    def _on_parse_done(self, source, error):
+        if not self.winfo_exists() or source != self.file_path_var.get():
+            return      # frame removed or a different file selected meanwhile
+        if error:
+            self.parse_status_label.config(text="Parse failed")
+            print(f"Error parsing {source}: {error}")
+        else:
+            self.parse_status_label.config(text="Ready")
+
+    def cancel_parse(self):
+        """
+        Cancels the background parse of this frame's file (when it is replaced or removed).
+        """
+        source = self.file_path_var.get()
+        if source and source != "No file selected":
+            self.sim.parse_cache.cancel(source)
+        self.parse_status_label.config(text="")
+        self.span_label.config(text="", style="Compressor.TLabel")
+        self.time_span = None
+
+    def set_compressor(self, compressor):
+        """
+        Fills the frame from an existing Compressor (used when opening a project).
+        """
+        self.name_entry.delete(0, tk.END)
+        self.name_entry.insert(0, compressor.get_name())
+        self.voltage_entry.delete(0, tk.END)
+        self.voltage_entry.insert(0, str(compressor.voltage))
+        self.file_path_var.set(compressor.file_path)
+        for label, mode in self.phase_mode_options.items():
+            if mode == compressor.phase_mode:
+                self.phase_mode_var.set(label)
+        self.thresholds_entry.delete(0, tk.END)
+        if compressor.state_thresholds:
+            self.thresholds_entry.insert(0, "{:g} / {:g}".format(*compressor.state_thresholds))
 
     def remove_self(self):
         if self.remove_callback:
@@ -81,12 +235,24 @@ class CompressorFrame(ttk.Frame):
         if not voltage_str.isdigit():
             raise ValueError(f"Voltage for compressor '{name or 'Unnamed'}' must be a valid integer.")
 
-        if not os.path.isfile(file_path) or file_path == "No file selected":
+        if not source_exists(file_path) or file_path == "No file selected":
             raise ValueError(f"A valid data file must be selected for compressor '{name}'.")
 
         voltage = int(voltage_str)
+        phase_mode = self.phase_mode_options[self.phase_mode_var.get()]
+
+        thresholds_str = self.thresholds_entry.get().strip()
+        state_thresholds = None
+        if thresholds_str:
+            try:
+                off, loaded = (float(v) for v in thresholds_str.split("/"))
+            except ValueError:
+                raise ValueError(f"Off / loaded amps for compressor '{name}' must look like '10 / 40'.")
+            if off > loaded:
+                raise ValueError(f"Off amps for compressor '{name}' must not be above loaded amps.")
+            state_thresholds = (off, loaded)
 
-        return Compressor(name=name, simulation=self.sim, voltage=voltage, file_path=file_path)
+        return Compressor(name=name, simulation=self.sim, voltage=voltage, file_path=file_path, phase_mode=phase_mode, state_thresholds=state_thresholds)
 
 class ShutdownSchedulerWidget(ttk.Frame):
     def __init__(self, parent, interval_minutes=15, on_change=None):
@@ -236,6 +402,133 @@ class ShutdownSchedulerWidget(ttk.Frame):
 
         return schedule
 
+    def set_schedule(self, schedule):
+        """
+        Paints a schedule (dict[day] = list of (start_time, end_time)) onto the grid,
+        replacing the current one.
+        """
+        for key in self.cell_states:
+            self.cell_states[key] = False
+
+        for day, intervals in schedule.items():
+            for start_str, end_str in intervals:
+                for time_str in self.time_blocks:
+                    if start_str <= time_str <= end_str and (day, time_str) in self.cell_states:
+                        self.cell_states[(day, time_str)] = True
+
+        for key, rect in self.cell_rects.items():
+            self.canvas.itemconfig(rect, fill="red" if self.cell_states[key] else "green")
+
+        if self.on_change:
+            self.on_change()
+
+class RateScheduleEditor(tk.Toplevel):
+    """
+    Popup for editing time-of-use / seasonal rate periods and tiered blocks.
+    The base rate is the kWh rate on the setup tab.
+    """
+    def __init__(self, parent, periods, tiers, other_monthly_kwh=0.0, on_save=None):
+        super().__init__(parent)
+        self.title("Rate Schedule")
+        self.configure(bg="#000e2f")
+        self.transient(parent)
+        self.on_save = on_save
+
+        container = ttk.Frame(self, style="Container.TFrame", padding=10)
+        container.pack(fill="both", expand=True)
+
+        # --- Time-of-use / seasonal periods ---
+        ttk.Label(container, text="Rate Periods (later rows override earlier rows)").grid(row=0, column=0, columnspan=6, sticky="w")
+        period_cols = ("Months", "Days", "Start", "End", "Rate ($/kWh)")
+        self.period_table = ttk.Treeview(container, columns=period_cols, show="headings", height=6)
+        for col in period_cols:
+            self.period_table.heading(col, text=col)
+            self.period_table.column(col, anchor="center", width=110)
+        self.period_table.grid(row=1, column=0, columnspan=6, sticky="ew", pady=5)
+        for period in periods:
+            self.period_table.insert("", "end", values=(period["months"], period["days"], period["start"], period["end"], period["rate"]))
+
+        self.period_entries = []
+        for col, default in enumerate(("Jun-Sep", "Mon-Fri", "12:00", "18:00", "0.20")):
+            entry = ttk.Entry(container, width=12)
+            entry.insert(0, default)
+            entry.grid(row=2, column=col, padx=2, sticky="w")
+            self.period_entries.append(entry)
+        period_buttons = ttk.Frame(container, style="Container.TFrame")
+        period_buttons.grid(row=3, column=0, columnspan=6, sticky="w", pady=5)
+        ttk.Button(period_buttons, text="Add Period", command=self.add_period).pack(side="left", padx=(0, 5))
+        ttk.Button(period_buttons, text="Remove Selected", command=lambda: self.remove_selected(self.period_table)).pack(side="left")
+
+        # --- Tiered blocks ---
+        ttk.Label(container, text="Tiered Blocks (monthly kWh above threshold pays the adder)").grid(row=4, column=0, columnspan=6, sticky="w", pady=(10, 0))
+        tier_cols = ("Above kWh / Month", "Adder ($/kWh)")
+        self.tier_table = ttk.Treeview(container, columns=tier_cols, show="headings", height=4)
+        for col in tier_cols:
+            self.tier_table.heading(col, text=col)
+            self.tier_table.column(col, anchor="center", width=150)
+        self.tier_table.grid(row=5, column=0, columnspan=6, sticky="w", pady=5)
+        for threshold, adder in tiers:
+            self.tier_table.insert("", "end", values=(threshold, adder))
+
+        self.tier_entries = []
+        for col, default in enumerate(("50000", "0.01")):
+            entry = ttk.Entry(container, width=12)
+            entry.insert(0, default)
+            entry.grid(row=6, column=col, padx=2, sticky="w")
+            self.tier_entries.append(entry)
+        tier_buttons = ttk.Frame(container, style="Container.TFrame")
+        tier_buttons.grid(row=7, column=0, columnspan=6, sticky="w", pady=5)
+        ttk.Button(tier_buttons, text="Add Tier", command=self.add_tier).pack(side="left", padx=(0, 5))
+        ttk.Button(tier_buttons, text="Remove Selected", command=lambda: self.remove_selected(self.tier_table)).pack(side="left")
+
+        ttk.Label(container, text="Other Monthly kWh on Meter:").grid(row=8, column=0, columnspan=2, sticky="w", pady=5)
+        self.other_entry = ttk.Entry(container, width=12)
+        self.other_entry.insert(0, str(other_monthly_kwh))
+        self.other_entry.grid(row=8, column=2, sticky="w", pady=5)
+
+        ttk.Button(container, text="Save", command=self.save).grid(row=9, column=0, sticky="w", pady=(10, 0))
+
+    def add_period(self):
+        months, days, start, end, rate = (entry.get().strip() for entry in self.period_entries)
+        try:
+            parse_months(months)
+            parse_days(days)
+            parse_day_time_ranges(f"All {start}-{end}", 1)
+            float(rate)
+        except (ValueError, KeyError):
+            messagebox.showerror("Rate Schedule", "Use months like 'Jun-Sep', days like 'Mon-Fri', times like '14:00' and a numeric rate.", parent=self)
+            return
+        self.period_table.insert("", "end", values=(months, days, start, end, rate))
+
+    def add_tier(self):
+        threshold, adder = (entry.get().strip() for entry in self.tier_entries)
+        try:
+            float(threshold)
+            float(adder)
+        except ValueError:
+            messagebox.showerror("Rate Schedule", "Tier threshold and adder must be numbers.", parent=self)
+            return
+        self.tier_table.insert("", "end", values=(threshold, adder))
+
+    def remove_selected(self, table):
+        for row in table.selection():
+            table.delete(row)
+
+    def save(self):
+        periods = []
+        for row in self.period_table.get_children():
+            months, days, start, end, rate = self.period_table.item(row, "values")
+            periods.append({"months": months, "days": days, "start": start, "end": end, "rate": float(rate)})
+        tiers = [tuple(float(v) for v in self.tier_table.item(row, "values")) for row in self.tier_table.get_children()]
+        try:
+            other_monthly_kwh = float(self.other_entry.get() or 0)
+        except ValueError:
+            messagebox.showerror("Rate Schedule", "Other monthly kWh must be a number.", parent=self)
+            return
+        if self.on_save:
+            self.on_save(periods, tiers, other_monthly_kwh)
+        self.destroy()
+
 class CalendarPopup(tk.Toplevel):
     def __init__(self, parent, entry, date_format='%m/%d/%Y'):
         super().__init__(parent)
@@ -433,6 +726,7 @@ class Interface(tk.Tk):
         style.configure("Container.TFrame", background="#000e2f")
         style.configure("Compressor.TFrame", background="#000e2f")
         style.configure("Compressor.TLabel", background="#000e2f", foreground="#ffffff")
+        style.configure("Warning.TLabel", background="#000e2f", foreground="#ff8080")
         style.configure("Compressor.TButton", background="#000e2f", foreground="#ffffff", font=("Segoe UI", 12))
         # -- notebook styling
         style.configure("TNotebook", background="#000e2f", borderwidth=0)
@@ -442,11 +736,27 @@ class Interface(tk.Tk):
         style.configure("TNotebook.Tab", borderwidth=0)
         
         self.sim = Simulation() # Main instance of the simulation
+        self.schedule_library = ScheduleLibrary()   # named shutdown schedules, kept across runs
+        self.warehouse_path = DEFAULT_WAREHOUSE_PATH    # results database, created when the first run is saved
+        self.site_name = ""         # site the results are saved under in the warehouse
+        self.project_path = None    # project file last saved or opened
 
+        self.create_menu()
         self.create_widgets()
+        self.create_warehouse_tab()
         self.compressor_frames = []
         self.add_compressor_frame(can_remove=False) # initial unremovable compressor frame
 
+    def create_menu(self):
+        menubar = tk.Menu(self)
+        file_menu = tk.Menu(menubar, tearoff=0)
+        file_menu.add_command(label="Open Project...", command=self.open_project)
+        file_menu.add_command(label="Save Project...", command=self.save_project)
+        file_menu.add_separator()
+        file_menu.add_command(label="Reprocess Raw Data", command=self.run_simulation)
+        menubar.add_cascade(label="File", menu=file_menu)
+        self.config(menu=menubar)
+
     def create_widgets(self):
         # --- Setup Tab ---
         self.setup_tab, self.scrollable_setup, self.setup_canvas = self.create_scrollable_tab("Setup")
@@ -460,6 +770,14 @@ class Interface(tk.Tk):
         self.kwh_entry = ttk.Entry(form_frame, font=("Segoe UI", 11), width=13)
         self.kwh_entry.grid(row=0, column=1, pady=5, sticky="w")
 
+        # Time-of-use / tiered rate schedule (the kWh rate is the base rate)
+        self.rate_periods = []
+        self.rate_tiers = []
+        self.other_monthly_kwh = 0.0
+        ttk.Button(form_frame, text="Rate Schedule...", command=self.open_rate_editor).grid(row=0, column=2, padx=(10, 5), pady=5, sticky="w")
+        self.rate_summary_label = ttk.Label(form_frame, text="Flat rate")
+        self.rate_summary_label.grid(row=0, column=3, pady=5, sticky="w")
+
         # Interval
         ttk.Label(form_frame, text="Bucket Size / Interval:").grid(row=1, column=0, padx=(0, 5), pady=5, sticky="e")
         self.interval_options = {
@@ -483,14 +801,35 @@ class Interface(tk.Tk):
 
         # Deployed Date
         ttk.Label(form_frame, text="Sensor Deployed Date:").grid(row=2, column=0, padx=(0, 5), pady=5, sticky="e")
-        self.deployed_date_entry = DateEntry(form_frame, font=('Segoe UI', 11))
+        self.deployed_date_var = tk.StringVar(self)
+        self.deployed_date_entry = DateEntry(form_frame, font=('Segoe UI', 11), textvariable=self.deployed_date_var)
         self.deployed_date_entry.grid(row=2, column=1, pady=5, sticky="w")
 
         # Collected Date
         ttk.Label(form_frame, text="Sensor Collected Date:").grid(row=3, column=0, padx=(0, 5), pady=5, sticky="e")
-        self.collected_date_entry = DateEntry(form_frame, font=('Segoe UI', 11))
+        self.collected_date_var = tk.StringVar(self)
+        self.collected_date_entry = DateEntry(form_frame, font=('Segoe UI', 11), textvariable=self.collected_date_var)
         self.collected_date_entry.grid(row=3, column=1, pady=5, sticky="w")
 
+        # dates are pre-filled from the logged time spans until the user edits them
+        self.auto_dates = ("", "")
+        self.deployed_date_var.trace_add("write", lambda *args: self.flag_date_spans())
+        self.collected_date_var.trace_add("write", lambda *args: self.flag_date_spans())
+
+        # Demand charge and demand averaging window
+        ttk.Label(form_frame, text="Demand Charge ($/kW):").grid(row=4, column=0, padx=(0, 5), pady=5, sticky="e")
+        self.demand_entry = ttk.Entry(form_frame, font=("Segoe UI", 11), width=13)
+        self.demand_entry.insert(0, "0")
+        self.demand_entry.grid(row=4, column=1, pady=5, sticky="w")
+
+        self.demand_window_options = {
+            "15 Minute Demand": 15,
+            "30 Minute Demand": 30
+        }
+        self.demand_window_var = tk.StringVar(self)
+        demand_window_menu = ttk.OptionMenu(form_frame, self.demand_window_var, "15 Minute Demand", *self.demand_window_options.keys())
+        demand_window_menu.grid(row=4, column=2, padx=(10, 5), pady=5, sticky="w")
+
         # --- Container Frame for Compressor Data
         self.comp_container = ttk.Frame(self.scrollable_setup, style="Container.TFrame")
         self.comp_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -516,18 +855,71 @@ class Interface(tk.Tk):
         self.progress.pack(pady=(5, 10))
         self.progress.pack_forget()  # Hide initially
 
+    def open_rate_editor(self):
+        RateScheduleEditor(self, self.rate_periods, self.rate_tiers, self.other_monthly_kwh, on_save=self.set_rate_schedule)
+
+    def set_rate_schedule(self, periods, tiers, other_monthly_kwh):
+        self.rate_periods = periods
+        self.rate_tiers = tiers
+        self.other_monthly_kwh = other_monthly_kwh
+        if periods or tiers:
+            self.rate_summary_label.config(text=f"{len(periods)} rate periods, {len(tiers)} tiers")
+        else:
+            self.rate_summary_label.config(text="Flat rate")
+
+    def build_tariff(self, kwh_rate, demand_rate=0.0):
+        """
+        Builds the simulation tariff from the kWh rate, demand charge and the rate
+        schedule editor.
+        """
+        if not self.rate_periods and not self.rate_tiers and not demand_rate:
+            return None
+        return Tariff(name="Rate Schedule", base_rate=kwh_rate, periods=self.rate_periods,
+                      tiers=self.rate_tiers, other_monthly_kwh=self.other_monthly_kwh, demand_rate=demand_rate,
+                      demand_window=self.demand_window_options[self.demand_window_var.get()])
+
     def add_compressor_frame(self, can_remove=True):
-        frame = CompressorFrame(self.comp_inner_frame, simulation=self.sim, can_remove=can_remove, remove_callback=self.remove_compressor_frame)
+        frame = CompressorFrame(self.comp_inner_frame, simulation=self.sim, can_remove=can_remove, remove_callback=self.remove_compressor_frame, add_callback=self.add_compressor_frame, span_callback=self.update_date_spans)
         frame.pack(fill=tk.X, pady=5)
         self.compressor_frames.append(frame)
         # scroll to bottom
         self.setup_canvas.update_idletasks()
         self.setup_canvas.yview_moveto(1.0)
+        return frame
+
+    def update_date_spans(self):
+        """
+        Pre-fills the deployed / collected dates with the overlap of every file's
+        logged time span (unless the user changed them), then flags mismatched files.
+        """
+        spans = [frame.time_span for frame in self.compressor_frames if frame.time_span]
+        if not spans:
+            return
+        first = max(span[0] for span in spans).strftime("%m/%d/%Y")
+        last = min(span[1] for span in spans).strftime("%m/%d/%Y")
+
+        current = (self.deployed_date_var.get(), self.collected_date_var.get())
+        if current == self.auto_dates or current == ("", ""):
+            self.auto_dates = (first, last)
+            self.deployed_date_var.set(first)
+            self.collected_date_var.set(last)
+        self.flag_date_spans()
+
+    def flag_date_spans(self):
+        try:
+            deployed = datetime.strptime(self.deployed_date_var.get(), "%m/%d/%Y").date()
+            collected = datetime.strptime(self.collected_date_var.get(), "%m/%d/%Y").date()
+        except ValueError:
+            return      # still being typed
+        for frame in self.compressor_frames:
+            frame.flag_span(deployed, collected)
 
     def remove_compressor_frame(self, frame):
         if frame in self.compressor_frames:
+            frame.cancel_parse()
             frame.destroy()
             self.compressor_frames.remove(frame)
+            self.update_date_spans()
 
     def create_scrollable_tab(self, tab_name):
         """
@@ -660,6 +1052,131 @@ class Interface(tk.Tk):
         self.add_graph_to_tab(kwh_by_day_fig, scrollable_frame)
         kW_by_interval_fig = analyzer.plot_power_consumption_by_interval()
         self.add_graph_to_tab(kW_by_interval_fig, scrollable_frame)
+        # whole week heatmaps, the shutdown schedule overlay follows the scheduler
+        self.heatmap_fig = analyzer.plot_weekly_heatmaps()
+        self.add_graph_to_tab(self.heatmap_fig, scrollable_frame)
+        # where the energy used running unloaded goes
+        self.add_graph_to_tab(analyzer.plot_unloaded_heatmaps(), scrollable_frame)
+
+    def create_trace_tab(self):
+        trace_tab = ttk.Frame(self.notebook, style="Container.TFrame")
+        self.notebook.add(trace_tab, text="Raw Trace")
+
+        # zoom / pan with the toolbar; lines are redrawn from the pyramid at the matching resolution
+        analyzer = Analyzer(self.sim)
+        self.add_graph_to_tab(analyzer.plot_raw_traces(), trace_tab)
+
+    def create_quality_tab(self):
+        quality_tab, scrollable_frame, canvas = self.create_scrollable_tab("Data Quality")
+
+        # per-compressor summary of the scan made while the files were read
+        summary_label = ttk.Label(scrollable_frame, text="Data Quality by Compressor", style="Black.TLabel")
+        summary_label.pack(anchor="w", padx=15, pady=(10, 0))
+
+        summary_cols = ("Compressor", "Samples", "Step (s)", "Gaps", "Gap Hours", "Duplicates", "Out of Order",
+                        "Unreadable Times", "Flatline Hours", "Missing", "Negative", "Out of Range")
+        summary_table = ttk.Treeview(scrollable_frame, columns=summary_cols, show="headings", height=max(len(self.sim.get_compressors()), 1))
+        for col in summary_cols:
+            summary_table.heading(col, text=col)
+            summary_table.column(col, anchor="center", width=95)
+        summary_table.pack(padx=10, pady=5, fill="x")
+
+        gap_label = ttk.Label(scrollable_frame, text="Longest Logging Gaps", style="Black.TLabel")
+        gap_label.pack(anchor="w", padx=15, pady=(10, 0))
+
+        gap_cols = ("Compressor", "Gap Start", "Gap End", "Hours")
+        gap_table = ttk.Treeview(scrollable_frame, columns=gap_cols, show="headings", height=6)
+        for col in gap_cols:
+            gap_table.heading(col, text=col)
+            gap_table.column(col, anchor="center", width=160)
+        gap_table.pack(padx=10, pady=5, fill="x")
+
+        for compressor in self.sim.get_compressors():
+            quality = compressor.quality
+            if not quality.get("samples"):
+                summary_table.insert("", "end", values=(compressor.get_name(),) + ("",) * (len(summary_cols) - 1))
+                continue
+            summary_table.insert("", "end", values=(
+                compressor.get_name(),
+                f"{quality['samples']:,}",
+                f"{quality['typical_step_seconds']:g}",
+                quality["gap_count"],
+                f"{quality['gap_hours']:.2f}",
+                quality["duplicates"],
+                quality["out_of_order"],
+                quality.get("invalid_times", 0),
+                f"{quality['flatline_hours']:.2f}",
+                quality["missing"],
+                quality["negative"],
+                quality["out_of_range"]
+            ))
+            for start, end, hours in quality["gaps"]:
+                gap_table.insert("", "end", values=(compressor.get_name(), start.replace("T", " "), end.replace("T", " "), f"{hours:.2f}"))
+
+        # samples logged per weekday / interval against those expected
+        analyzer = Analyzer(self.sim)
+        self.add_graph_to_tab(analyzer.plot_coverage_heatmaps(), scrollable_frame)
+
+    def create_sequencing_tab(self):
+        """
+        Builds the sequencing tab: the logged air demand replayed under base /
+        trim, consolidation and VSD trim strategies.
+        """
+        sequencing_tab, scrollable_frame, canvas = self.create_scrollable_tab("Sequencing")
+        names = [compressor.get_name() for compressor in self.sim.get_compressors()]
+
+        control_frame = ttk.Frame(scrollable_frame)
+        control_frame.pack(fill="x", padx=10, pady=10)
+
+        ttk.Label(control_frame, text="Trim / VSD Unit:", style="Black.TLabel").grid(row=0, column=0, sticky="e", padx=5, pady=2)
+        self.sequencing_trim_var = tk.StringVar(value=names[0])
+        ttk.OptionMenu(control_frame, self.sequencing_trim_var, names[0], *names).grid(row=0, column=1, sticky="w", pady=2)
+
+        ttk.Label(control_frame, text="Consolidate Onto:", style="Black.TLabel").grid(row=0, column=2, sticky="e", padx=5, pady=2)
+        self.sequencing_units_var = tk.StringVar(value=str(max(len(names) - 1, 1)))
+        ttk.Spinbox(control_frame, from_=1, to=len(names), textvariable=self.sequencing_units_var, width=5).grid(row=0, column=3, sticky="w", pady=2)
+        ttk.Label(control_frame, text="units", style="Black.TLabel").grid(row=0, column=4, sticky="w", padx=5, pady=2)
+
+        ttk.Button(control_frame, text="Run", command=self.run_sequencing).grid(row=0, column=5, sticky="ew", padx=10, pady=2)
+
+        ttk.Label(scrollable_frame, text="Replayed Over Minutes Every Compressor Logged", style="Black.TLabel").pack(anchor="w", padx=15, pady=(10, 0))
+        cols = ("Strategy", "kWh", "Saved kWh", "Annual Savings kWh", "Annual Savings ($)", "Unmet Hours")
+        self.sequencing_table = ttk.Treeview(scrollable_frame, columns=cols, show="headings", height=6)
+        for col in cols:
+            self.sequencing_table.heading(col, text=col)
+            self.sequencing_table.column(col, anchor="center", width=150)
+        self.sequencing_table.pack(padx=10, pady=5, fill="x")
+        self.run_sequencing()
+
+    def run_sequencing(self):
+        try:
+            n_units = int(self.sequencing_units_var.get())
+        except ValueError:
+            messagebox.showerror("Sequencing", "Enter the number of units to consolidate onto.")
+            return
+        trim = self.sequencing_trim_var.get()
+        strategies = [
+            {"name": "Base / Trim", "kind": "base_trim", "trim": trim},
+            {"name": f"Consolidate Onto {n_units}", "kind": "consolidate", "n_units": n_units},
+            {"name": f"VSD Trim ({trim})", "kind": "vsd_trim", "trim": trim}
+        ]
+        try:
+            result = Analyzer(self.sim).simulate_sequencing(strategies)
+        except ValueError as e:
+            messagebox.showerror("Sequencing", str(e))
+            return
+
+        self.sequencing_table.delete(*self.sequencing_table.get_children())
+        self.sequencing_table.insert("", "end", values=("Measured", f"{result['baseline_kwh']:,.0f}", "", "", "", ""))
+        for name, strategy in result["strategies"].items():
+            self.sequencing_table.insert("", "end", values=(
+                name,
+                f"{strategy['kwh']:,.0f}",
+                f"{strategy['saved_kwh']:,.0f}",
+                f"{strategy['annual_kwh']:,.0f}",
+                f"${strategy['annual_dollars']:,.2f}",
+                f"{strategy['unmet_hours']:.1f}"
+            ))
 
     def add_graph_to_tab(self, fig, container):
         frame = ttk.Frame(container)
@@ -697,6 +1214,21 @@ class Interface(tk.Tk):
         table_frame = ttk.Frame(row_frame, style="Container.TFrame")
         table_frame.grid(row=0, column=1, sticky="nsew", padx=10)
 
+        # Optimizer controls above the tables
+        self.create_optimizer_frame(table_frame)
+
+        # Named schedules and their side by side comparison
+        self.create_library_frame(table_frame)
+
+        # Report of the current schedule (rendered off the main thread)
+        report_frame = ttk.Frame(table_frame, style="Container.TFrame")
+        report_frame.pack(fill="x", pady=(0, 20))
+        self.report_button = ttk.Button(report_frame, text="Generate Report...", command=self.generate_report)
+        self.report_button.pack(side="left")
+        ttk.Button(report_frame, text="Save to Warehouse...", command=self.save_to_warehouse).pack(side="left", padx=(10, 0))
+        self.report_status_label = ttk.Label(report_frame, text="")
+        self.report_status_label.pack(side="left", padx=10)
+
         # Now create your weekly and annual tables inside table_frame
         table_style = ttk.Style()
         style = ttk.Style()
@@ -723,25 +1255,269 @@ class Interface(tk.Tk):
         annual_label = ttk.Label(annual_frame, text="Annual Savings Summary", style="Black.TLabel")
         annual_label.pack(anchor="w", padx=5)
 
-        self.annual_table = ttk.Treeview(annual_frame, columns=("Compressor", "Annual Savings kWh", "Annual Savings ($)"), show="headings")
+        self.annual_table = ttk.Treeview(annual_frame, columns=("Compressor", "Annual Savings kWh", "kWh 90% Range", "Annual Savings ($)", "$ 90% Range"), show="headings")
         self.annual_table.heading("Compressor", text="Compressor")
         self.annual_table.heading("Annual Savings kWh", text="Annual Savings kWh")
+        self.annual_table.heading("kWh 90% Range", text="kWh 90% Range")
         self.annual_table.heading("Annual Savings ($)", text="Annual Savings ($)")
+        self.annual_table.heading("$ 90% Range", text="$ 90% Range")
 
         # Set column widths and alignment
         self.annual_table.column("Compressor", anchor="center", width=150)
         self.annual_table.column("Annual Savings kWh", anchor="center", width=140)
+        self.annual_table.column("kWh 90% Range", anchor="center", width=170)
         self.annual_table.column("Annual Savings ($)", anchor="center", width=140)
+        self.annual_table.column("$ 90% Range", anchor="center", width=170)
 
         self.annual_table.pack(padx=10, pady=5, fill="x")
 
+        # Peak Demand Table Frame
+        demand_frame = ttk.Frame(table_frame)
+        demand_frame.pack(fill="x", pady=(20, 0))
+
+        demand_label = ttk.Label(demand_frame, text="Peak Demand by Billing Month", style="Black.TLabel")
+        demand_label.pack(anchor="w", padx=5)
+
+        demand_cols = ("Month", "System Peak kW", "Peak Time", "Peak With Schedule kW", "Reduction kW")
+        self.demand_table = ttk.Treeview(demand_frame, columns=demand_cols, show="headings", height=4)
+        for col in demand_cols:
+            self.demand_table.heading(col, text=col)
+            self.demand_table.column(col, anchor="center", width=130)
+        self.demand_table.pack(padx=10, pady=5, fill="x")
+
+        # Day Type Table Frame (filled once dates are clustered into day types)
+        day_type_frame = ttk.Frame(table_frame)
+        day_type_frame.pack(fill="x", pady=(20, 0))
+
+        day_type_label = ttk.Label(day_type_frame, text="Savings by Day Type", style="Black.TLabel")
+        day_type_label.pack(anchor="w", padx=5)
+
+        self.day_type_table = ttk.Treeview(day_type_frame, columns=("Day Type", "kWh / Day", "Days / Year", "Annual Savings kWh", "Annual Savings ($)"), show="headings")
+        for col in ("Day Type", "kWh / Day", "Days / Year", "Annual Savings kWh", "Annual Savings ($)"):
+            self.day_type_table.heading(col, text=col)
+            self.day_type_table.column(col, anchor="center", width=120)
+        self.day_type_table.pack(padx=10, pady=5, fill="x")
+
+        # Historical Replay Table Frame: the schedule applied to every logged date
+        replay_frame = ttk.Frame(table_frame)
+        replay_frame.pack(fill="x", pady=(20, 0))
+
+        replay_label = ttk.Label(replay_frame, text="Savings Replayed Over Logged Dates", style="Black.TLabel")
+        replay_label.pack(anchor="w", padx=5)
+
+        replay_cols = ("Weekday", "Complete Dates", "Profile kWh / Day", "Logged kWh / Day", "10th - 90th Percentile", "Min - Max")
+        self.replay_table = ttk.Treeview(replay_frame, columns=replay_cols, show="headings", height=9)
+        for col in replay_cols:
+            self.replay_table.heading(col, text=col)
+            self.replay_table.column(col, anchor="center", width=130)
+        self.replay_table.pack(padx=10, pady=5, fill="x")
+
+        # Rate Sensitivity Table Frame: the schedule's savings under scaled and flat tariffs
+        sensitivity_frame = ttk.Frame(table_frame)
+        sensitivity_frame.pack(fill="x", pady=(20, 0))
+
+        sensitivity_label = ttk.Label(sensitivity_frame, text="Rate Sensitivity", style="Black.TLabel")
+        sensitivity_label.pack(anchor="w", padx=5)
+
+        sensitivity_cols = ("Tariff", "Average Rate ($/kWh)", "Annual Energy Savings ($)")
+        self.sensitivity_table = ttk.Treeview(sensitivity_frame, columns=sensitivity_cols, show="headings", height=6)
+        for col in sensitivity_cols:
+            self.sensitivity_table.heading(col, text=col)
+            self.sensitivity_table.column(col, anchor="center", width=160)
+        self.sensitivity_table.pack(padx=10, pady=5, fill="x")
+
+    def create_optimizer_frame(self, container):
+        """
+        Builds the automatic schedule optimizer controls.
+        """
+        optimizer_frame = ttk.Frame(container)
+        optimizer_frame.pack(fill="x", pady=(0, 20))
+
+        ttk.Label(optimizer_frame, text="Optimize Shutdown Schedule", style="Black.TLabel").grid(row=0, column=0, columnspan=4, sticky="w", padx=5)
+
+        ttk.Label(optimizer_frame, text="Min Off Window (hrs):", style="Black.TLabel").grid(row=1, column=0, sticky="e", padx=5, pady=2)
+        self.opt_min_entry = ttk.Entry(optimizer_frame, width=8)
+        self.opt_min_entry.insert(0, "2")
+        self.opt_min_entry.grid(row=1, column=1, sticky="w", pady=2)
+
+        ttk.Label(optimizer_frame, text="Max Daily Off (hrs):", style="Black.TLabel").grid(row=1, column=2, sticky="e", padx=5, pady=2)
+        self.opt_max_entry = ttk.Entry(optimizer_frame, width=8)
+        self.opt_max_entry.insert(0, "24")
+        self.opt_max_entry.grid(row=1, column=3, sticky="w", pady=2)
+
+        ttk.Label(optimizer_frame, text="Windows / Day:", style="Black.TLabel").grid(row=2, column=0, sticky="e", padx=5, pady=2)
+        self.opt_windows_entry = ttk.Entry(optimizer_frame, width=8)
+        self.opt_windows_entry.insert(0, "2")
+        self.opt_windows_entry.grid(row=2, column=1, sticky="w", pady=2)
+
+        ttk.Label(optimizer_frame, text="Production Hours:", style="Black.TLabel").grid(row=2, column=2, sticky="e", padx=5, pady=2)
+        self.opt_blocked_entry = ttk.Entry(optimizer_frame, width=30)
+        self.opt_blocked_entry.insert(0, "Mon-Fri 06:00-18:00")
+        self.opt_blocked_entry.grid(row=2, column=3, sticky="w", pady=2)
+
+        ttk.Label(optimizer_frame, text="Must Stay On:", style="Black.TLabel").grid(row=3, column=0, sticky="ne", padx=5, pady=2)
+        self.opt_stay_on_list = tk.Listbox(optimizer_frame, selectmode="multiple", height=4, exportselection=False, font=("Segoe UI", 10))
+        for compressor in self.sim.get_compressors():
+            self.opt_stay_on_list.insert(tk.END, compressor.get_name())
+        self.opt_stay_on_list.grid(row=3, column=1, sticky="w", pady=2)
+        self.opt_stay_on_list.bind("<<ListboxSelect>>", lambda event: self.calculate_shutdown_savings())
+
+        ttk.Button(optimizer_frame, text="Optimize", command=self.optimize_schedule).grid(row=3, column=3, sticky="w", pady=2)
+
+    def create_library_frame(self, container):
+        """
+        Builds the schedule library: named schedules that can be saved from the
+        grid, loaded back, imported / exported as CSV, added from templates and
+        compared side by side.
+        """
+        library_frame = ttk.Frame(container)
+        library_frame.pack(fill="x", pady=(0, 20))
+
+        ttk.Label(library_frame, text="Schedule Library", style="Black.TLabel").grid(row=0, column=0, columnspan=4, sticky="w", padx=5)
+
+        self.library_list = tk.Listbox(library_frame, selectmode="extended", height=6, width=30, exportselection=False, font=("Segoe UI", 10))
+        self.library_list.grid(row=1, column=0, rowspan=3, sticky="nw", padx=5, pady=2)
+        self.refresh_library_list()
+
+        ttk.Button(library_frame, text="Save Current...", command=self.save_schedule_to_library).grid(row=1, column=1, sticky="ew", padx=2, pady=2)
+        ttk.Button(library_frame, text="Load", command=self.load_library_schedule).grid(row=1, column=2, sticky="ew", padx=2, pady=2)
+        ttk.Button(library_frame, text="Delete", command=self.delete_library_schedules).grid(row=1, column=3, sticky="ew", padx=2, pady=2)
+        ttk.Button(library_frame, text="Import CSV...", command=self.import_library_csv).grid(row=2, column=1, sticky="ew", padx=2, pady=2)
+        ttk.Button(library_frame, text="Export CSV...", command=self.export_library_csv).grid(row=2, column=2, sticky="ew", padx=2, pady=2)
+        ttk.Button(library_frame, text="Compare", command=self.compare_library_schedules).grid(row=2, column=3, sticky="ew", padx=2, pady=2)
+
+        self.template_var = tk.StringVar(value=list(SCHEDULE_TEMPLATES)[0])
+        ttk.OptionMenu(library_frame, self.template_var, self.template_var.get(), *SCHEDULE_TEMPLATES).grid(row=3, column=1, columnspan=2, sticky="ew", padx=2, pady=2)
+        ttk.Button(library_frame, text="Add Template", command=self.add_library_template).grid(row=3, column=3, sticky="ew", padx=2, pady=2)
+
+        # comparison of the selected (or all) library schedules, rebuilt on every compare
+        self.comparison_table = ttk.Treeview(library_frame, columns=("Schedule",), show="headings", height=6)
+        self.comparison_table.heading("Schedule", text="Schedule")
+        self.comparison_table.grid(row=4, column=0, columnspan=4, sticky="ew", padx=5, pady=(10, 2))
+
+    def refresh_library_list(self):
+        self.library_list.delete(0, tk.END)
+        for name in self.schedule_library.names():
+            self.library_list.insert(tk.END, name)
+
+    def get_selected_library_names(self):
+        return [self.library_list.get(i) for i in self.library_list.curselection()]
+
+    def save_schedule_to_library(self):
+        name = simpledialog.askstring("Save Schedule", "Schedule name:", parent=self)
+        if not name or not name.strip():
+            return
+        name = name.strip()
+        if name in self.schedule_library.names() and not messagebox.askyesno("Save Schedule", f"Replace the schedule '{name}'?"):
+            return
+        self.schedule_library.add(name, self.scheduler.get_schedule(), self.sim.get_interval())
+        self.refresh_library_list()
+
+    def load_library_schedule(self):
+        names = self.get_selected_library_names()
+        if names:
+            self.scheduler.set_schedule(self.schedule_library.get(names[0], self.sim.get_interval()))
+
+    def delete_library_schedules(self):
+        for name in self.get_selected_library_names():
+            self.schedule_library.remove(name)
+        self.refresh_library_list()
+
+    def add_library_template(self):
+        self.schedule_library.add_template(self.template_var.get())
+        self.refresh_library_list()
+
+    def import_library_csv(self):
+        file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
+        if not file_path:
+            return
+        try:
+            names = self.schedule_library.import_csv(file_path)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Import Schedules", str(e))
+            return
+        self.refresh_library_list()
+        print(f"Imported {len(names)} schedules from: {file_path}")
+
+    def export_library_csv(self):
+        downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
+        file_path = filedialog.asksaveasfilename(initialdir=downloads_path, defaultextension=".csv", filetypes=[("CSV files", "*.csv")])
+        if not file_path:
+            return
+        try:
+            self.schedule_library.export_csv(file_path, self.get_selected_library_names() or None)
+        except OSError as e:
+            messagebox.showerror("Export Schedules", str(e))
+            return
+        print(f"Saved schedules to: {file_path}")
+
+    def compare_library_schedules(self):
+        """
+        Evaluates the selected library schedules (all of them if none are selected)
+        in one batched pass and lists them best first.
+        """
+        names = self.get_selected_library_names() or self.schedule_library.names()
+        if not names:
+            return
+        names, masks = self.schedule_library.masks(self.sim.get_interval(), names)
+        compressor_names, result = Analyzer(self.sim).compare_schedules(masks, exclude=self.get_must_stay_on())
+
+        columns = ["Schedule", "Off Hrs / Week"] + [f"{name} ($)" for name in compressor_names] + ["Annual kWh", "Annual $"]
+        self.comparison_table.destroy()
+        self.comparison_table = ttk.Treeview(self.comparison_table.master, columns=columns, show="headings", height=min(len(names), 10))
+        for col in columns:
+            self.comparison_table.heading(col, text=col)
+            self.comparison_table.column(col, anchor="center", width=150 if col == "Schedule" else 100)
+        self.comparison_table.grid(row=4, column=0, columnspan=4, sticky="ew", padx=5, pady=(10, 2))
+
+        for k in sorted(range(len(names)), key=lambda k: -result["total_dollars"][k]):
+            self.comparison_table.insert("", "end", values=(
+                [names[k], f"{result['off_hours'][k]:,.1f}"]
+                + [f"${value:,.2f}" for value in result["dollars"][k]]
+                + [f"{result['total_kwh'][k]:,.0f}", f"${result['total_dollars'][k]:,.2f}"]
+            ))
+
+    def get_must_stay_on(self):
+        """
+        Returns the names of compressors selected as must stay on.
+        """
+        if not hasattr(self, "opt_stay_on_list"):
+            return ()
+        return tuple(self.opt_stay_on_list.get(i) for i in self.opt_stay_on_list.curselection())
+
+    def optimize_schedule(self):
+        """
+        Runs the schedule optimizer with the entered constraints and loads the
+        winning schedule into the scheduler widget.
+        """
+        analyzer = Analyzer(self.sim)
+        try:
+            min_off = float(self.opt_min_entry.get())
+            max_off = float(self.opt_max_entry.get())
+            windows = int(self.opt_windows_entry.get())
+            blocked = parse_day_time_ranges(self.opt_blocked_entry.get(), self.sim.get_interval())
+            schedule = analyzer.optimize_shutdown_schedule(
+                min_off_hours=min_off,
+                max_daily_off_hours=max_off,
+                blocked=blocked,
+                must_stay_on=self.get_must_stay_on(),
+                max_windows_per_day=windows
+            )
+        except ValueError as e:
+            messagebox.showerror("Optimizer Error", str(e))
+            return
+        self.scheduler.set_schedule(schedule)
+
     def calculate_shutdown_savings(self):
         analyzer = Analyzer(self.sim)
         schedule = self.scheduler.get_schedule()                    # shutdown schedule 
-        result = analyzer.compute_shutdown_savings(schedule)        # stores shutdown savings data
+        result = analyzer.compute_shutdown_savings(schedule, exclude=self.get_must_stay_on())  # stores shutdown savings data
+        # confidence ranges from resampling the logged dates
+        result["bootstrap"] = analyzer.bootstrap_savings(schedule, exclude=self.get_must_stay_on(), demand_dollars=result["demand_dollars"])
         compressor_savings = result['compressor_savings']           # shutdown savings data by compressor
         savings_by_day = result['savings_by_day']                   # shutdown savings by day
         active_days = [day for day in schedule if schedule[day]]    # active days in shutdown schedule
+        analyzer.update_heatmap_schedule(self.heatmap_fig, analyzer.schedule_to_mask(schedule))
 
         # ----------- WEEKLY TABLE ---------------#
         # create columns for table
@@ -788,23 +1564,283 @@ class Interface(tk.Tk):
             self.annual_table.delete(row)
 
         # insert rows for each compressor
+        bootstrap = result["bootstrap"]
         for comp_name, savings_dict in compressor_savings.items():
             annual_kwh = savings_dict.get("Annual", 0.0)
             annual_dollars = savings_dict.get("Annual $", 0.0)
+            ranges = bootstrap["compressors"][comp_name]
             self.annual_table.insert("", "end", values=(
                 comp_name,
                 f"{annual_kwh:,.2f}",
-                f"${annual_dollars:,.2f}"
+                "{:,.0f} - {:,.0f}".format(*ranges["kwh"]),
+                f"${annual_dollars:,.2f}",
+                "${:,.0f} - ${:,.0f}".format(*ranges["dollars"])
+            ))
+
+        # demand charge savings are a system total, not per compressor
+        if result["demand_dollars"]:
+            self.annual_table.insert("", "end", values=(
+                "Demand Charges",
+                "",
+                "",
+                f"${result['demand_dollars']:,.2f}",
+                ""
             ))
 
         # insert and format total row
         self.annual_table.insert("", "end", values=(
             "Total",
             f"{result['total_kwh']:,.2f}",
-            f"${result['total_dollars']:,.2f}"
+            "{:,.0f} - {:,.0f}".format(*bootstrap["total"]["kwh"]),
+            f"${result['total_dollars']:,.2f}",
+            "${:,.0f} - ${:,.0f}".format(*bootstrap["total"]["dollars"])
         ), tags=("total_row",))
         self.annual_table.tag_configure("total_row", background="#747474", font=("Segoe UI", 10, "bold"))
 
+        # ----------- PEAK DEMAND TABLE ----------- #
+        for row in self.demand_table.get_children():
+            self.demand_table.delete(row)
+
+        demand = analyzer.compute_peak_demand(self.sim.get_tariff().demand_window, schedule, self.get_must_stay_on())
+        for month, peak in demand["system"].items():
+            after_kw = demand["after"].get(month, peak)["peak_kw"]
+            self.demand_table.insert("", "end", values=(
+                month,
+                f"{peak['peak_kw']:,.2f}",
+                str(peak["time"]).replace("T", " "),
+                f"{after_kw:,.2f}",
+                f"{peak['peak_kw'] - after_kw:,.2f}"
+            ))
+
+        # ----------- DAY TYPE TABLE ----------- #
+        for row in self.day_type_table.get_children():
+            self.day_type_table.delete(row)
+
+        if self.sim.has_clustered_day_types():
+            day_type_result = analyzer.compute_day_type_savings(schedule, exclude=self.get_must_stay_on())
+            for day_type, savings in day_type_result.items():
+                self.day_type_table.insert("", "end", values=(
+                    day_type,
+                    f"{savings['Total']:,.2f}",
+                    f"{savings['Days/Year']:,.1f}",
+                    f"{savings['Annual']:,.2f}",
+                    f"${savings['Annual $']:,.2f}"
+                ))
+
+        # ----------- HISTORICAL REPLAY TABLE ----------- #
+        for row in self.replay_table.get_children():
+            self.replay_table.delete(row)
+
+        replay = analyzer.replay_schedule(schedule, exclude=self.get_must_stay_on())
+        for day, stats in replay["weekdays"].items():
+            logged = stats["days"] > 0
+            self.replay_table.insert("", "end", values=(
+                day,
+                stats["days"],
+                f"{stats['profile_kwh']:,.2f}",
+                f"{stats['mean_kwh']:,.2f}" if logged else "",
+                f"{stats['p10_kwh']:,.0f} - {stats['p90_kwh']:,.0f}" if logged else "",
+                f"{stats['min_kwh']:,.0f} - {stats['max_kwh']:,.0f}" if logged else ""
+            ))
+        week_kwh = [kwh for _, kwh, _ in replay["weeks"]]
+        self.replay_table.insert("", "end", values=(
+            "Week",
+            f"{len(week_kwh)} weeks",
+            f"{replay['profile_week_kwh']:,.2f}",
+            f"{replay['realized_week_kwh']:,.2f}",
+            "{:,.0f} - {:,.0f}".format(*replay["week_range"]) if week_kwh else "",
+            f"{min(week_kwh):,.0f} - {max(week_kwh):,.0f}" if week_kwh else ""
+        ), tags=("total_row",))
+        self.replay_table.insert("", "end", values=(
+            "Annual",
+            "",
+            f"{replay['profile_annual_kwh']:,.0f} kWh",
+            f"{replay['realized_annual_kwh']:,.0f} kWh",
+            f"${replay['profile_annual_dollars']:,.0f} profile",
+            f"${replay['realized_annual_dollars']:,.0f} logged"
+        ), tags=("total_row",))
+        self.replay_table.tag_configure("total_row", background="#747474", font=("Segoe UI", 10, "bold"))
+
+        # ----------- RATE SENSITIVITY TABLE ----------- #
+        for row in self.sensitivity_table.get_children():
+            self.sensitivity_table.delete(row)
+
+        sweep = analyzer.sensitivity_tariffs()
+        dollars = analyzer.rate_sensitivity(schedule, [tariff for _, tariff in sweep], exclude=self.get_must_stay_on())
+        for (label, tariff), value in zip(sweep, dollars):
+            self.sensitivity_table.insert("", "end", values=(label, f"{tariff.average_rate():.4f}", f"${value:,.2f}"))
+
+    def generate_report(self):
+        """
+        Saves a PDF or HTML report of the simulation and the current shutdown schedule.
+        Figures are rendered by worker processes, so the interface stays responsive.
+        """
+        downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
+        file_path = filedialog.asksaveasfilename(initialdir=downloads_path, defaultextension=".pdf", filetypes=REPORT_FILE_TYPES)
+        if not file_path:
+            return
+
+        schedule = self.scheduler.get_schedule()
+        analyzer = Analyzer(self.sim)
+        result = analyzer.compute_shutdown_savings(schedule, exclude=self.get_must_stay_on())
+        result["bootstrap"] = analyzer.bootstrap_savings(schedule, exclude=self.get_must_stay_on(), demand_dollars=result["demand_dollars"])
+        self.report_button.config(state=tk.DISABLED)
+        self.report_status_label.config(text="Generating report...")
+
+        def run():
+            try:
+                generate_report(self.sim, schedule, result, file_path)
+                self.after(0, self._on_report_done, file_path, None)
+            except Exception as e:
+                self.after(0, self._on_report_done, file_path, e)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def save_to_warehouse(self):
+        """
+        Stores the simulation and the savings of the current shutdown schedule in
+        the results warehouse under a site name.
+        """
+        default_site = self.site_name or (os.path.splitext(os.path.basename(self.project_path))[0] if self.project_path else "")
+        site = simpledialog.askstring("Save to Warehouse", "Site name:", initialvalue=default_site, parent=self)
+        if not site or not site.strip():
+            return
+        self.site_name = site.strip()
+
+        schedule = self.scheduler.get_schedule()
+        analyzer = Analyzer(self.sim)
+        result = analyzer.compute_shutdown_savings(schedule, exclude=self.get_must_stay_on())
+        result["bootstrap"] = analyzer.bootstrap_savings(schedule, exclude=self.get_must_stay_on(), demand_dollars=result["demand_dollars"])
+        try:
+            with ResultsWarehouse(self.warehouse_path) as warehouse:
+                warehouse.save_run(self.site_name, self.sim, schedule, result, project_path=self.project_path)
+        except Exception as e:
+            messagebox.showerror("Save to Warehouse", str(e))
+            return
+        self.report_status_label.config(text=f"Saved {self.site_name} to the warehouse")
+        self.refresh_warehouse()
+
+    def create_warehouse_tab(self):
+        """
+        Builds the results warehouse browser: annual savings totals and the stored
+        runs, filtered by site and logging dates. Kept across simulation runs.
+        """
+        warehouse_tab, scrollable_frame, canvas = self.create_scrollable_tab("Results Warehouse")
+
+        filter_frame = ttk.Frame(scrollable_frame)
+        filter_frame.pack(fill="x", padx=10, pady=10)
+
+        ttk.Label(filter_frame, text="Site:", style="Black.TLabel").grid(row=0, column=0, sticky="e", padx=5, pady=2)
+        self.warehouse_site_var = tk.StringVar(value="All Sites")
+        self.warehouse_site_box = ttk.Combobox(filter_frame, textvariable=self.warehouse_site_var, values=["All Sites"], width=24)
+        self.warehouse_site_box.grid(row=0, column=1, sticky="w", pady=2)
+
+        ttk.Label(filter_frame, text="Logged From:", style="Black.TLabel").grid(row=0, column=2, sticky="e", padx=5, pady=2)
+        self.warehouse_start_entry = DateEntry(filter_frame, font=('Segoe UI', 11))
+        self.warehouse_start_entry.grid(row=0, column=3, sticky="w", pady=2)
+
+        ttk.Label(filter_frame, text="To:", style="Black.TLabel").grid(row=0, column=4, sticky="e", padx=5, pady=2)
+        self.warehouse_end_entry = DateEntry(filter_frame, font=('Segoe UI', 11))
+        self.warehouse_end_entry.grid(row=0, column=5, sticky="w", pady=2)
+
+        self.warehouse_group_options = {"No Grouping": None, "Site": "site", "Year": "year", "Quarter": "quarter", "Month": "month"}
+        ttk.Label(filter_frame, text="Group By:", style="Black.TLabel").grid(row=1, column=0, sticky="e", padx=5, pady=2)
+        self.warehouse_group_var = tk.StringVar(value="Site")
+        ttk.OptionMenu(filter_frame, self.warehouse_group_var, "Site", *self.warehouse_group_options.keys()).grid(row=1, column=1, sticky="w", pady=2)
+
+        self.warehouse_latest_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(filter_frame, text="Newest run per site only", variable=self.warehouse_latest_var).grid(row=1, column=2, columnspan=2, sticky="w", padx=5, pady=2)
+
+        ttk.Button(filter_frame, text="Refresh", command=self.refresh_warehouse).grid(row=1, column=4, sticky="ew", padx=2, pady=2)
+        ttk.Button(filter_frame, text="Delete Run", command=self.delete_warehouse_run).grid(row=1, column=5, sticky="ew", padx=2, pady=2)
+
+        ttk.Label(scrollable_frame, text="Annual Savings Totals", style="Black.TLabel").pack(anchor="w", padx=15, pady=(10, 0))
+        totals_cols = ("Group", "Sites", "Runs", "Annual Savings kWh", "Annual Savings ($)")
+        self.warehouse_totals_table = ttk.Treeview(scrollable_frame, columns=totals_cols, show="headings", height=6)
+        for col in totals_cols:
+            self.warehouse_totals_table.heading(col, text=col)
+            self.warehouse_totals_table.column(col, anchor="center", width=150)
+        self.warehouse_totals_table.pack(padx=10, pady=5, fill="x")
+
+        ttk.Label(scrollable_frame, text="Stored Runs", style="Black.TLabel").pack(anchor="w", padx=15, pady=(10, 0))
+        runs_cols = ("Run", "Site", "Saved", "Logged From", "Logged To", "Interval", "Annual Savings kWh", "kWh 90% Range", "Annual Savings ($)", "Project")
+        self.warehouse_runs_table = ttk.Treeview(scrollable_frame, columns=runs_cols, show="headings", height=12)
+        for col in runs_cols:
+            self.warehouse_runs_table.heading(col, text=col)
+            self.warehouse_runs_table.column(col, anchor="center", width=60 if col in ("Run", "Interval") else 140)
+        self.warehouse_runs_table.pack(padx=10, pady=5, fill="x")
+
+        self.warehouse_path_label = ttk.Label(scrollable_frame, text=self.warehouse_path)
+        self.warehouse_path_label.pack(anchor="w", padx=15, pady=(5, 10))
+        self.refresh_warehouse()
+
+    def refresh_warehouse(self):
+        """
+        Fills the warehouse tables from the database with the current filters.
+        """
+        for table in (self.warehouse_totals_table, self.warehouse_runs_table):
+            for row in table.get_children():
+                table.delete(row)
+        if not os.path.exists(self.warehouse_path):
+            self.warehouse_path_label.config(text=f"{self.warehouse_path} (no results saved yet)")
+            return
+
+        site = self.warehouse_site_var.get().strip()
+        site = None if site in ("", "All Sites") else site
+        start = self.warehouse_start_entry.get().strip() or None
+        end = self.warehouse_end_entry.get().strip() or None
+        latest_only = self.warehouse_latest_var.get()
+        try:
+            with ResultsWarehouse(self.warehouse_path) as warehouse:
+                self.warehouse_site_box.config(values=["All Sites"] + warehouse.sites())
+                totals = warehouse.savings_totals(self.warehouse_group_options[self.warehouse_group_var.get()], site, start, end, latest_only)
+                runs = warehouse.runs(site, start, end, latest_only)
+        except ValueError as e:
+            messagebox.showerror("Results Warehouse", f"Dates must be MM/DD/YYYY.\n{e}")
+            return
+        except Exception as e:
+            messagebox.showerror("Results Warehouse", str(e))
+            return
+
+        for total in totals:
+            self.warehouse_totals_table.insert("", "end", values=(
+                total["group"], total["sites"], total["runs"], f"{total['kwh']:,.0f}", f"${total['dollars']:,.2f}"))
+        for run in runs:
+            kwh_range = "" if run["kwh_low"] is None else f"{run['kwh_low']:,.0f} - {run['kwh_high']:,.0f}"
+            self.warehouse_runs_table.insert("", "end", iid=str(run["id"]), values=(
+                run["id"],
+                run["site"],
+                run["run_time"].replace("T", " "),
+                run["deployed_date"],
+                run["collected_date"],
+                run["interval_minutes"],
+                f"{run['total_kwh']:,.0f}",
+                kwh_range,
+                f"${run['total_dollars']:,.2f}",
+                os.path.basename(run["project_path"] or "")
+            ))
+        self.warehouse_path_label.config(text=self.warehouse_path)
+
+    def delete_warehouse_run(self):
+        """
+        Deletes the selected stored runs from the warehouse.
+        """
+        selected = self.warehouse_runs_table.selection()
+        if not selected or not messagebox.askyesno("Results Warehouse", f"Delete {len(selected)} stored run(s)?"):
+            return
+        with ResultsWarehouse(self.warehouse_path) as warehouse:
+            for run_id in selected:
+                warehouse.delete_run(int(run_id))
+        self.refresh_warehouse()
+
+    def _on_report_done(self, file_path, error):
+        self.report_button.config(state=tk.NORMAL)
+        if error:
+            self.report_status_label.config(text="Report failed.")
+            messagebox.showerror("Report Error", str(error))
+        else:
+            self.report_status_label.config(text=f"Saved {os.path.basename(file_path)}")
+
     def create_measur_export_tab(self):
         """
         Creates the export to MEASUR tab.
@@ -847,6 +1883,17 @@ class Interface(tk.Tk):
             activeforeground="#000000",
         )
 
+        # --- Day type clustering (0 = weekdays) ---
+        day_type_frame = ttk.Frame(left_frame, style="Container.TFrame")
+        day_type_frame.grid(row=0, column=2, padx=(20, 5), sticky="w")
+        ttk.Label(day_type_frame, text="Day Types:").grid(row=0, column=0, padx=(0, 5), sticky="w")
+        self.day_type_count = tk.Spinbox(day_type_frame, from_=0, to=10, width=4, font=("Segoe UI", 11))
+        self.day_type_count.grid(row=0, column=1, padx=(0, 5), sticky="w")
+        self.day_type_method = tk.StringVar(self)
+        method_menu = ttk.OptionMenu(day_type_frame, self.day_type_method, "kmeans", "kmeans", "hierarchical")
+        method_menu.grid(row=0, column=2, padx=(0, 5), sticky="w")
+        ttk.Button(day_type_frame, text="Apply", command=self.apply_day_types).grid(row=0, column=3, sticky="w")
+
         # --- Label for compressors ---
         ttk.Label(left_frame, text="Select Compressors:").grid(row=1, column=0, padx=(10, 5), pady=(10,5), sticky="w")
 
@@ -923,6 +1970,29 @@ class Interface(tk.Tk):
         export_btn.grid(row=0, column=0, sticky="w", padx=5, pady=5)
 
 
+    def apply_day_types(self):
+        """
+        Clusters the logged dates into the selected number of day types (0 resets
+        to weekdays) and refreshes the day menu, power data and savings tables.
+        """
+        try:
+            n_day_types = int(self.day_type_count.get())
+            self.sim.cluster_day_types(n_day_types, method=self.day_type_method.get())
+        except Exception as e:
+            messagebox.showerror("Day Type Error", str(e))
+            return
+
+        # rebuild day menu options
+        day_values = self.sim.get_daytypes()
+        menu = self.day_menu["menu"]
+        menu.delete(0, "end")
+        for value in day_values:
+            menu.add_command(label=value, command=lambda v=value: self.day_var.set(v))
+        self.day_var.set(day_values[0])
+
+        self.populate_data_text()
+        self.calculate_shutdown_savings()
+
     def run_simulation(self):
         """
         Pressed when all simulation data has been entered, including kWh rate, start and end date, compressor information. 
@@ -937,10 +2007,95 @@ class Interface(tk.Tk):
         # Run simulation
         threading.Thread(target=self._run_simulation_background, daemon=True).start()
 
+    def save_project(self):
+        """
+        Saves the processed simulation, setup inputs and shutdown schedule to a project file.
+        """
+        if not self.sim.get_compressors() or not hasattr(self, "scheduler"):
+            messagebox.showerror("Save Project", "Run the simulation before saving a project.")
+            return
+
+        downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
+        file_path = filedialog.asksaveasfilename(initialdir=downloads_path, defaultextension=".cmproj", filetypes=PROJECT_FILE_TYPES)
+        if not file_path:
+            return
+
+        ui_state = {
+            "rate_periods": self.rate_periods,
+            "rate_tiers": self.rate_tiers,
+            "other_monthly_kwh": self.other_monthly_kwh,
+            "demand_rate": self.demand_entry.get().strip(),
+            "demand_window": self.demand_window_var.get(),
+            "schedule_library": self.schedule_library.to_dict(),
+            "site_name": self.site_name
+        }
+        mask = schedule_to_mask(self.scheduler.get_schedule(), self.sim.get_interval())
+        try:
+            save_project(file_path, self.sim, mask, ui_state)
+        except Exception as e:
+            messagebox.showerror("Save Project", str(e))
+            return
+        self.project_path = file_path
+        self.status_label.config(text=f"Saved project {os.path.basename(file_path)}")
+
+    def open_project(self):
+        """
+        Opens a project file: restores the setup inputs, compressor profiles and
+        shutdown schedule without reading the raw logger files. If a source file
+        changed since the project was saved, offers to reprocess it.
+        """
+        downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
+        file_path = filedialog.askopenfilename(initialdir=downloads_path, filetypes=PROJECT_FILE_TYPES)
+        if not file_path:
+            return
+
+        try:
+            ui_state, mask, stale = load_project(file_path, self.sim)
+        except Exception as e:
+            messagebox.showerror("Open Project", str(e))
+            return
+
+        # setup inputs
+        self.kwh_entry.delete(0, tk.END)
+        self.kwh_entry.insert(0, str(self.sim.get_kwh_rate()))
+        for label, value in self.interval_options.items():
+            if value == self.sim.get_interval():
+                self.interval_var.set(label)
+        self.deployed_date_entry.delete(0, tk.END)
+        self.deployed_date_entry.insert(0, self.sim.get_deployed_date())
+        self.collected_date_entry.delete(0, tk.END)
+        self.collected_date_entry.insert(0, self.sim.get_collected_date())
+        self.demand_entry.delete(0, tk.END)
+        self.demand_entry.insert(0, ui_state.get("demand_rate", "0"))
+        self.demand_window_var.set(ui_state.get("demand_window", "15 Minute Demand"))
+        self.set_rate_schedule(ui_state.get("rate_periods", []), [tuple(t) for t in ui_state.get("rate_tiers", [])], ui_state.get("other_monthly_kwh", 0.0))
+
+        if "schedule_library" in ui_state:
+            self.schedule_library = ScheduleLibrary.from_dict(ui_state["schedule_library"])
+        self.site_name = ui_state.get("site_name", "")
+        self.project_path = file_path
+
+        # compressor frames
+        for frame in self.compressor_frames[1:]:
+            self.remove_compressor_frame(frame)
+        for i, compressor in enumerate(self.sim.get_compressors()):
+            frame = self.compressor_frames[0] if i == 0 else self.add_compressor_frame()
+            frame.set_compressor(compressor)
+
+        # result tabs and schedule
+        self.reset_result_tabs()
+        self._on_simulation_complete()
+        if mask is not None:
+            self.scheduler.set_schedule(mask_to_schedule(mask, self.sim.get_interval()))
+        self.status_label.config(text=f"Opened project {os.path.basename(file_path)}")
+
+        if stale and messagebox.askyesno("Open Project", "These data files changed since the project was saved:\n" + "\n".join(stale) + "\n\nReprocess the raw data now?"):
+            self.run_simulation()
+
     def reset_result_tabs(self):
-        # Keep only the first tab (Simulation Setup)
-        while self.notebook.index("end") > 1:
-            self.notebook.forget(1)
+        # Keep only the first two tabs (Simulation Setup and the Results Warehouse)
+        while self.notebook.index("end") > 2:
+            self.notebook.forget(2)
 
     def _run_simulation_background(self):
         try:
@@ -973,7 +2128,13 @@ class Interface(tk.Tk):
                 raise ValueError("Dates cannot be in the future.")
 
 
+            try:
+                demand_rate = float(self.demand_entry.get().strip() or 0)
+            except ValueError:
+                raise ValueError("Please enter a valid demand charge.")
+
             self.sim.set_kwh_rate(kWh_rate)
+            self.sim.set_tariff(self.build_tariff(kWh_rate, demand_rate))
             self.sim.set_interval(interval_value)
             self.sim.set_deployed_date(deployed_date_str)
             self.sim.set_collected_date(collected_date_str)
@@ -982,6 +2143,10 @@ class Interface(tk.Tk):
             compressor_names = []
             for frame in self.compressor_frames:
                 compressor = frame.get_compressor_data()
+                coverage = frame.get_span_coverage(deployed_date.date(), collected_date.date())
+                if coverage is not None and coverage[0] == 0:
+                    raise ValueError(f"The data file for compressor '{compressor.get_name()}' has no data between the deployed and collected dates "
+                                     f"(logged {frame.time_span[0]:%m/%d/%Y} to {frame.time_span[1]:%m/%d/%Y}).")
                 compressors.append(compressor)
                 compressor_names.append(compressor.get_name())
             self.sim.set_compressors(compressors)
@@ -1000,6 +2165,9 @@ class Interface(tk.Tk):
 
     def _on_simulation_complete(self):
         self.create_graph_tab()
+        self.create_trace_tab()
+        self.create_quality_tab()
+        self.create_sequencing_tab()
         self.create_shutdown_tab()
         self.create_measur_export_tab()
         self.create_data_tab()
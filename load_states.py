@@ -0,0 +1,146 @@
+"""
+Load state detection for compressor amp traces. Every sample is classified as
+off, unloaded or loaded with vectorized thresholds, and the state sequence is
+run-length encoded to measure duty cycle and load / unload cycling.
+"""
+import numpy as np
+
+OFF, UNLOADED, LOADED = 0, 1, 2
+STATE_NAMES = {OFF: "Off", UNLOADED: "Unloaded", LOADED: "Loaded"}
+N_HIST_BINS = 256
+MAX_GAP_FACTOR = 5      # sample gaps longer than this many typical steps are not counted as time
+
+def otsu_thresholds(counts, edges):
+    """
+    Returns the two thresholds that best split a histogram into three classes
+    (multi-level Otsu). Every pair of split points is scored at once: the best
+    pair maximizes the sum over classes of (class mass)^2 / (class weight).
+    """
+    centers = (edges[:-1] + edges[1:]) / 2
+    weight = np.concatenate(([0.0], np.cumsum(counts)))
+    mass = np.concatenate(([0.0], np.cumsum(counts * centers)))
+    n = len(counts)
+
+    # split i ends class 0 after bin i - 1, split j ends class 1 after bin j - 1
+    i = np.arange(1, n)[:, None]
+    j = np.arange(1, n)[None, :]
+    w0, w1, w2 = weight[i], weight[j] - weight[i], weight[n] - weight[j]
+    m0, m1, m2 = mass[i], mass[j] - mass[i], mass[n] - mass[j]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        score = m0 ** 2 / w0 + m1 ** 2 / w1 + m2 ** 2 / w2
+    score = np.where((j > i) & (w0 > 0) & (w1 > 0) & (w2 > 0), score, -np.inf)
+
+    best_i, best_j = np.unravel_index(np.argmax(score), score.shape)
+    return float(edges[best_i + 1]), float(edges[best_j + 1])
+
+def derive_thresholds(values):
+    """
+    Derives (off, loaded) thresholds from the histogram of a trace by
+    splitting it into off, unloaded and loaded classes.
+    """
+    values = values[~np.isnan(values)]
+    if not len(values) or values.max() <= 0:
+        return 0.0, 0.0
+    counts, edges = np.histogram(values, bins=N_HIST_BINS, range=(0.0, float(values.max())))
+    return otsu_thresholds(counts, edges)
+
+def classify(values, off, loaded):
+    """
+    Classifies every sample: OFF below off, LOADED at or above loaded,
+    UNLOADED in between. Missing samples are classified as OFF.
+    """
+    states = np.full(len(values), UNLOADED, dtype=np.int8)
+    states[(values < off) | np.isnan(values)] = OFF
+    states[values >= loaded] = LOADED
+    return states
+
+def run_length_encode(states):
+    """
+    Returns (starts, lengths, run_states) for the runs of equal states.
+    """
+    if not len(states):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int8)
+    starts = np.concatenate(([0], np.flatnonzero(states[1:] != states[:-1]) + 1))
+    lengths = np.diff(np.concatenate((starts, [len(states)])))
+    return starts, lengths, states[starts]
+
+def sample_hours(times_ns):
+    """
+    Returns the duration each sample represents in hours (time to the next
+    sample). Gaps much longer than the typical step count as one typical step.
+    """
+    if len(times_ns) < 2:
+        return np.zeros(len(times_ns))
+    steps = np.diff(times_ns).astype(float)
+    typical = np.median(steps)
+    steps = np.where(steps > MAX_GAP_FACTOR * typical, typical, steps)
+    return np.append(steps, typical) / 3.6e12
+
+def analyze_states(times_ns, values, kw, buckets, n_buckets, thresholds=None):
+    """
+    Runs the full load state analysis over a trace.
+    times_ns = int64 sample times (ns), sorted
+    values = trace to classify (amps, or kW for kW-only loggers)
+    kw = power of every sample in kW
+    buckets = (weekday, interval) bucket index of every sample
+    thresholds = (off, loaded) or None to derive them from the histogram
+    Returns a summary dict.
+    """
+    off, loaded = thresholds if thresholds else derive_thresholds(values)
+    states = classify(values, off, loaded)
+    hours = sample_hours(times_ns)
+    starts, lengths, run_states = run_length_encode(states)
+
+    state_hours = np.bincount(states, weights=hours, minlength=3)
+    running_hours = state_hours[UNLOADED] + state_hours[LOADED]
+    total_hours = state_hours.sum()
+
+    # a load cycle is every run of LOADED, off-to-on starts are runs leaving OFF
+    loaded_runs = run_states == LOADED
+    load_cycles = int(loaded_runs.sum())
+    starts_from_off = int(((run_states[1:] != OFF) & (run_states[:-1] == OFF)).sum())
+    loaded_run_hours = np.add.reduceat(hours, starts)[loaded_runs] if len(starts) else np.zeros(0)
+
+    unloaded = states == UNLOADED
+    unloaded_kwh = np.bincount(buckets[unloaded], weights=np.nan_to_num(kw[unloaded]) * hours[unloaded], minlength=n_buckets)
+
+    return {
+        "off_threshold": off,
+        "loaded_threshold": loaded,
+        "off_hours": float(state_hours[OFF]),
+        "unloaded_hours": float(state_hours[UNLOADED]),
+        "loaded_hours": float(state_hours[LOADED]),
+        "duty_cycle": float(state_hours[LOADED] / running_hours) if running_hours else 0.0,   # loaded share of running time
+        "utilization": float(state_hours[LOADED] / total_hours) if total_hours else 0.0,     # loaded share of logged time
+        "cycles_per_hour": float(load_cycles / running_hours) if running_hours else 0.0,
+        "starts": starts_from_off,
+        "avg_loaded_run_minutes": float(loaded_run_hours.mean() * 60) if len(loaded_run_hours) else 0.0,
+        "unloaded_kwh": float(unloaded_kwh.sum()),
+        "unloaded_kwh_by_bucket": unloaded_kwh      # total over the deployment, per (weekday, interval)
+    }
+
+def merge_states(first, second):
+    """
+    Combines the summaries of two consecutive stretches of a trace analyzed with
+    the same thresholds (e.g. a file and the rows appended to it later). A run
+    crossing the seam is counted once in each part.
+    """
+    def loaded_runs(summary):
+        running = summary["unloaded_hours"] + summary["loaded_hours"]
+        return round(summary["cycles_per_hour"] * running)
+
+    merged = dict(first)
+    for key in ("off_hours", "unloaded_hours", "loaded_hours", "unloaded_kwh"):
+        merged[key] = first[key] + second[key]
+    merged["starts"] = first["starts"] + second["starts"]
+    merged["unloaded_kwh_by_bucket"] = first["unloaded_kwh_by_bucket"] + second["unloaded_kwh_by_bucket"]
+
+    running_hours = merged["unloaded_hours"] + merged["loaded_hours"]
+    total_hours = running_hours + merged["off_hours"]
+    cycles = loaded_runs(first) + loaded_runs(second)
+    run_minutes = first["avg_loaded_run_minutes"] * loaded_runs(first) + second["avg_loaded_run_minutes"] * loaded_runs(second)
+    merged["duty_cycle"] = merged["loaded_hours"] / running_hours if running_hours else 0.0
+    merged["utilization"] = merged["loaded_hours"] / total_hours if total_hours else 0.0
+    merged["cycles_per_hour"] = cycles / running_hours if running_hours else 0.0
+    merged["avg_loaded_run_minutes"] = run_minutes / cycles if cycles else 0.0
+    return merged
@@ -1,8 +1,13 @@
-from interface import Interface
+import sys
 
 
 if __name__ == "__main__":
-    app = Interface()
-    app.mainloop()
+    if "--serve" in sys.argv:
+        from service import main   # headless: no Tk window in service mode
+        main()
+    else:
+        from interface import Interface
+        app = Interface()
+        app.mainloop()
 
 
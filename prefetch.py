@@ -0,0 +1,121 @@
+"""
+Background parsing of logger files. Parsing starts as soon as a file is
+selected, so by the time the simulation runs only the cheap date trim and
+bucketing steps are left.
+"""
+import threading
+from compressor import parse_logger_file, ParseCancelled
+from ingest import file_stamp
+
+class _ParseJob:
+    """
+    One background parse of a source.
+    """
+    def __init__(self, source):
+        self.source = source
+        self.stamp = file_stamp(source)    # detects files replaced after parsing started
+        self.cancel_event = threading.Event()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.callbacks = []     # on_done(source, error) callbacks, called once the parse finishes
+        self.lock = threading.Lock()
+
+    def run(self):
+        try:
+            self.result = parse_logger_file(self.source, self.cancel_event)
+        except ParseCancelled:
+            pass
+        except Exception as e:
+            self.error = e
+        with self.lock:
+            self.done.set()
+            callbacks = list(self.callbacks)
+        if not self.cancel_event.is_set():
+            for on_done in callbacks:
+                on_done(self.source, self.error)
+
+    def add_callback(self, on_done):
+        # runs on_done now if the parse already finished
+        with self.lock:
+            if not self.done.is_set():
+                self.callbacks.append(on_done)
+                return
+        on_done(self.source, self.error)
+
+class ParseCache:
+    """
+    Parsed logger files keyed by source. start() parses a source on a
+    background thread; get() returns the parsed form, waiting for a running
+    parse or parsing in the calling thread if none was started. Entries are
+    held only until the source is ingested (Compressor.compute_power drops them).
+    """
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def start(self, source, on_done=None):
+        """
+        Starts parsing a source in the background. on_done(source, error) is
+        called from the worker thread when it finishes (error is None on success).
+        A source that is already parsed or parsing is not started again.
+        """
+        with self._lock:
+            job = self._jobs.get(source)
+            reuse = job is not None and job.stamp == file_stamp(source) and job.error is None
+            if not reuse:
+                if job is not None:
+                    job.cancel_event.set()
+                job = _ParseJob(source)
+                self._jobs[source] = job
+        if on_done:
+            job.add_callback(on_done)
+        if not reuse:
+            threading.Thread(target=job.run, daemon=True).start()
+
+    def cancel(self, source):
+        """
+        Cancels a running parse (or drops a finished one) to free its memory.
+        """
+        with self._lock:
+            job = self._jobs.pop(source, None)
+        if job is not None:
+            job.cancel_event.set()
+
+    def status(self, source):
+        """
+        Returns "parsing", "ready", "failed" or None if the source was never started.
+        """
+        job = self._jobs.get(source)
+        if job is None:
+            return None
+        if not job.done.is_set():
+            return "parsing"
+        return "failed" if job.error else "ready"
+
+    def get(self, source):
+        """
+        Returns the parsed form of a source (see parse_logger_file).
+        """
+        with self._lock:
+            job = self._jobs.get(source)
+        if job is not None:
+            job.done.wait()
+            if job.stamp == file_stamp(source) and not job.cancel_event.is_set():
+                if job.error:
+                    raise job.error
+                return job.result
+
+        # nothing usable in the cache: parse here and keep the result
+        job = _ParseJob(source)
+        job.result = parse_logger_file(source)
+        job.done.set()
+        with self._lock:
+            self._jobs[source] = job
+        return job.result
+
+    def clear(self):
+        with self._lock:
+            jobs, self._jobs = list(self._jobs.values()), {}
+        for job in jobs:
+            job.cancel_event.set()
@@ -0,0 +1,180 @@
+"""
+Project files: a zip bundle holding project.json (inputs and metadata) and
+arrays.npz (every compressor's accumulators and the shutdown schedule mask).
+Opening a project restores the computed profiles without reading any logger
+files.
+"""
+import io
+import json
+import zipfile
+import numpy as np
+from compressor import Compressor
+from ingest import file_fingerprint, source_exists
+from sketch import BucketHistogram
+from pyramid import TracePyramid
+from tariff import Tariff
+
+PROJECT_VERSION = 1
+PROJECT_FILE_TYPES = [("Compressment projects", "*.cmproj")]
+
+def save_project(path, sim, schedule_mask=None, ui_state=None):
+    """
+    Saves a simulation, its computed compressor data and the shutdown schedule
+    mask to a project file. ui_state is any JSON-serializable dict of extra
+    inputs to restore in the interface.
+    """
+    arrays = {}
+    compressors = []
+    for i, comp in enumerate(sim.get_compressors()):
+        try:
+            fingerprint = file_fingerprint(comp.file_path) if source_exists(comp.file_path) else None
+        except OSError:
+            fingerprint = None
+        load_states = {k: v for k, v in comp.load_states.items() if k != "unloaded_kwh_by_bucket"}
+        quality = {k: v for k, v in comp.quality.items() if k != "bucket_counts"}
+        compressors.append({
+            "name": comp.get_name(),
+            "voltage": comp.voltage,
+            "file_path": comp.file_path,
+            "phase_mode": comp.phase_mode,
+            "state_thresholds": comp.state_thresholds,
+            "channels": comp.channels,
+            "measured_kw": comp.measured_kw,
+            "current_column": comp.current_column,
+            "phase_data": comp.phase_data,
+            "trace_unit": comp.trace_unit,
+            "load_states": load_states,
+            "quality": quality,
+            "fingerprint": fingerprint,
+            "checkpoint": comp.checkpoint
+        })
+
+        arrays[f"c{i}_dates"] = comp.dates.astype('datetime64[D]').view('int64')
+        arrays[f"c{i}_date_sums"] = comp.date_sums
+        arrays[f"c{i}_date_counts"] = comp.date_counts
+        arrays[f"c{i}_minute_start"] = np.array([comp.minute_start.astype('int64') if comp.minute_start is not None else -1])
+        arrays[f"c{i}_minute_sums"] = comp.minute_sums
+        arrays[f"c{i}_minute_counts"] = comp.minute_counts
+        if comp.sketch is not None and comp.sketch.width is not None:
+            arrays[f"c{i}_sketch_counts"] = comp.sketch.counts
+            arrays[f"c{i}_sketch_maxima"] = comp.sketch.maxima
+            arrays[f"c{i}_sketch_width"] = np.array([comp.sketch.width])
+        if comp.load_states:
+            arrays[f"c{i}_unloaded_kwh"] = comp.load_states["unloaded_kwh_by_bucket"]
+        if "bucket_counts" in comp.quality:
+            arrays[f"c{i}_quality_counts"] = comp.quality["bucket_counts"]
+        arrays.update(comp.trace_pyramid.to_arrays(f"c{i}_trace"))
+
+    day_types = list(sim.get_day_type_dates().keys())
+    for k, name in enumerate(day_types):
+        arrays[f"daytype_{k}"] = sim.get_day_type_dates()[name].astype('datetime64[D]').view('int64')
+    if schedule_mask is not None:
+        arrays["schedule_mask"] = np.asarray(schedule_mask, dtype=bool)
+
+    tariff = sim.tariff.to_dict() if sim.tariff is not None else None
+    meta = {
+        "version": PROJECT_VERSION,
+        "simulation": {
+            "interval": sim.get_interval(),
+            "kwh_rate": sim.get_kwh_rate(),
+            "deployed_date": sim.get_deployed_date(),
+            "collected_date": sim.get_collected_date(),
+            "tariff": tariff,
+            "day_types": day_types
+        },
+        "compressors": compressors,
+        "ui": ui_state or {}
+    }
+
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    with zipfile.ZipFile(path, "w") as bundle:
+        bundle.writestr("project.json", json.dumps(meta, indent=2, default=_json_default), compress_type=zipfile.ZIP_DEFLATED)
+        bundle.writestr("arrays.npz", buffer.getvalue(), compress_type=zipfile.ZIP_STORED)    # already compressed
+    print(f"Saved project to: {path}")
+
+def load_project(path, sim):
+    """
+    Restores a project file into sim (replacing its settings and compressors).
+    Returns (ui_state, schedule_mask, stale) where stale lists the names of
+    compressors whose source files changed since the project was saved. Files
+    that only grew are resumed where the project left off when reprocessed.
+    """
+    with zipfile.ZipFile(path) as bundle:
+        meta = json.loads(bundle.read("project.json"))
+        arrays = np.load(io.BytesIO(bundle.read("arrays.npz")))
+        arrays = {key: arrays[key] for key in arrays.files}
+
+    if meta.get("version", 0) > PROJECT_VERSION:
+        raise ValueError("This project was saved by a newer version of the app.")
+
+    settings = meta["simulation"]
+    sim.set_interval(settings["interval"])
+    sim.set_kwh_rate(settings["kwh_rate"])
+    sim.set_deployed_date(settings["deployed_date"])
+    sim.set_collected_date(settings["collected_date"])
+    sim.set_tariff(Tariff.from_dict(settings["tariff"]) if settings["tariff"] else None)
+
+    compressors = []
+    stale = []
+    for i, info in enumerate(meta["compressors"]):
+        thresholds = tuple(info["state_thresholds"]) if info["state_thresholds"] else None
+        comp = Compressor(info["name"], sim, info["voltage"], info["file_path"],
+                          phase_mode=info["phase_mode"], state_thresholds=thresholds)
+        comp.channels = info["channels"]
+        comp.measured_kw = info["measured_kw"]
+        comp.current_column = info["current_column"]
+        comp.phase_data = info["phase_data"]
+
+        comp.dates = arrays[f"c{i}_dates"].astype('datetime64[D]')
+        comp.date_sums = arrays[f"c{i}_date_sums"]
+        comp.date_counts = arrays[f"c{i}_date_counts"]
+        minute_start = int(arrays[f"c{i}_minute_start"][0])
+        comp.minute_start = np.datetime64(minute_start, 'm') if minute_start >= 0 else None
+        comp.minute_sums = arrays[f"c{i}_minute_sums"]
+        comp.minute_counts = arrays[f"c{i}_minute_counts"]
+        if f"c{i}_sketch_counts" in arrays:
+            comp.sketch = BucketHistogram(arrays[f"c{i}_sketch_counts"].shape[0], float(arrays[f"c{i}_sketch_width"][0]))
+            comp.sketch.counts = arrays[f"c{i}_sketch_counts"]
+            comp.sketch.maxima = arrays[f"c{i}_sketch_maxima"]
+        if info["load_states"]:
+            comp.load_states = dict(info["load_states"], unloaded_kwh_by_bucket=arrays[f"c{i}_unloaded_kwh"])
+        quality = info.get("quality") or {}
+        if f"c{i}_quality_counts" in arrays:
+            comp.quality = dict(quality, gaps=[tuple(gap) for gap in quality["gaps"]], bucket_counts=arrays[f"c{i}_quality_counts"])
+        comp.trace_pyramid = TracePyramid.from_arrays(arrays, f"c{i}_trace")
+        comp.trace_unit = info.get("trace_unit", "A")
+        comp.checkpoint = info.get("checkpoint")
+        comp.build_profiles()
+        compressors.append(comp)
+
+        if info["fingerprint"] and source_exists(comp.file_path):
+            try:
+                if file_fingerprint(comp.file_path) != info["fingerprint"]:
+                    stale.append(comp.get_name())
+            except OSError:
+                pass
+
+    sim.set_compressors(compressors)
+    sim.ingested = {comp.file_path: comp for comp in compressors}   # reprocessing a grown file reads only the new rows
+
+    # day types: restore the clustered dates and rebuild each compressor's day type data
+    names = settings["day_types"]
+    if names:
+        sim.day_types = list(names)
+        sim.day_type_dates = {name: arrays[f"daytype_{k}"].astype('datetime64[D]') for k, name in enumerate(names)}
+        date_labels = {d: k for k, name in enumerate(names) for d in sim.day_type_dates[name]}
+        for comp in compressors:
+            comp.compute_day_type_data(names, date_labels)
+
+    schedule_mask = arrays.get("schedule_mask")
+    print(f"Loaded project from: {path}")
+    return meta["ui"], schedule_mask, stale
+
+def _json_default(value):
+    # numpy scalars / arrays that end up in metadata
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Cannot save {type(value).__name__} in a project file")
@@ -0,0 +1,133 @@
+"""
+Multi-resolution min/max pyramid of a raw logger trace. Every level keeps the
+minimum and maximum of fixed-size blocks of samples, so any zoom window can be
+drawn from a few thousand points without losing spikes or dropouts.
+"""
+import warnings
+import numpy as np
+
+MAX_BASE_BLOCKS = 1 << 20   # finest level is capped at this many blocks (raw samples if fewer)
+LEVEL_FACTOR = 8            # blocks merged per step up the pyramid
+MIN_LEVEL_BLOCKS = 256      # coarsest level has at least this many blocks
+GAP_FACTOR = 5              # steps longer than this many typical steps are drawn as a break
+
+class TracePyramid:
+    """
+    levels[k] = (times, minima, maxima): times (int64 ns) is the first sample
+    time of every block, blocks of level k hold block_sizes[k] raw samples.
+    """
+    def __init__(self, levels=None, block_sizes=None):
+        self.levels = levels or []
+        self.block_sizes = block_sizes or []
+
+    @classmethod
+    def build(cls, times_ns, values):
+        """
+        Builds the pyramid of a sorted trace. times_ns = int64 ns, values = float
+        (NaN for missing readings).
+        """
+        n = len(values)
+        if not n:
+            return cls()
+        base = max(1, -(-n // MAX_BASE_BLOCKS))     # ceil division
+        times, minima, maxima = _reduce(times_ns, values.astype(np.float32), values.astype(np.float32), base)
+        return cls._from_base(times, minima, maxima, base)
+
+    @classmethod
+    def _from_base(cls, times, minima, maxima, base):
+        # builds the coarser levels on top of a base level of base-sample blocks
+        levels, block_sizes = [(times, minima, maxima)], [base]
+        while len(times) > MIN_LEVEL_BLOCKS * LEVEL_FACTOR:
+            times, minima, maxima = _reduce(times, minima, maxima, LEVEL_FACTOR)
+            levels.append((times, minima, maxima))
+            block_sizes.append(block_sizes[-1] * LEVEL_FACTOR)
+        return cls(levels, block_sizes)
+
+    def extend(self, times_ns, values):
+        """
+        Returns the pyramid of this trace followed by more samples (later than
+        every sample already in it). The new samples are reduced with the same
+        base block size and the coarser levels are rebuilt from the base level.
+        """
+        if not self.levels:
+            return TracePyramid.build(times_ns, values)
+        if not len(values):
+            return self
+        base = self.block_sizes[0]
+        times, minima, maxima = _reduce(times_ns, values.astype(np.float32), values.astype(np.float32), base)
+        times = np.concatenate((self.levels[0][0], times))
+        minima = np.concatenate((self.levels[0][1], minima))
+        maxima = np.concatenate((self.levels[0][2], maxima))
+        if len(times) > 2 * MAX_BASE_BLOCKS:
+            times, minima, maxima = _reduce(times, minima, maxima, 2)   # keep the base level bounded
+            base *= 2
+        return TracePyramid._from_base(times, minima, maxima, base)
+
+    def is_empty(self):
+        return not self.levels
+
+    def span(self):
+        """
+        Returns (first, last) sample time in ns.
+        """
+        return int(self.levels[0][0][0]), int(self.levels[0][0][-1])
+
+    def query(self, start_ns, end_ns, max_points=2000):
+        """
+        Returns (times, minima, maxima) covering [start_ns, end_ns] from the
+        finest level, merged down to at most max_points blocks in the window. Gaps in the
+        logging are returned as NaN rows so lines break across them.
+        """
+        if not self.levels:
+            return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+        for times, minima, maxima in self.levels:
+            first = max(np.searchsorted(times, start_ns, side='right') - 1, 0)     # block containing start
+            last = np.searchsorted(times, end_ns, side='right') + 1
+            if last - first <= max_points * LEVEL_FACTOR:
+                break
+        times, minima, maxima = times[first:last], minima[first:last], maxima[first:last]
+        if len(times) > max_points:
+            # between two levels: merge blocks on the fly so the window has close to max_points
+            times, minima, maxima = _reduce(times, minima, maxima, -(-len(times) // max_points))
+
+        if len(times) > 2:
+            steps = np.diff(times)
+            gaps = np.flatnonzero(steps > GAP_FACTOR * np.median(steps)) + 1
+            if len(gaps):
+                times = np.insert(times, gaps, times[gaps - 1] + 1)
+                minima = np.insert(minima.astype(float), gaps, np.nan)
+                maxima = np.insert(maxima.astype(float), gaps, np.nan)
+        return times, minima, maxima
+
+    def to_arrays(self, prefix):
+        """
+        Returns the pyramid as a dict of named arrays (for saving).
+        """
+        arrays = {f"{prefix}_block_sizes": np.array(self.block_sizes, dtype=np.int64)}
+        for k, (times, minima, maxima) in enumerate(self.levels):
+            arrays[f"{prefix}_{k}_times"] = times
+            arrays[f"{prefix}_{k}_min"] = minima
+            arrays[f"{prefix}_{k}_max"] = maxima
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        if f"{prefix}_block_sizes" not in arrays:
+            return cls()
+        block_sizes = arrays[f"{prefix}_block_sizes"].tolist()
+        levels = [(arrays[f"{prefix}_{k}_times"], arrays[f"{prefix}_{k}_min"], arrays[f"{prefix}_{k}_max"])
+                  for k in range(len(block_sizes))]
+        return cls(levels, block_sizes)
+
+def _reduce(times, minima, maxima, factor):
+    # merges every factor consecutive blocks (the last block may be partial)
+    n = len(times)
+    if factor == 1:
+        return times, minima, maxima
+    pad = -n % factor
+    minima = np.concatenate((minima, np.full(pad, np.nan, dtype=minima.dtype))).reshape(-1, factor)
+    maxima = np.concatenate((maxima, np.full(pad, np.nan, dtype=maxima.dtype))).reshape(-1, factor)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)     # all-NaN blocks (dropouts) stay NaN
+        return times[::factor], np.nanmin(minima, axis=1), np.nanmax(maxima, axis=1)
+
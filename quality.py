@@ -0,0 +1,100 @@
+"""
+Data quality scan of a logger trace: gaps, duplicate and out of order
+timestamps, flatlined readings, negative or out of range values and the
+sample count of every (weekday, interval) bucket, all from vectorized passes
+over the arrays ingest already built.
+"""
+import numpy as np
+from load_states import run_length_encode
+
+GAP_FACTOR = 5              # steps longer than this many typical steps are gaps...
+MIN_GAP_MINUTES = 5         # ...and at least this long
+FLATLINE_MINUTES = 60       # a nonzero reading repeated unchanged this long is a flatline
+NEGATIVE_TOLERANCE = 0.5    # readings below minus this count as negative (sensor noise sits around 0)
+MAX_AMPS = 2000.0           # amp readings above this are out of range
+MAX_LISTED_GAPS = 50        # longest gaps kept in the summary
+
+def scan_quality(times_ns, values, buckets, n_buckets, upper=MAX_AMPS):
+    """
+    Scans a trace in file order.
+    times_ns = int64 sample times (ns), as logged (not sorted)
+    values = trace readings (amps, or kW for kW-only loggers), NaN when missing
+    buckets = (weekday, interval) bucket index of every sample
+    upper = readings above this are out of range
+    Returns a summary dict.
+    """
+    n = len(times_ns)
+    steps = np.diff(times_ns)
+    forward = steps[steps > 0]
+    typical = float(np.median(forward)) if len(forward) else 0.0
+
+    # gaps: unusually long steps forward in time
+    gap_limit = max(GAP_FACTOR * typical, MIN_GAP_MINUTES * 60e9)
+    gap_idx = np.flatnonzero(steps > gap_limit)
+    gap_hours = steps[gap_idx] / 3.6e12
+    longest = gap_idx[np.argsort(-gap_hours)[:MAX_LISTED_GAPS]]
+    gaps = [(_iso(times_ns[i]), _iso(times_ns[i + 1]), float(steps[i] / 3.6e12)) for i in np.sort(longest)]
+
+    # flatlines: runs of one exact nonzero reading lasting FLATLINE_MINUTES or more
+    starts, lengths, run_values = run_length_encode(values)
+    durations = times_ns[starts + lengths - 1] - times_ns[starts] + typical if n else np.zeros(0)    # last reading lasts one step
+    with np.errstate(invalid='ignore'):
+        flat = (durations >= FLATLINE_MINUTES * 60e9) & (run_values != 0) & ~np.isnan(run_values)
+
+    with np.errstate(invalid='ignore'):
+        negative = int((values < -NEGATIVE_TOLERANCE).sum())
+        out_of_range = int((values > upper).sum())
+
+    return {
+        "samples": n,
+        "first_time": _iso(times_ns.min()) if n else None,
+        "last_time": _iso(times_ns.max()) if n else None,
+        "typical_step_seconds": typical / 1e9,
+        "gap_count": len(gap_idx),
+        "gap_hours": float(gap_hours.sum()),
+        "longest_gap_hours": float(gap_hours.max()) if len(gap_hours) else 0.0,
+        "gaps": gaps,                                       # (start, end, hours) of the longest gaps, in time order
+        "duplicates": int((steps == 0).sum()),              # rows logged at the same time as the row before
+        "out_of_order": int((steps < 0).sum()),             # rows logged before the row above them
+        "flatline_runs": int(flat.sum()),
+        "flatline_hours": float(durations[flat].sum() / 3.6e12),
+        "missing": int(np.isnan(values).sum()),
+        "negative": negative,
+        "out_of_range": out_of_range,
+        "bucket_counts": np.bincount(buckets, minlength=n_buckets)      # samples per (weekday, interval)
+    }
+
+def merge_quality(first, second):
+    """
+    Combines the scans of two consecutive stretches of a trace (e.g. a file and
+    the rows appended to it later). A gap at the seam is added; runs crossing it
+    are counted in each part.
+    """
+    invalid_times = first.get("invalid_times", 0) + second.get("invalid_times", 0)
+    if not first.get("samples"):
+        return dict(second, invalid_times=invalid_times)
+    if not second.get("samples"):
+        return dict(first, invalid_times=invalid_times)
+    merged = dict(first)
+    for key in ("samples", "gap_count", "gap_hours", "duplicates", "out_of_order", "flatline_runs", "flatline_hours",
+                "missing", "negative", "out_of_range", "invalid_times"):
+        merged[key] = first.get(key, 0) + second.get(key, 0)
+    merged["last_time"] = max(first["last_time"], second["last_time"])
+    merged["first_time"] = min(first["first_time"], second["first_time"])
+    merged["bucket_counts"] = first["bucket_counts"] + second["bucket_counts"]
+
+    gaps = first["gaps"] + second["gaps"]
+    seam = (np.datetime64(second["first_time"]) - np.datetime64(first["last_time"])) / np.timedelta64(1, 'h')
+    typical_hours = first["typical_step_seconds"] / 3600
+    if seam > max(GAP_FACTOR * typical_hours, MIN_GAP_MINUTES / 60):
+        gaps.append((first["last_time"], second["first_time"], float(seam)))
+        merged["gap_count"] += 1
+        merged["gap_hours"] += float(seam)
+    gaps = sorted(sorted(gaps, key=lambda gap: -gap[2])[:MAX_LISTED_GAPS])
+    merged["gaps"] = gaps
+    merged["longest_gap_hours"] = max([gap[2] for gap in gaps] + [first["longest_gap_hours"], second["longest_gap_hours"]])
+    return merged
+
+def _iso(time_ns):
+    # ns timestamp as an ISO string (seconds)
+    return str(np.datetime64(int(time_ns), 'ns').astype('datetime64[s]'))
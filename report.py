@@ -0,0 +1,194 @@
+"""
+Report generation. Every figure is rendered to PNG with the Agg backend in a
+pool of worker processes (each worker receives a copy of the simulation once),
+then the pages are assembled into a PDF or a self-contained HTML file.
+"""
+import io
+import os
+import base64
+import html
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib.image as mpimg
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+from analyzer import Analyzer
+from schedules import WEEKDAYS, schedule_to_mask
+
+REPORT_DPI = 110
+PAGE_SIZE = (11, 8.5)       # landscape letter, inches
+REPORT_FILE_TYPES = [("PDF report", "*.pdf"), ("HTML report", "*.html")]
+
+_worker_sim = None          # the simulation copy of a worker process
+
+def _init_worker(simulation):
+    global _worker_sim
+    _worker_sim = simulation
+
+def _render_task(task):
+    # runs in a worker: builds one figure and returns it as PNG bytes
+    kind, args = task
+    analyzer = Analyzer(_worker_sim)
+    if kind == "table":
+        fig = _table_figure(*args)
+    else:
+        fig = getattr(analyzer, kind)(*args)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=REPORT_DPI)
+    return buffer.getvalue()
+
+def _table_figure(title, columns, rows):
+    # a table as a figure, for PDF pages
+    fig = Figure(figsize=(10, 0.4 * len(rows) + 1.2), dpi=100)
+    ax = fig.add_subplot(1, 1, 1)
+    ax.set_axis_off()
+    ax.set_title(title, fontsize=14)
+    if rows:
+        table = ax.table(cellText=rows, colLabels=columns, loc="center", cellLoc="center")
+        table.auto_set_font_size(False)
+        table.set_fontsize(9)
+        table.scale(1, 1.3)
+    return fig
+
+def savings_tables(result):
+    """
+    Returns the savings tables of a compute_shutdown_savings result as a list
+    of (title, columns, rows) with formatted cell text.
+    """
+    compressor_savings = result["compressor_savings"]
+    active_days = [day for day in WEEKDAYS if any(day in s for s in compressor_savings.values())]
+
+    weekly_rows = []
+    for name, savings in compressor_savings.items():
+        weekly_rows.append([name] + [f"{savings.get(day, 0.0):,.1f}" for day in active_days]
+                           + [f"{savings['Total']:,.1f}", f"${savings['Total $']:,.2f}"])
+    weekly = ("Weekly Shutdown Savings", ["Compressor"] + [day[:3] for day in active_days] + ["Total kWh", "Total $"], weekly_rows)
+
+    annual_rows = [[name, f"{s['Annual']:,.0f}", f"${s['Annual $']:,.2f}"] for name, s in compressor_savings.items()]
+    if result.get("demand_dollars"):
+        annual_rows.append(["Demand Charges", "", f"${result['demand_dollars']:,.2f}"])
+    annual_rows.append(["Total", f"{result['total_kwh']:,.0f}", f"${result['total_dollars']:,.2f}"])
+    annual_columns = ["Compressor", "Annual kWh", "Annual $"]
+
+    bootstrap = result.get("bootstrap")     # Analyzer.bootstrap_savings, when computed
+    if bootstrap:
+        level = f"{bootstrap['confidence']:.0%}"
+        annual_columns += [f"kWh {level} Range", f"$ {level} Range"]
+        for row in annual_rows:
+            ranges = bootstrap["total"] if row[0] == "Total" else bootstrap["compressors"].get(row[0])
+            if ranges:
+                row += ["{:,.0f} - {:,.0f}".format(*ranges["kwh"]), "${:,.0f} - ${:,.0f}".format(*ranges["dollars"])]
+            else:
+                row += ["", ""]
+    annual = ("Annual Savings Summary", annual_columns, annual_rows)
+    return [weekly, annual]
+
+def quality_table(sim):
+    """
+    Returns the data quality summary of every compressor (Compressor.quality)
+    as a (title, columns, rows) table.
+    """
+    columns = ["Compressor", "Samples", "Gaps", "Gap Hours", "Duplicates", "Out of Order", "Unreadable Times",
+               "Flatline Hours", "Missing", "Negative", "Out of Range"]
+    rows = []
+    for comp in sim.get_compressors():
+        q = comp.quality
+        if q.get("samples"):
+            rows.append([comp.get_name(), f"{q['samples']:,}", str(q["gap_count"]), f"{q['gap_hours']:.2f}", str(q["duplicates"]),
+                         str(q["out_of_order"]), str(q.get("invalid_times", 0)), f"{q['flatline_hours']:.2f}", str(q["missing"]),
+                         str(q["negative"]), str(q["out_of_range"])])
+    return ("Data Quality", columns, rows)
+
+def report_tasks(sim, mask, tables):
+    """
+    Returns the (title, task) list of every figure in a report, in page order.
+    """
+    tasks = [(title, ("table", (title, columns, rows))) for title, columns, rows in tables]
+    tasks.append(("Energy by Day", ("plot_consumption_by_day", ())))
+    tasks.append(("Weekly Heatmaps", ("plot_weekly_heatmaps", (mask,))))
+    for day in WEEKDAYS:
+        tasks.append((f"{day} Profile", ("plot_power_consumption_by_interval", (day,))))
+    tasks.append(("Raw Trace", ("plot_raw_traces", ())))
+    tasks.append(("Data Coverage", ("plot_coverage_heatmaps", ())))
+    return tasks
+
+def generate_report(sim, schedule, result, path, workers=None):
+    """
+    Renders a report of a finished simulation and a shutdown savings result
+    (Analyzer.compute_shutdown_savings) to path (.pdf or .html).
+    workers = worker processes (None for one per CPU, 0 to render in this process)
+    Safe to call from a background thread.
+    """
+    fmt = os.path.splitext(path)[1].lower()
+    if fmt not in (".pdf", ".html", ".htm"):
+        raise ValueError("Reports can be saved as .pdf or .html")
+
+    mask = schedule_to_mask(schedule, sim.get_interval())
+    tables = savings_tables(result) + [quality_table(sim)]
+    tasks = report_tasks(sim, mask, tables)
+
+    if workers == 0:
+        _init_worker(sim)
+        images = [_render_task(task) for _, task in tasks]
+    else:
+        # spawned, not forked: the interface calls this from a thread and forking a threaded process can deadlock
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(sim,)) as pool:
+            images = list(pool.map(_render_task, [task for _, task in tasks]))
+
+    titles = [title for title, _ in tasks]
+    if fmt == ".pdf":
+        _write_pdf(path, sim, result, titles, images)
+    else:
+        _write_html(path, sim, result, tables, titles[len(tables):], images[len(tables):])
+    print(f"Saved report to: {path}")
+
+def _summary_lines(sim, result):
+    return [
+        f"Generated {datetime.now():%m/%d/%Y %H:%M}",
+        f"Logged {sim.get_deployed_date()} to {sim.get_collected_date()}, {sim.get_interval()} minute intervals",
+        f"Compressors: {', '.join(c.get_name() for c in sim.get_compressors())}",
+        f"Tariff: {sim.get_tariff().name} (base ${sim.get_kwh_rate():.4f} / kWh)",
+        f"Annual shutdown savings: {result['total_kwh']:,.0f} kWh, ${result['total_dollars']:,.2f}",
+    ]
+
+def _write_pdf(path, sim, result, titles, images):
+    with PdfPages(path) as pdf:
+        cover = Figure(figsize=PAGE_SIZE)
+        cover.text(0.08, 0.85, "Compressor Shutdown Assessment", fontsize=24, weight="bold")
+        for i, line in enumerate(_summary_lines(sim, result)):
+            cover.text(0.08, 0.75 - 0.05 * i, line, fontsize=13)
+        pdf.savefig(cover)
+
+        for title, png in zip(titles, images):
+            page = Figure(figsize=PAGE_SIZE)
+            ax = page.add_axes((0.03, 0.03, 0.94, 0.94))
+            ax.imshow(mpimg.imread(io.BytesIO(png), format="png"))
+            ax.set_axis_off()
+            pdf.savefig(page)
+
+def _write_html(path, sim, result, tables, titles, images):
+    parts = ["<!DOCTYPE html><html><head><meta charset='utf-8'><title>Compressor Shutdown Assessment</title>",
+             "<style>body{font-family:'Segoe UI',sans-serif;margin:2em;color:#000e2f}"
+             "table{border-collapse:collapse;margin-bottom:2em}td,th{border:1px solid #999;padding:4px 10px;text-align:center}"
+             "th{background:#000e2f;color:#fff}img{max-width:100%;margin-bottom:2em}</style></head><body>",
+             "<h1>Compressor Shutdown Assessment</h1><ul>"]
+    parts += [f"<li>{html.escape(line)}</li>" for line in _summary_lines(sim, result)]
+    parts.append("</ul>")
+
+    for title, columns, rows in tables:
+        parts.append(f"<h2>{html.escape(title)}</h2><table><tr>")
+        parts += [f"<th>{html.escape(col)}</th>" for col in columns]
+        parts.append("</tr>")
+        for row in rows:
+            parts.append("<tr>" + "".join(f"<td>{html.escape(cell)}</td>" for cell in row) + "</tr>")
+        parts.append("</table>")
+
+    for title, png in zip(titles, images):
+        encoded = base64.b64encode(png).decode("ascii")
+        parts.append(f"<h2>{html.escape(title)}</h2><img alt='{html.escape(title)}' src='data:image/png;base64,{encoded}'>")
+    parts.append("</body></html>")
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
@@ -0,0 +1,215 @@
+"""
+Helpers for converting shutdown schedules between the widget format
+(dict[day] = list of (start_time, end_time), end inclusive) and 7 x intervals
+boolean masks, Monday first, plus a library of named schedules.
+"""
+import os
+import csv
+import numpy as np
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+DAY_ABBREVIATIONS = {day[:3].lower(): i for i, day in enumerate(WEEKDAYS)}
+
+def time_str_to_minutes(time_str):
+    h, m = map(int, time_str.strip().split(":"))
+    return h * 60 + m
+
+def minutes_to_time_str(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def schedule_to_mask(schedule, interval):
+    """
+    Converts a shutdown schedule into a 7 x intervals boolean mask. A block
+    (start, end) covers every interval starting between start and end inclusive.
+    """
+    slot_minutes = np.arange(0, 24 * 60, interval)
+    mask = np.zeros((7, len(slot_minutes)), dtype=bool)
+    for day, intervals in schedule.items():
+        if day not in WEEKDAYS:
+            continue
+        row = WEEKDAYS.index(day)
+        for start_str, end_str in intervals:
+            start_min = time_str_to_minutes(start_str)
+            end_min = time_str_to_minutes(end_str)
+            mask[row] |= (slot_minutes >= start_min) & (slot_minutes <= end_min)
+    return mask
+
+def mask_to_schedule(mask, interval):
+    """
+    Converts a 7 x intervals boolean mask back into a shutdown schedule.
+    """
+    schedule = {day: [] for day in WEEKDAYS}
+    for day, row in zip(WEEKDAYS, np.asarray(mask, dtype=bool)):
+        # run starts / ends from the edges of the padded row
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], row.astype(np.int8), [0]))))
+        for start, stop in zip(edges[::2], edges[1::2]):
+            schedule[day].append((minutes_to_time_str(int(start) * interval), minutes_to_time_str(int(stop - 1) * interval)))
+    return schedule
+
+def parse_days(text):
+    """
+    Parses a day specification such as "Mon-Fri", "Sat,Sun" or "All" into a
+    list of weekday indexes (Monday = 0).
+    """
+    text = text.strip().lower()
+    if text in ("", "all", "daily", "every day"):
+        return list(range(7))
+
+    days = []
+    for part in text.split(","):
+        part = part.strip()
+        if "-" in part:
+            first, last = (DAY_ABBREVIATIONS[p.strip()[:3]] for p in part.split("-", 1))
+            span = range(first, last + 1) if first <= last else list(range(first, 7)) + list(range(0, last + 1))
+            days.extend(span)
+        elif part:
+            days.append(DAY_ABBREVIATIONS[part[:3]])
+    return sorted(set(days))
+
+def parse_day_time_ranges(text, interval):
+    """
+    Parses ranges such as "Mon-Fri 06:00-18:00; Sat 08:00-12:00" into a 7 x
+    intervals boolean mask. Range ends are exclusive and "24:00" means midnight.
+    Raises ValueError on malformed input.
+    """
+    slot_minutes = np.arange(0, 24 * 60, interval)
+    mask = np.zeros((7, len(slot_minutes)), dtype=bool)
+    for entry in text.replace("\n", ";").split(";"):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            day_text, _, time_text = entry.rpartition(" ")
+            start_str, end_str = time_text.split("-")
+            start_min, end_min = time_str_to_minutes(start_str), time_str_to_minutes(end_str)
+            days = parse_days(day_text)
+        except (ValueError, KeyError):
+            raise ValueError(f"Could not read time range '{entry}'. Use e.g. 'Mon-Fri 06:00-18:00'.")
+
+        if end_min > start_min:
+            in_range = (slot_minutes >= start_min) & (slot_minutes < end_min)
+        else:
+            in_range = (slot_minutes >= start_min) | (slot_minutes < end_min)    # wraps past midnight
+        mask[days] |= in_range
+    return mask
+
+# named starting points for the schedule library, in parse_day_time_ranges syntax
+SCHEDULE_TEMPLATES = {
+    "Nights": "Mon-Fri 22:00-06:00",
+    "Weekends": "Sat-Sun 00:00-24:00",
+    "Nights + Weekends": "Mon-Fri 22:00-06:00; Sat-Sun 00:00-24:00",
+    "Lunch Breaks": "Mon-Fri 12:00-13:00",
+    "Shift Changes": "Mon-Fri 06:45-07:15; Mon-Fri 14:45-15:15; Mon-Fri 22:45-23:15",
+    "Off Outside 06:00-18:00": "All 18:00-06:00",
+}
+LIBRARY_CSV_COLUMNS = ["Schedule", "Days", "Start", "End"]
+
+class ScheduleLibrary:
+    """
+    Named shutdown schedules. Every schedule is kept as a 7 x 1440 minute mask,
+    so the library does not depend on the simulation interval: masks() samples
+    every schedule at the start minute of each interval.
+    """
+    def __init__(self):
+        self.schedules = {}     # name -> 7 x 1440 boolean mask, in insertion order
+
+    def names(self):
+        return list(self.schedules.keys())
+
+    def add(self, name, schedule, interval):
+        """
+        Adds (or replaces) a schedule in the widget format. interval = the
+        widget's interval: a block's inclusive end is the start of its last
+        interval, so the block runs from start until end + interval.
+        """
+        minutes = np.arange(24 * 60)
+        mask = np.zeros((7, 24 * 60), dtype=bool)
+        for day, intervals in schedule.items():
+            if day not in WEEKDAYS:
+                continue
+            for start_str, end_str in intervals:
+                mask[WEEKDAYS.index(day)] |= (minutes >= time_str_to_minutes(start_str)) & (minutes < time_str_to_minutes(end_str) + interval)
+        self.schedules[name] = mask
+
+    def add_ranges(self, name, text):
+        """
+        Adds (or replaces) a schedule from day / time ranges such as "Mon-Fri 22:00-06:00".
+        """
+        self.schedules[name] = parse_day_time_ranges(text, 1)
+
+    def add_template(self, template):
+        self.add_ranges(template, SCHEDULE_TEMPLATES[template])
+
+    def remove(self, name):
+        self.schedules.pop(name, None)
+
+    def get(self, name, interval):
+        """
+        Returns a schedule in the widget format at the given interval.
+        """
+        return mask_to_schedule(self.schedules[name][:, ::interval], interval)
+
+    def masks(self, interval, names=None):
+        """
+        Returns (names, masks) with masks a schedules x 7 x intervals boolean array.
+        """
+        names = self.names() if names is None else list(names)
+        masks = np.zeros((len(names), 7, (24 * 60) // interval), dtype=bool)
+        for k, name in enumerate(names):
+            masks[k] = self.schedules[name][:, ::interval]
+        return names, masks
+
+    def to_ranges(self, name):
+        """
+        Returns the schedule as (day, start, end) rows, end exclusive ("24:00" for midnight).
+        """
+        rows = []
+        for day, row in zip(WEEKDAYS, self.schedules[name]):
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], row.astype(np.int8), [0]))))
+            for start, stop in zip(edges[::2], edges[1::2]):
+                rows.append((day, minutes_to_time_str(int(start)), minutes_to_time_str(int(stop))))
+        return rows
+
+    def import_csv(self, path):
+        """
+        Reads schedules from a CSV file with the columns Schedule, Days, Start, End
+        (one row per time range, e.g. "Nights, Mon-Fri, 22:00, 06:00"). Ends are
+        exclusive and ranges may wrap past midnight. Returns the imported names.
+        Raises ValueError on malformed rows.
+        """
+        ranges = {}
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            if not reader.fieldnames or any(col not in reader.fieldnames for col in LIBRARY_CSV_COLUMNS):
+                raise ValueError(f"Schedule CSV files need the columns {', '.join(LIBRARY_CSV_COLUMNS)}.")
+            for line, row in enumerate(reader, start=2):
+                name = row["Schedule"].strip()
+                if not name:
+                    raise ValueError(f"Row {line} of {os.path.basename(path)} has no schedule name.")
+                ranges.setdefault(name, []).append(f"{row['Days'].strip()} {row['Start'].strip()}-{row['End'].strip()}")
+
+        masks = {name: parse_day_time_ranges("; ".join(entries), 1) for name, entries in ranges.items()}
+        self.schedules.update(masks)
+        return list(masks.keys())
+
+    def export_csv(self, path, names=None):
+        """
+        Writes schedules to a CSV file that import_csv reads back.
+        """
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(LIBRARY_CSV_COLUMNS)
+            for name in (self.names() if names is None else names):
+                for day, start, end in self.to_ranges(name):
+                    writer.writerow([name, day[:3], start, end])
+
+    def to_dict(self):
+        # JSON-friendly form for project files
+        return {name: [list(r) for r in self.to_ranges(name)] for name in self.names()}
+
+    @classmethod
+    def from_dict(cls, data):
+        library = cls()
+        for name, rows in data.items():
+            library.add_ranges(name, "; ".join(f"{day[:3]} {start}-{end}" for day, start, end in rows))
+        return library
@@ -0,0 +1,90 @@
+"""
+Compressor sequencing simulator. The measured kW of every compressor is
+turned into the air it delivered (through its part-load curve), the system air
+demand is shared out again under another sequencing strategy, and every
+unit's power is read back off its curve. Every step works on whole time x
+units arrays, so weeks of one-second data for a dozen compressors replay in
+seconds.
+Capacities are in any consistent unit (acfm, or rated kW when flows are not
+known); loads are in the same unit.
+"""
+import numpy as np
+
+PART_LOAD_CURVES = {    # control type -> (capacity fractions, fractions of full-load kW)
+    "load_unload": ([0.0, 1.0], [0.30, 1.0]),     # averaged over load / unload cycles, with good storage
+    "modulating": ([0.0, 1.0], [0.70, 1.0]),      # inlet modulation
+    "vsd": ([0.0, 0.2, 0.4, 0.6, 0.8, 1.0], [0.10, 0.25, 0.43, 0.61, 0.80, 1.0])
+}
+OFF_FRACTION = 0.05     # readings below this share of full-load kW are a unit switched off
+
+def delivered_air(kw, rated_kw, capacities, curves):
+    """
+    Air delivered by every unit: time x units kW -> time x units load (capacity
+    units), inverting each unit's part-load curve. Units below OFF_FRACTION of
+    full load, or running unloaded, deliver nothing.
+    curves = (capacity fractions, power fractions) of every unit
+    """
+    kw = np.nan_to_num(np.asarray(kw, dtype=float))
+    loads = np.zeros_like(kw)
+    for i, (caps, powers) in enumerate(curves):
+        fraction = kw[:, i] / rated_kw[i]
+        loads[:, i] = np.where(fraction >= OFF_FRACTION, np.interp(fraction, powers, caps), 0.0) * capacities[i]
+    return loads
+
+def part_load_power(loads, rated_kw, capacities, curves):
+    """
+    kW of every unit carrying time x units loads (capacity units). Units without
+    load are switched off by the sequencer and draw nothing.
+    """
+    kw = np.zeros_like(loads)
+    for i, (caps, powers) in enumerate(curves):
+        fraction = loads[:, i] / capacities[i]
+        kw[:, i] = np.where(fraction > 0, np.interp(fraction, caps, powers) * rated_kw[i], 0.0)
+    return kw
+
+def sequence_loads(demand, capacities, order, trim=None):
+    """
+    Shares a system air demand (time) among the units in order of priority.
+    Without a trim unit, each unit in order is filled before the next one starts
+    (the last one running trims). With one, the other units in order run fully
+    loaded, coming on one at a time whenever the trim unit alone cannot cover
+    the rest, and the trim unit takes the swings.
+    Returns (time x units loads, unmet demand per time step). Units not in
+    order stay off.
+    """
+    demand = np.asarray(demand, dtype=float)
+    capacities = np.asarray(capacities, dtype=float)
+    loads = np.zeros((len(demand), len(capacities)))
+    base = [unit for unit in order if unit != trim]
+    cumulative = np.concatenate(([0.0], np.cumsum(capacities[base])))      # capacity of the first k base units
+
+    if trim is None:
+        before = cumulative[:-1]
+        loads[:, base] = np.clip(demand[:, None] - before[None, :], 0.0, capacities[base][None, :])
+        return loads, np.maximum(demand - cumulative[-1], 0.0)
+
+    # fewest base units that leave the trim unit no more than it can carry
+    on = np.minimum(np.searchsorted(cumulative, demand - capacities[trim], side='left'), len(base))
+    base_supply = cumulative[on]
+    loads[:, base] = np.where(np.arange(len(base))[None, :] < on[:, None], capacities[base][None, :], 0.0)
+    # a base unit larger than the trim unit can overshoot the demand: it part-loads instead
+    excess = np.maximum(base_supply - demand, 0.0)
+    if len(base):
+        last = np.maximum(on - 1, 0)
+        rows = np.flatnonzero(excess > 0)
+        loads[rows, np.array(base)[last[rows]]] -= excess[rows]
+    trim_load = np.maximum(demand - base_supply, 0.0)
+    loads[:, trim] = np.minimum(trim_load, capacities[trim])
+    return loads, np.maximum(trim_load - capacities[trim], 0.0)
+
+def simulate_strategy(demand, rated_kw, capacities, curves, order, trim=None, trim_curve=None):
+    """
+    Replays a system air demand under one strategy. trim_curve replaces the
+    trim unit's part-load curve (e.g. PART_LOAD_CURVES["vsd"] for a VSD trim).
+    Returns (time x units kW, unmet demand per time step).
+    """
+    curves = list(curves)
+    if trim is not None and trim_curve is not None:
+        curves[trim] = trim_curve
+    loads, unmet = sequence_loads(demand, capacities, order, trim)
+    return part_load_power(loads, rated_kw, capacities, curves), unmet
@@ -0,0 +1,366 @@
+"""
+Service mode: the analysis engine behind a small JSON HTTP API on localhost,
+so several analysts share one process pool and every logger file ingested so
+far. Start it with `python main.py --serve [--host H] [--port N] [--workers N]`.
+
+    GET    /health                  service status
+    GET    /jobs                    every stored job
+    POST   /jobs                    submit a simulation job (see _build_simulation)
+    GET    /jobs/<id>               job status, and a summary once it is done
+    DELETE /jobs/<id>               drop a job and its results
+    GET    /jobs/<id>/profiles      weekday x interval kW of every compressor
+    POST   /jobs/<id>/savings       {"schedule": ..., "exclude": [...], "bootstrap": false}
+    POST   /jobs/<id>/compare       {"schedules": {name: schedule, ...}, "exclude": [...]}
+
+A schedule is either the widget format ({"Monday": [["00:00", "05:45"]], ...},
+ends inclusive) or range text such as "Mon-Fri 22:00-06:00; Sat-Sun 00:00-24:00".
+"""
+import os
+import json
+import uuid
+import asyncio
+import argparse
+import multiprocessing
+from http import HTTPStatus
+from urllib.parse import urlsplit
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from simulation import Simulation
+from compressor import Compressor
+from analyzer import Analyzer
+from ingest import source_exists
+from schedules import WEEKDAYS, schedule_to_mask, mask_to_schedule, parse_day_time_ranges
+from tariff import Tariff
+
+SERVICE_HOST = "127.0.0.1"      # local only unless asked otherwise
+SERVICE_PORT = 8765
+MAX_BODY_BYTES = 1 << 20        # request bodies are small JSON documents
+MAX_STORED_JOBS = 100           # oldest finished jobs are dropped beyond this
+
+class ServiceError(Exception):
+    """
+    An error returned to the client with an HTTP status.
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class AnalysisService:
+    """
+    Jobs run on a shared process pool. Every finished job's compressors are kept
+    by source, so a later job over the same file resumes from them and reads
+    only the rows appended since (nothing, for an unchanged file), and a job is
+    held back while another job is still ingesting one of its files.
+    Workers are spawned, so a script starting the service needs an
+    `if __name__ == "__main__":` guard (main.py has one).
+    """
+    def __init__(self, workers=None, max_jobs=MAX_STORED_JOBS):
+        self.workers = workers or os.cpu_count() or 1
+        # spawned, not forked: forked workers would inherit the listening socket and any open client sockets
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self.max_jobs = max_jobs
+        self.jobs = {}          # job id -> job dict, in submission order
+        self.ingested = {}      # source -> compressor of the last finished job that read it
+        self.in_flight = {}     # source -> task of the job ingesting it
+        self.server = None
+
+    async def start(self, host=SERVICE_HOST, port=SERVICE_PORT):
+        """
+        Starts listening. Returns the (host, port) bound (port 0 picks a free one).
+        """
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for job in self.jobs.values():
+            job["task"].cancel()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    #### JOBS ####
+    def submit(self, request):
+        """
+        Validates a job request and schedules it. Returns the job dict.
+        """
+        _build_simulation(request)      # raises ValueError on bad input, before anything is queued
+        for comp in request["compressors"]:
+            if not source_exists(comp["file_path"]):
+                raise ValueError(f"Data file for {comp['name']} not found: {comp['file_path']}")
+
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "status": "queued",
+            "error": None,
+            "submitted": datetime.now(),
+            "started": None,
+            "finished": None,
+            "request": request,
+            "sim": None
+        }
+        job["task"] = asyncio.get_running_loop().create_task(self._run(job))
+        self.jobs[job["id"]] = job
+        self._evict()
+        return job
+
+    async def _run(self, job):
+        sources = {comp["file_path"] for comp in job["request"]["compressors"]}
+        waiting = {self.in_flight[source] for source in sources if source in self.in_flight}
+        task = asyncio.current_task()
+        for source in sources:
+            self.in_flight[source] = task
+        try:
+            if waiting:
+                await asyncio.wait(waiting)     # let the earlier job ingest the file, then resume from it
+            previous = {source: self.ingested[source] for source in sources if source in self.ingested}
+            job["status"], job["started"] = "running", datetime.now()
+            sim = await asyncio.get_running_loop().run_in_executor(self.pool, _run_job, (job["request"], previous))
+            for comp in sim.get_compressors():
+                self.ingested[comp.file_path] = comp
+            job["sim"], job["status"] = sim, "done"
+        except asyncio.CancelledError:
+            job["status"] = "cancelled"
+            raise
+        except Exception as e:
+            job["status"], job["error"] = "failed", str(e)
+        finally:
+            job["finished"] = datetime.now()
+            for source in sources:
+                if self.in_flight.get(source) is task:
+                    del self.in_flight[source]
+
+    def _evict(self):
+        # drops the oldest finished jobs beyond max_jobs
+        finished = [job_id for job_id, job in self.jobs.items() if job["finished"] is not None]
+        for job_id in finished[:max(len(self.jobs) - self.max_jobs, 0)]:
+            del self.jobs[job_id]
+
+    def _job(self, job_id, done=False):
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"No job {job_id}")
+        if done and job["status"] != "done":
+            raise ServiceError(HTTPStatus.CONFLICT, f"Job {job_id} is {job['status']}")
+        return job
+
+    #### ROUTES ####
+    async def route(self, method, path, body):
+        """
+        Returns (status, payload) for a request.
+        """
+        parts = [part for part in urlsplit(path).path.split("/") if part]
+        if parts == ["health"] and method == "GET":
+            return HTTPStatus.OK, {"status": "ok", "workers": self.workers, "jobs": len(self.jobs),
+                                   "cached_sources": len(self.ingested)}
+        if parts == ["jobs"] and method == "GET":
+            return HTTPStatus.OK, {"jobs": [_job_status(job) for job in self.jobs.values()]}
+        if parts == ["jobs"] and method == "POST":
+            return HTTPStatus.ACCEPTED, _job_status(self.submit(body))
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self._job(parts[1])
+            if method == "GET":
+                return HTTPStatus.OK, _job_status(job, summary=True)
+            if method == "DELETE":
+                job["task"].cancel()
+                del self.jobs[parts[1]]
+                return HTTPStatus.OK, {"id": parts[1], "deleted": True}
+        if len(parts) == 3 and parts[0] == "jobs":
+            handler = {("GET", "profiles"): _profiles, ("POST", "savings"): _savings, ("POST", "compare"): _compare}.get((method, parts[2]))
+            if handler is not None:
+                sim = self._job(parts[1], done=True)["sim"]
+                # evaluations take milliseconds to a few tenths of a second: off the event loop, not worth a process
+                return HTTPStatus.OK, await asyncio.get_running_loop().run_in_executor(None, handler, sim, body or {})
+        raise ServiceError(HTTPStatus.NOT_FOUND, f"No route for {method} {path}")
+
+    async def _handle(self, reader, writer):
+        # one request per connection
+        try:
+            status, payload = await self._respond(reader)
+        except Exception as e:
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+        body = json.dumps(payload, default=_json_default).encode("utf-8")
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii") + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _respond(self, reader):
+        try:
+            method, path, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                key, _, value = line.partition(":")
+                headers[key.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {"error": "Malformed request"}
+        if length > MAX_BODY_BYTES:
+            return HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request body too large"}
+
+        try:
+            body = json.loads(await reader.readexactly(length)) if length else None
+            return await self.route(method.upper(), path, body)
+        except ServiceError as e:
+            return e.status, {"error": str(e)}
+        except (ValueError, KeyError, TypeError) as e:     # bad JSON or request fields
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+
+def _build_simulation(request):
+    """
+    Builds an unprocessed simulation from a job request:
+    {"interval": minutes, "kwh_rate": $/kWh, "deployed_date": "MM/DD/YYYY",
+     "collected_date": "MM/DD/YYYY", "tariff": Tariff.to_dict (optional),
+     "compressors": [{"name", "voltage", "file_path", "phase_mode" (optional),
+                      "state_thresholds": [off, loaded] (optional)}, ...]}
+    """
+    if not isinstance(request, dict):
+        raise ValueError("Job request must be a JSON object")
+    missing = [key for key in ("interval", "kwh_rate", "deployed_date", "collected_date", "compressors") if key not in request]
+    if missing:
+        raise ValueError(f"Job request is missing {', '.join(missing)}")
+    interval = int(request["interval"])
+    if interval <= 0 or (24 * 60) % interval:
+        raise ValueError("Interval must divide a day evenly")
+    datetime.strptime(request["deployed_date"], "%m/%d/%Y")
+    datetime.strptime(request["collected_date"], "%m/%d/%Y")
+    if not request["compressors"]:
+        raise ValueError("Job request has no compressors")
+
+    sim = Simulation()
+    sim.interval, sim.kwh_rate = interval, float(request["kwh_rate"])
+    sim.deployed_date, sim.collected_date = request["deployed_date"], request["collected_date"]
+    sim.tariff = Tariff.from_dict(request["tariff"]) if request.get("tariff") else None
+    compressors = []
+    for comp in request["compressors"]:
+        thresholds = tuple(comp["state_thresholds"]) if comp.get("state_thresholds") else None
+        compressors.append(Compressor(str(comp["name"]), sim, float(comp["voltage"]), comp["file_path"],
+                                      phase_mode=comp.get("phase_mode", "mean"), state_thresholds=thresholds))
+    if len({comp.get_name() for comp in compressors}) < len(compressors):
+        raise ValueError("Compressor names must be unique")
+    sim._compressors = compressors
+    return sim
+
+def _run_job(task):
+    """
+    Pool process side of a job: ingests every compressor of the request and
+    returns the finished simulation (accumulators only, the frames are freed).
+    previous = source -> compressor of an earlier job, resumed where possible
+    """
+    request, previous = task
+    sim = _build_simulation(request)
+    sim.ingested = dict(previous)
+    for comp in sim.get_compressors():
+        comp.compute_power(workers=0)      # the service pool already runs one job per core
+        sim.ingested[comp.file_path] = comp
+    return sim
+
+def _job_status(job, summary=False):
+    status = {
+        "id": job["id"],
+        "status": job["status"],
+        "error": job["error"],
+        "submitted": job["submitted"].isoformat(timespec="seconds"),
+        "seconds": ((job["finished"] or datetime.now()) - job["started"]).total_seconds() if job["started"] else None,
+        "compressors": [comp["name"] for comp in job["request"]["compressors"]]
+    }
+    if summary and job["sim"] is not None:
+        sim = job["sim"]
+        status["interval"] = sim.get_interval()
+        status["compressors"] = [{
+            "name": comp.get_name(),
+            "measured_kw": comp.measured_kw,
+            "first_date": str(comp.dates[0]) if len(comp.dates) else None,
+            "last_date": str(comp.dates[-1]) if len(comp.dates) else None,
+            "dates": len(comp.dates),
+            "load_states": {k: v for k, v in comp.load_states.items() if k != "unloaded_kwh_by_bucket"},
+            "unloaded_kwh_profile": comp.get_unloaded_kwh_profile().tolist(),     # average kWh per weekday / interval
+            "quality": {k: v for k, v in comp.quality.items() if k != "bucket_counts"}
+        } for comp in sim.get_compressors()]
+    return status
+
+def _schedule(value, interval):
+    # widget schedule dict or range text -> widget schedule dict
+    if isinstance(value, str):
+        return mask_to_schedule(parse_day_time_ranges(value, interval), interval)
+    if not isinstance(value, dict):
+        raise ValueError("A schedule must be a {day: [[start, end], ...]} object or range text")
+    return {day: [tuple(block) for block in value.get(day, [])] for day in WEEKDAYS}
+
+def _profiles(sim, body):
+    interval = sim.get_interval()
+    return {
+        "interval": interval,
+        "weekdays": WEEKDAYS,
+        "intervals": [f"{m // 60:02d}:{m % 60:02d}" for m in range(0, 24 * 60, interval)],
+        "compressors": {comp.get_name(): comp.get_profile_array() for comp in sim.get_compressors()}
+    }
+
+def _savings(sim, body):
+    analyzer = Analyzer(sim)
+    schedule = _schedule(body.get("schedule", {}), sim.get_interval())
+    exclude = tuple(body.get("exclude", ()))
+    result = analyzer.compute_shutdown_savings(schedule, exclude=exclude)
+    if body.get("bootstrap"):
+        result["bootstrap"] = analyzer.bootstrap_savings(schedule, exclude=exclude, demand_dollars=result["demand_dollars"])
+    result["schedule"] = schedule
+    return result
+
+def _compare(sim, body):
+    schedules = body.get("schedules")
+    if not isinstance(schedules, dict) or not schedules:
+        raise ValueError("compare needs a {name: schedule} object")
+    interval = sim.get_interval()
+    masks = np.array([schedule_to_mask(_schedule(value, interval), interval) for value in schedules.values()])
+    names, result = Analyzer(sim).compare_schedules(masks, exclude=tuple(body.get("exclude", ())))
+    return {
+        "compressors": names,
+        "schedules": {name: {"total_kwh": result["total_kwh"][i], "total_dollars": result["total_dollars"][i],
+                             "off_hours": result["off_hours"][i], "kwh": result["kwh"][i], "dollars": result["dollars"][i]}
+                      for i, name in enumerate(schedules)}
+    }
+
+def _json_default(value):
+    # numpy values and dates in results
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def serve(host=SERVICE_HOST, port=SERVICE_PORT, workers=None):
+    """
+    Runs the service until interrupted.
+    """
+    async def run():
+        service = AnalysisService(workers)
+        bound = await service.start(host, port)
+        print(f"Serving the analysis engine on http://{bound[0]}:{bound[1]} ({service.workers} workers)")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await service.close()
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("Service stopped")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the compressor analysis engine over local HTTP.")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="job processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,9 @@
+import numpy as np
+from daytypes import cluster_dates
+from prefetch import ParseCache
+from schedules import WEEKDAYS
+from tariff import Tariff
+
 class Simulation:
     """
     Stores general simulation information, such as kWh rate, main compressor
@@ -7,10 +13,27 @@ class Simulation:
         self.interval = int()       # the interval for the simulation
         self._compressors = []      # master compressor object list
         self.kwh_rate = 0.0         # simulation kWh rate
+        self.tariff = None          # time-of-use / tiered tariff, None for the flat kWh rate
         self._day_types = []        # the list of day types
         self.deployed_date= ""      # date the sensors were deployed
         self.collected_date = ""    # date the sensors were collected
-        self.day_types = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']     # for future daytype support
+        self.day_types = list(WEEKDAYS)     # weekdays, or clustered day type names
+        self.day_type_dates = {}            # day type name -> array of dates in that day type
+        self.parse_cache = ParseCache()     # parsed logger files, filled in the background as files are selected
+        self.ingested = {}                  # source -> compressor last computed from it, resumed when the file grows
+
+    def __getstate__(self):
+        # the parse cache holds threads and locks, copies (e.g. for report workers) start without it
+        # or the earlier runs kept for resuming
+        state = self.__dict__.copy()
+        del state["parse_cache"]
+        del state["ingested"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.parse_cache = ParseCache()
+        self.ingested = {}
 
     #### GET METHODS ####     
     def get_compressors(self):
@@ -37,14 +60,42 @@ class Simulation:
     def get_kwh_rate(self):
         return float(self.kwh_rate)
 
+    def get_tariff(self):
+        """
+        Returns the simulation tariff, or a flat tariff at the kWh rate if none is set.
+        """
+        if self.tariff is None:
+            return Tariff.flat(self.kwh_rate)
+        return self.tariff
+
     def get_daytypes(self):
         return self.day_types
 
+    def get_day_type_dates(self):
+        return self.day_type_dates
+
+    def has_clustered_day_types(self):
+        return bool(self.day_type_dates)
+
+    def get_day_type_days_per_year(self, day_type):
+        """
+        Returns how many days per year a day type occurs, based on how often it
+        occured across the logged dates.
+        """
+        total_dates = sum(len(dates) for dates in self.day_type_dates.values())
+        if not total_dates:
+            return 0.0
+        return 365.0 * len(self.day_type_dates.get(day_type, [])) / total_dates
+
     #### SET METHODS ####
     def set_kwh_rate(self, rate):
         self.kwh_rate = float(rate)
         print(f"Set kWh rate to: {self.kwh_rate}")
     
+    def set_tariff(self, tariff):
+        self.tariff = tariff
+        print(f"Set tariff to: {tariff.name if tariff else 'Flat'}")
+
     def set_interval(self, interval):
         self.interval = int(interval)
         print(f"Set interval to: {self.interval}")
@@ -66,11 +117,64 @@ class Simulation:
         Computes the power buckets / fills data dictionaries for each compressor.
         """
         print("Processing Data...")
+        self.day_types = list(WEEKDAYS)     # new profiles invalidate any clustered day types
+        self.day_type_dates = {}
         try:
             for compressor in self._compressors:
                 compressor.compute_power()
+                self.ingested[compressor.file_path] = compressor
         except Exception as e:
             print(f"Error Processing Data for {compressor.get_name()}: {e}")
         else:
             print("Data Processed Successfully")
 
+    def build_date_profile_matrix(self, compressor=None):
+        """
+        Builds a dates x intervals matrix of average kW for one compressor, or
+        for the whole system when compressor is None. System dates are the union
+        of all compressors' dates, with missing intervals counted as 0 kW.
+        Returns (dates, matrix).
+        """
+        if compressor is not None:
+            return compressor.get_date_profiles()
+
+        compressors = self.get_compressors()
+        if not compressors:
+            return np.array([], dtype='datetime64[D]'), np.zeros((0, 0))
+
+        dates = np.unique(np.concatenate([comp.dates for comp in compressors]))
+        n_intervals = (24 * 60) // self.get_interval()
+        matrix = np.zeros((len(dates), n_intervals))
+        for comp in compressors:
+            comp_dates, profiles = comp.get_date_profiles()
+            rows = np.searchsorted(dates, comp_dates)
+            matrix[rows] += np.nan_to_num(profiles)
+        return dates, matrix
+
+    def cluster_day_types(self, n_day_types, method="kmeans"):
+        """
+        Clusters the logged dates into day types using the system date profile
+        matrix, then rebuilds each compressor's day type data.
+        Passing 0 (or None) resets day types to the seven weekdays.
+        """
+        if not n_day_types:
+            self.day_types = list(WEEKDAYS)
+            self.day_type_dates = {}
+            for compressor in self._compressors:
+                compressor.day_type_data = {}
+            print("Reset day types to weekdays")
+            return
+
+        dates, matrix = self.build_date_profile_matrix()
+        if len(dates) == 0:
+            raise ValueError("No logged dates available to cluster.")
+
+        labels = cluster_dates(matrix, n_day_types, method=method)
+        names = [f"Day Type {i + 1}" for i in range(labels.max() + 1)]
+
+        self.day_types = names
+        self.day_type_dates = {name: dates[labels == i] for i, name in enumerate(names)}
+        date_labels = dict(zip(dates, labels.tolist()))
+        for compressor in self._compressors:
+            compressor.compute_day_type_data(names, date_labels)
+        print(f"Clustered {len(dates)} dates into {len(names)} day types ({method})")
@@ -0,0 +1,108 @@
+"""
+Fixed-bin histogram sketches per (weekday, interval) bucket. Memory is
+buckets x bins regardless of how many samples are added, and two sketches
+merge by adding counts.
+"""
+import numpy as np
+
+N_BINS = 256    # bins per bucket
+
+class BucketHistogram:
+    """
+    A histogram of values for every bucket. Bins are [i * width, (i + 1) * width)
+    with width a power of two, so sketches with different widths merge by
+    coarsening the finer one. Values below 0 fall in the first bin.
+    """
+    def __init__(self, n_buckets, width=None):
+        self.n_buckets = n_buckets
+        self.width = width                                      # bin width, set by the first add
+        self.counts = np.zeros((n_buckets, N_BINS), dtype=np.int64)
+        self.maxima = np.full(n_buckets, -np.inf)                # exact maximum per bucket
+
+    @staticmethod
+    def _width_for(max_value):
+        # smallest power of two that fits max_value in N_BINS bins
+        return float(2.0 ** np.ceil(np.log2(max(max_value, 1e-6) / N_BINS)))
+
+    def _coarsen_to(self, width):
+        # merge neighbouring bins until the bin width reaches width
+        while self.width < width:
+            self.counts = self.counts.reshape(self.n_buckets, N_BINS // 2, 2).sum(axis=2)
+            self.counts = np.concatenate((self.counts, np.zeros_like(self.counts)), axis=1)
+            self.width *= 2
+
+    def add(self, buckets, values):
+        """
+        Adds values (1-D array) to their buckets (1-D array of bucket indexes).
+        NaN values are ignored.
+        """
+        valid = ~np.isnan(values)
+        buckets, values = buckets[valid], values[valid]
+        if not len(values):
+            return
+
+        needed = self._width_for(values.max())
+        if self.width is None:
+            self.width = needed
+        elif needed > self.width:
+            self._coarsen_to(needed)
+
+        bins = np.clip((values / self.width).astype(np.int64), 0, N_BINS - 1)
+        flat = buckets * N_BINS + bins
+        self.counts += np.bincount(flat, minlength=self.n_buckets * N_BINS).reshape(self.n_buckets, N_BINS)
+        np.maximum.at(self.maxima, buckets, values)
+
+    def merge(self, other):
+        """
+        Adds the counts of another sketch with the same buckets into this one.
+        """
+        if other.width is None:
+            return
+        other_counts = other.counts
+        if self.width is None:
+            self.width = other.width
+        if other.width < self.width:
+            coarse = BucketHistogram(other.n_buckets, other.width)
+            coarse.counts = other.counts.copy()
+            coarse._coarsen_to(self.width)
+            other_counts = coarse.counts
+        elif other.width > self.width:
+            self._coarsen_to(other.width)
+        self.counts += other_counts
+        self.maxima = np.maximum(self.maxima, other.maxima)
+
+    def totals(self):
+        return self.counts.sum(axis=1)
+
+    def quantiles(self, q):
+        """
+        Returns the q-quantile (0..1) of every bucket, interpolated inside the
+        bin. Buckets without samples are NaN.
+        """
+        totals = self.totals()
+        cdf = np.cumsum(self.counts, axis=1)
+        target = q * totals
+        idx = np.argmax(cdf >= target[:, None], axis=1)
+        below = np.where(idx > 0, cdf[np.arange(self.n_buckets), idx - 1], 0)
+        in_bin = self.counts[np.arange(self.n_buckets), idx]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fraction = np.where(in_bin > 0, (target - below) / in_bin, 0.0)
+            result = (idx + fraction) * (self.width or 0.0)
+        result = np.minimum(result, self.maxima)     # never report above the true maximum
+        return np.where(totals > 0, result, np.nan)
+
+    def fraction_above(self, threshold):
+        """
+        Returns the fraction of samples in every bucket at or above threshold
+        (rounded to the bin edge). Buckets without samples are NaN.
+        """
+        totals = self.totals()
+        first_bin = int(np.clip(np.ceil(threshold / self.width), 0, N_BINS)) if self.width else 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(totals > 0, self.counts[:, first_bin:].sum(axis=1) / totals, np.nan)
+
+    def overall_counts(self):
+        """
+        Returns the histogram of all buckets together.
+        """
+        return self.counts.sum(axis=0)
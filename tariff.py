@@ -0,0 +1,163 @@
+import calendar
+import numpy as np
+from schedules import parse_days, time_str_to_minutes
+
+MONTH_ABBREVIATIONS = {calendar.month_abbr[m].lower(): m - 1 for m in range(1, 13)}
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+WEEKS_IN_MONTH = DAYS_IN_MONTH / 7
+
+def parse_months(text):
+    """
+    Parses a month specification such as "Jun-Sep", "Dec,Jan,Feb" or "All" into
+    a list of month indexes (January = 0).
+    """
+    text = text.strip().lower()
+    if text in ("", "all", "year", "all year"):
+        return list(range(12))
+
+    months = []
+    for part in text.split(","):
+        part = part.strip()
+        if "-" in part:
+            first, last = (MONTH_ABBREVIATIONS[p.strip()[:3]] for p in part.split("-", 1))
+            span = range(first, last + 1) if first <= last else list(range(first, 12)) + list(range(0, last + 1))
+            months.extend(span)
+        elif part:
+            months.append(MONTH_ABBREVIATIONS[part[:3]])
+    return sorted(set(months))
+
+class Tariff:
+    """
+    Electricity tariff with a $/kWh rate for every month x weekday x minute of
+    the day (time-of-use and seasonal periods), tiered monthly adders and a
+    demand charge.
+
+    periods = list of dicts, later periods override earlier ones:
+        {"months": "Jun-Sep", "days": "Mon-Fri", "start": "14:00", "end": "19:00", "rate": 0.22}
+    tiers = list of (monthly kWh threshold, $/kWh adder). kWh above a threshold,
+        up to the next threshold, is billed at the rate plus that adder.
+    """
+    def __init__(self, name="Flat", base_rate=0.0, periods=None, tiers=None, other_monthly_kwh=0.0, demand_rate=0.0, demand_window=15):
+        self.name = name
+        self.base_rate = float(base_rate)
+        self.periods = list(periods or [])
+        self.tiers = sorted((float(t), float(a)) for t, a in (tiers or []))
+        self.other_monthly_kwh = float(other_monthly_kwh)  # non compressor load on the same meter (for tiers)
+        self.demand_rate = float(demand_rate)              # $ per kW of monthly peak demand
+        self.demand_window = int(demand_window)            # demand averaging window in minutes
+        self.minute_rates = self._build_minute_rates()     # 12 x 7 x 1440
+
+    @classmethod
+    def flat(cls, rate):
+        return cls(name="Flat", base_rate=rate)
+
+    def _build_minute_rates(self):
+        rates = np.full((12, 7, 24 * 60), self.base_rate)
+        minutes = np.arange(24 * 60)
+        for period in self.periods:
+            months = parse_months(period.get("months", "All"))
+            days = parse_days(period.get("days", "All"))
+            start = time_str_to_minutes(period.get("start", "00:00"))
+            end = time_str_to_minutes(period.get("end", "24:00"))
+            if end > start:
+                in_period = (minutes >= start) & (minutes < end)
+            else:
+                in_period = (minutes >= start) | (minutes < end)    # wraps past midnight
+            rates[np.ix_(months, days, np.flatnonzero(in_period))] = float(period["rate"])
+        return rates
+
+    def is_flat(self):
+        return not self.periods and not self.tiers and not self.demand_rate
+
+    def average_rate(self):
+        """
+        Returns the $/kWh averaged over every minute of the year (tiers left out).
+        """
+        return float(np.average(self.minute_rates.mean(axis=(1, 2)), weights=WEEKS_IN_MONTH))
+
+    def scaled(self, factor):
+        """
+        Returns a copy with every rate, tier adder and the demand charge multiplied by factor.
+        """
+        return Tariff(name=f"{self.name} x {factor:g}", base_rate=self.base_rate * factor,
+                      periods=[dict(period, rate=float(period["rate"]) * factor) for period in self.periods],
+                      tiers=[(threshold, adder * factor) for threshold, adder in self.tiers],
+                      other_monthly_kwh=self.other_monthly_kwh, demand_rate=self.demand_rate * factor,
+                      demand_window=self.demand_window)
+
+    def get_rates(self, interval):
+        """
+        Returns a 12 x 7 x intervals array of the average $/kWh in every interval.
+        """
+        return self.minute_rates.reshape(12, 7, -1, interval).mean(axis=3)
+
+    def get_weekly_rates(self, interval):
+        """
+        Returns a 7 x intervals array of $/kWh averaged over the year, weighted
+        by the number of weeks in each month. kWh in an average week times these
+        rates gives the average weekly cost.
+        """
+        weekly = np.einsum('m,mdk->dk', WEEKS_IN_MONTH, self.minute_rates) / WEEKS_IN_MONTH.sum()
+        return weekly.reshape(7, -1, interval).mean(axis=2)
+
+    def get_tier_arrays(self):
+        """
+        Returns (thresholds, adders) as arrays, with a 0 kWh / $0 first block.
+        """
+        thresholds = np.array([0.0] + [t for t, _ in self.tiers])
+        adders = np.array([0.0] + [a for _, a in self.tiers])
+        return thresholds, adders
+
+    def tier_cost(self, monthly_kwh):
+        """
+        Returns the tier adder cost of monthly consumption (vectorized over monthly_kwh).
+        """
+        thresholds, adders = self.get_tier_arrays()
+        return tier_cost(monthly_kwh, thresholds[None, :], adders[None, :])
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "base_rate": self.base_rate,
+            "periods": self.periods,
+            "tiers": self.tiers,
+            "other_monthly_kwh": self.other_monthly_kwh,
+            "demand_rate": self.demand_rate,
+            "demand_window": self.demand_window
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+def tier_cost(monthly_kwh, thresholds, adders):
+    """
+    Tier adder cost for monthly consumption.
+    monthly_kwh = array of monthly kWh (any shape, ...)
+    thresholds, adders = arrays broadcastable to (..., tiers), thresholds ascending
+    """
+    monthly_kwh = np.asarray(monthly_kwh, dtype=float)[..., None]
+    upper = np.concatenate((thresholds[..., 1:], np.full(thresholds[..., :1].shape, np.inf)), axis=-1)
+    with np.errstate(invalid='ignore'):
+        width = np.where(np.isfinite(thresholds), upper - thresholds, 0.0)    # padded blocks are empty
+    in_block = np.clip(monthly_kwh - thresholds, 0.0, width)
+    return (in_block * adders).sum(axis=-1)
+
+def stack_tariffs(tariffs, interval):
+    """
+    Stacks many tariffs for batched evaluation.
+    Returns (weekly_rates, thresholds, adders, other_monthly_kwh):
+        weekly_rates = tariffs x 7 x intervals
+        thresholds, adders = tariffs x tiers (padded with unreachable $0 blocks)
+        other_monthly_kwh = tariffs
+    """
+    weekly_rates = np.stack([t.get_weekly_rates(interval) for t in tariffs])
+    n_tiers = max(len(t.tiers) for t in tariffs) + 1
+    thresholds = np.full((len(tariffs), n_tiers), np.inf)
+    adders = np.zeros((len(tariffs), n_tiers))
+    for i, tariff in enumerate(tariffs):
+        t, a = tariff.get_tier_arrays()
+        thresholds[i, :len(t)] = t
+        adders[i, :len(a)] = a
+    other = np.array([t.other_monthly_kwh for t in tariffs])
+    return weekly_rates, thresholds, adders, other
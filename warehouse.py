@@ -0,0 +1,228 @@
+"""
+Local SQLite store of finished assessments. Each saved run keeps its inputs,
+every compressor's weekday profile and the shutdown savings result, so
+portfolio questions (savings across every site logged in a quarter, say) are
+answered by one indexed query instead of reopening every project.
+"""
+import os
+import json
+import sqlite3
+from datetime import datetime
+import numpy as np
+from schedules import WEEKDAYS
+
+DEFAULT_WAREHOUSE_PATH = os.path.join(os.path.expanduser("~"), ".compressment", "results.sqlite")
+GROUPS = {      # savings_totals group_by -> SQL expression over the runs table
+    None: "'All'",
+    "site": "runs.site",
+    "year": "strftime('%Y', runs.deployed_date)",
+    "quarter": "strftime('%Y', runs.deployed_date) || '-Q' || ((CAST(strftime('%m', runs.deployed_date) AS INTEGER) + 2) / 3)",
+    "month": "strftime('%Y-%m', runs.deployed_date)"
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    site TEXT NOT NULL,
+    run_time TEXT NOT NULL,             -- ISO date-time the run was saved
+    deployed_date TEXT NOT NULL,        -- ISO dates of the logging window
+    collected_date TEXT NOT NULL,
+    interval_minutes INTEGER NOT NULL,
+    kwh_rate REAL,
+    tariff TEXT,                        -- Tariff.to_dict as JSON
+    schedule TEXT,                      -- shutdown schedule as JSON (day -> [start, end] ranges)
+    project_path TEXT,
+    total_kwh REAL,                     -- annual shutdown savings
+    total_dollars REAL,
+    demand_dollars REAL,
+    tier_dollars REAL,
+    kwh_low REAL, kwh_high REAL,        -- bootstrap range, NULL when not computed
+    dollars_low REAL, dollars_high REAL
+);
+CREATE TABLE IF NOT EXISTS compressors (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    voltage REAL,
+    file_path TEXT,
+    measured_kw INTEGER,
+    week_kwh REAL,
+    week_dollars REAL,
+    annual_kwh REAL,
+    annual_dollars REAL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE TABLE IF NOT EXISTS day_savings (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    compressor TEXT NOT NULL,
+    weekday INTEGER NOT NULL,           -- 0 = Monday
+    kwh REAL,                           -- weekly kWh saved on that weekday
+    PRIMARY KEY (run_id, compressor, weekday)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS profiles (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    compressor TEXT NOT NULL,
+    weekday INTEGER NOT NULL,           -- 0 = Monday
+    slot INTEGER NOT NULL,              -- interval of the day
+    kw REAL,
+    PRIMARY KEY (run_id, compressor, weekday, slot)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS runs_site ON runs (site, run_time);
+CREATE INDEX IF NOT EXISTS runs_dates ON runs (deployed_date, collected_date);
+CREATE INDEX IF NOT EXISTS runs_time ON runs (run_time);
+CREATE INDEX IF NOT EXISTS compressors_name ON compressors (name);
+"""
+
+class ResultsWarehouse:
+    """
+    A results database file, created on first use. Usable as a context manager.
+    """
+    def __init__(self, path=DEFAULT_WAREHOUSE_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def save_run(self, site, sim, schedule, result, project_path=None, run_time=None):
+        """
+        Stores a finished simulation and its shutdown savings result
+        (Analyzer.compute_shutdown_savings, with "bootstrap" if computed) in one
+        transaction. Returns the new run id.
+        """
+        run_time = run_time or datetime.now()
+        bootstrap = result.get("bootstrap") or {}
+        total_range = bootstrap.get("total", {})
+        kwh_range = total_range.get("kwh", (None, None))
+        dollars_range = total_range.get("dollars", (None, None))
+        tariff = sim.get_tariff()
+
+        with self.conn:     # commits once, or rolls back every insert on an error
+            cursor = self.conn.execute(
+                "INSERT INTO runs (site, run_time, deployed_date, collected_date, interval_minutes, kwh_rate, tariff, schedule,"
+                " project_path, total_kwh, total_dollars, demand_dollars, tier_dollars, kwh_low, kwh_high, dollars_low, dollars_high)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (site, run_time.isoformat(timespec="seconds"), _iso_date(sim.get_deployed_date()), _iso_date(sim.get_collected_date()),
+                 sim.get_interval(), sim.get_kwh_rate(), json.dumps(tariff.to_dict()) if tariff is not None else None,
+                 json.dumps(schedule), project_path, result["total_kwh"], result["total_dollars"],
+                 result.get("demand_dollars", 0.0), result.get("tier_dollars", 0.0), *kwh_range, *dollars_range))
+            run_id = cursor.lastrowid
+
+            savings = result["compressor_savings"]
+            compressor_rows, day_rows, profile_rows = [], [], []
+            for comp in sim.get_compressors():
+                name = comp.get_name()
+                s = savings.get(name, {})
+                compressor_rows.append((run_id, name, comp.voltage, comp.file_path, int(comp.measured_kw),
+                                        s.get("Total", 0.0), s.get("Total $", 0.0), s.get("Annual", 0.0), s.get("Annual $", 0.0)))
+                day_rows += [(run_id, name, d, s[day]) for d, day in enumerate(WEEKDAYS) if day in s]
+                profile = comp.get_profile_array()
+                weekday, slot = np.indices(profile.shape)
+                profile_rows += zip([run_id] * profile.size, [name] * profile.size,
+                                    weekday.ravel().tolist(), slot.ravel().tolist(), profile.ravel().tolist())
+
+            self.conn.executemany("INSERT INTO compressors VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", compressor_rows)
+            self.conn.executemany("INSERT INTO day_savings VALUES (?, ?, ?, ?)", day_rows)
+            self.conn.executemany("INSERT INTO profiles VALUES (?, ?, ?, ?, ?)", profile_rows)
+        print(f"Saved {site} results to: {self.path}")
+        return run_id
+
+    def delete_run(self, run_id):
+        with self.conn:
+            self.conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+
+    def sites(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT site FROM runs ORDER BY site")]
+
+    def runs(self, site=None, start=None, end=None, latest_only=False):
+        """
+        Returns the stored runs (dicts of the runs table columns, newest first).
+        site = only this site; start / end = ISO dates, only runs whose logging
+        window overlaps them; latest_only = only the newest run of every site.
+        """
+        where, params = _run_filter(site, start, end, latest_only)
+        rows = self.conn.execute(f"SELECT * FROM runs WHERE {where} ORDER BY run_time DESC, id DESC", params)
+        return [dict(row) for row in rows]
+
+    def savings_totals(self, group_by=None, site=None, start=None, end=None, latest_only=True):
+        """
+        Returns the annual shutdown savings of the matching runs added up per
+        group: a list of {"group", "runs", "sites", "kwh", "dollars"} dicts.
+        group_by = None (one total), "site", "year", "quarter" or "month" (of
+        the deployed date). Filters are the same as runs(); by default only the
+        newest run of a site counts, so reruns are not added twice.
+        """
+        if group_by not in GROUPS:
+            raise ValueError(f"Cannot group savings by {group_by}")
+        where, params = _run_filter(site, start, end, latest_only)
+        group = GROUPS[group_by]
+        rows = self.conn.execute(
+            f"SELECT {group} AS grp, COUNT(*) AS runs, COUNT(DISTINCT runs.site) AS sites,"
+            f" TOTAL(runs.total_kwh) AS kwh, TOTAL(runs.total_dollars) AS dollars"
+            f" FROM runs WHERE {where} GROUP BY grp ORDER BY grp", params)
+        return [{"group": row["grp"], "runs": row["runs"], "sites": row["sites"], "kwh": row["kwh"], "dollars": row["dollars"]}
+                for row in rows]
+
+    def compressor_savings(self, name=None, site=None, start=None, end=None, latest_only=True):
+        """
+        Returns the per-compressor annual savings of the matching runs as dicts
+        with the site, run id, compressor name and savings columns.
+        """
+        where, params = _run_filter(site, start, end, latest_only)
+        sql = ("SELECT runs.site, runs.id AS run_id, compressors.* FROM compressors JOIN runs ON runs.id = compressors.run_id"
+               f" WHERE {where}")
+        if name is not None:
+            sql += " AND compressors.name = ?"
+            params.append(name)
+        rows = self.conn.execute(sql + " ORDER BY runs.site, compressors.name", params)
+        return [dict(row) for row in rows]
+
+    def profile(self, run_id, compressor):
+        """
+        Returns the stored weekday profile of a compressor as a 7 x intervals
+        array of kW (Monday first), or None if it is not stored.
+        """
+        rows = self.conn.execute("SELECT weekday, slot, kw FROM profiles WHERE run_id = ? AND compressor = ?",
+                                 (run_id, compressor)).fetchall()
+        if not rows:
+            return None
+        cells = np.array([(row[0], row[1]) for row in rows])
+        profile = np.zeros((7, cells[:, 1].max() + 1))
+        profile[cells[:, 0], cells[:, 1]] = [row[2] for row in rows]
+        return profile
+
+def _run_filter(site, start, end, latest_only):
+    # WHERE clause (over the runs table) and parameters of the run filters
+    clauses, params = ["1"], []
+    if site is not None:
+        clauses.append("runs.site = ?")
+        params.append(site)
+    if start is not None:
+        clauses.append("runs.collected_date >= ?")
+        params.append(_iso_date(start))
+    if end is not None:
+        clauses.append("runs.deployed_date <= ?")
+        params.append(_iso_date(end))
+    where = " AND ".join(clauses)
+    if latest_only:
+        # newest matching run of every site (ties on run_time go to the later insert)
+        where = (f"runs.id IN (SELECT id FROM (SELECT runs.id, ROW_NUMBER() OVER (PARTITION BY runs.site"
+                 f" ORDER BY runs.run_time DESC, runs.id DESC) AS newest FROM runs WHERE {where}) WHERE newest = 1)")
+    return where, params
+
+def _iso_date(date):
+    # "MM/DD/YYYY" (as entered in the interface) or ISO date -> ISO date
+    date = str(date).strip()
+    if "/" in date:
+        return datetime.strptime(date, "%m/%d/%Y").date().isoformat()
+    return date